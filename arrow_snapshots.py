@@ -0,0 +1,240 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+import pandas as pd
+
+from instrumentation import metrics
+
+if TYPE_CHECKING:
+    from data_utils import DataLoader
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as pa_ipc
+except ImportError:  # pragma: no cover - pyarrow ships with Streamlit, but stay usable without it
+    pa = None
+    pa_ipc = None
+
+
+def source_signature(file_paths: Dict[str, str]) -> str:
+    """
+    Cheap signature of the source files (name, size and modification time).
+
+    Args:
+        file_paths: Dictionary of dataset name to file path (e.g. DataLoader.file_paths)
+
+    Returns:
+        Hex digest that changes whenever any source file changes
+    """
+    hasher = hashlib.sha1()
+    for name in sorted(file_paths):
+        path = file_paths[name]
+        try:
+            stat = os.stat(path)
+            hasher.update(f"{name}|{os.path.abspath(path)}|{stat.st_size}|{stat.st_mtime_ns}".encode('utf-8'))
+        except OSError:
+            hasher.update(f"{name}|missing".encode('utf-8'))
+    return hasher.hexdigest()[:16]
+
+
+class ArrowSnapshotStore:
+    """
+    Publishes processed data snapshots as uncompressed Arrow IPC files that every
+    Streamlit worker process memory-maps read-only. The operating system page cache
+    then holds one physical copy shared by all workers, and a worker whose snapshot
+    already exists "loads" it without parsing a single CSV.
+
+    Numeric, boolean and datetime columns without nulls are wrapped zero-copy;
+    string columns are zero-copy where pandas uses Arrow-backed strings (pandas 3+)
+    and converted otherwise.
+    """
+
+    MANIFEST = 'manifest.json'
+
+    def __init__(self, directory: str = os.path.join('.cache', 'snapshots'), keep: int = 3):
+        """
+        Initialize the store.
+
+        Args:
+            directory: Directory holding one subdirectory per published snapshot
+            keep: Number of most recent snapshots kept on disk
+        """
+        if pa is None:
+            raise ImportError("pyarrow is required for Arrow snapshots")
+        self.directory = directory
+        self.keep = keep
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, signature: str) -> str:
+        return os.path.join(self.directory, signature)
+
+    def exists(self, signature: str) -> bool:
+        """Whether a complete snapshot has been published under a signature."""
+        return os.path.exists(os.path.join(self._path(signature), self.MANIFEST))
+
+    def publish(self, signature: str, data: Dict, source: str = "") -> str:
+        """
+        Write a snapshot atomically (into a temporary directory that is then renamed).
+
+        Args:
+            signature: Snapshot name, normally source_signature of the inputs
+            data: Dictionary of DataFrames and report strings
+            source: Identifies the data source (e.g. its directory); older snapshots of the
+                same source are pruned
+
+        Returns:
+            Path of the published snapshot
+        """
+        target = self._path(signature)
+        if self.exists(signature):
+            return target
+
+        staging = tempfile.mkdtemp(prefix=f".{signature}-", dir=self.directory)
+        try:
+            manifest = {'source': source, 'tables': {}, 'reports': {}}
+            for name, value in data.items():
+                if isinstance(value, pd.DataFrame):
+                    table = pa.Table.from_pandas(value, preserve_index=False)
+                    file_name = f"{name}.arrow"
+                    with pa.OSFile(os.path.join(staging, file_name), 'wb') as sink:
+                        with pa_ipc.new_file(sink, table.schema) as writer:
+                            writer.write_table(table)
+                    manifest['tables'][name] = {'file': file_name, 'rows': table.num_rows}
+                elif isinstance(value, str):
+                    file_name = f"{name}.md"
+                    with open(os.path.join(staging, file_name), 'w', encoding='utf-8') as f:
+                        f.write(value)
+                    manifest['reports'][name] = file_name
+
+            with open(os.path.join(staging, self.MANIFEST), 'w', encoding='utf-8') as f:
+                json.dump(manifest, f)
+
+            try:
+                os.rename(staging, target)
+            except OSError:
+                # Another worker published the same snapshot first
+                shutil.rmtree(staging, ignore_errors=True)
+        except Exception:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+        self._prune(current=signature, source=source)
+        return target
+
+    def open(self, signature: str) -> Dict:
+        """
+        Memory-map a published snapshot.
+
+        Args:
+            signature: Snapshot name
+
+        Returns:
+            Dictionary of DataFrames and report strings. The DataFrames are views over
+            read-only memory maps, so they must not be modified in place.
+        """
+        path = self._path(signature)
+        with open(os.path.join(path, self.MANIFEST), encoding='utf-8') as f:
+            manifest = json.load(f)
+
+        data = {}
+        for name, entry in manifest['tables'].items():
+            source = pa.memory_map(os.path.join(path, entry['file']), 'r')
+            table = pa_ipc.open_file(source).read_all()
+            data[name] = table.to_pandas(split_blocks=True)
+        for name, file_name in manifest['reports'].items():
+            with open(os.path.join(path, file_name), encoding='utf-8') as f:
+                data[name] = f.read()
+        return data
+
+    def table_path(self, signature: str, name: str) -> Optional[str]:
+        """Arrow IPC file of one table in a published snapshot, or None if it has no such table."""
+        try:
+            with open(os.path.join(self._path(signature), self.MANIFEST), encoding='utf-8') as f:
+                entry = json.load(f)['tables'].get(name)
+        except (OSError, ValueError, KeyError):
+            return None
+        return os.path.join(self._path(signature), entry['file']) if entry else None
+
+    def _prune(self, current: str, source: str):
+        """Delete all but the most recent snapshots of a source (open memory maps stay valid on POSIX)."""
+        with self._lock:
+            snapshots: List[os.DirEntry] = []
+            for entry in os.scandir(self.directory):
+                if not entry.is_dir() or entry.name.startswith('.'):
+                    continue
+                try:
+                    with open(os.path.join(entry.path, self.MANIFEST), encoding='utf-8') as f:
+                        if json.load(f).get('source', "") == source:
+                            snapshots.append(entry)
+                except (OSError, ValueError):
+                    continue
+            snapshots.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+            for entry in snapshots[self.keep:]:
+                if entry.name != current:
+                    shutil.rmtree(entry.path, ignore_errors=True)
+
+    def load_or_publish(self, loader: "DataLoader") -> Dict:
+        """
+        Return the loader's data from a shared snapshot, publishing it first if needed.
+
+        Args:
+            loader: DataLoader whose files define the snapshot
+
+        Returns:
+            Dictionary of DataFrames (load_all_data) and reports (load_all_reports)
+        """
+        signature = source_signature(loader.file_paths)
+        if not self.exists(signature):
+            with metrics.span('snapshot_publish'):
+                data = loader.load_all_data()
+                data.update(loader.load_all_reports())
+                self.publish(signature, data, source=os.path.abspath(loader.data_dir))
+        with metrics.span('snapshot_open'):
+            return self.open(signature)
+
+
+def get_snapshot_store() -> Optional[ArrowSnapshotStore]:
+    """
+    Return a snapshot store unless disabled (ARROW_SNAPSHOTS=false) or pyarrow is missing.
+
+    The directory comes from SNAPSHOT_DIRECTORY (default .cache/snapshots); point every
+    worker on a host at the same directory so they share the page cache.
+    """
+    if pa is None or os.getenv('ARROW_SNAPSHOTS', 'true').lower() in ('0', 'false', 'no'):
+        return None
+    return ArrowSnapshotStore(os.getenv('SNAPSHOT_DIRECTORY', os.path.join('.cache', 'snapshots')))
+
+
+# Example usage and testing
+if __name__ == "__main__":
+    import sys
+    import time
+
+    from data_utils import DataLoader
+
+    loader = DataLoader(sys.argv[1] if len(sys.argv) > 1 else "data")
+    store = ArrowSnapshotStore(tempfile.mkdtemp(prefix="snapshots-"))
+
+    started = time.perf_counter()
+    data = loader.load_all_data()
+    data.update(loader.load_all_reports())
+    csv_seconds = time.perf_counter() - started
+
+    signature = source_signature(loader.file_paths)
+    store.publish(signature, data)
+
+    started = time.perf_counter()
+    mapped = store.open(signature)
+    open_seconds = time.perf_counter() - started
+
+    for name, df in mapped.items():
+        if isinstance(df, pd.DataFrame):
+            assert df.equals(data[name].reset_index(drop=True)), name
+    print(f"CSV load: {csv_seconds * 1000:.1f} ms, snapshot open: {open_seconds * 1000:.1f} ms")
+    shutil.rmtree(store.directory)
@@ -0,0 +1,57 @@
+"""
+Measure the per-rerun cost of the AI assistant page's chatbot setup.
+
+Before: every Streamlit rerun built a new FinancialChatBot (OpenAI client, prompts)
+and rebuilt the financial summary for each question.
+After: one shared bot per process with the summary pre-assembled per data snapshot.
+
+Run from the project root:
+    python benchmarks/bench_chatbot_rerun.py [reruns]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# A dummy key so the OpenAI client is really constructed (no request is sent)
+os.environ.setdefault('OPENAI_API_KEY', 'sk-benchmark')
+
+from chatgpt_integration import FinancialChatBot
+from data_utils import DataLoader
+
+
+def load_data():
+    loader = DataLoader()
+    data = loader.load_all_data()
+    data.update(loader.load_all_reports())
+    return data
+
+
+def per_rerun_ms(step, reruns: int) -> float:
+    started = time.perf_counter()
+    for _ in range(reruns):
+        step()
+    return (time.perf_counter() - started) / reruns * 1000
+
+
+if __name__ == "__main__":
+    reruns = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    data = load_data()
+
+    def rerun_before():
+        bot = FinancialChatBot()
+        bot.prepare_financial_summary(data)
+
+    shared_bot = FinancialChatBot()
+
+    def rerun_after():
+        shared_bot.get_financial_summary(data)
+
+    before = per_rerun_ms(rerun_before, reruns)
+    after = per_rerun_ms(rerun_after, reruns)
+
+    print(f"Reruns measured: {reruns}")
+    print(f"New bot + summary per rerun:     {before:8.3f} ms")
+    print(f"Shared bot + cached summary:     {after:8.3f} ms")
+    print(f"Speedup:                         {before / after:8.1f}x")
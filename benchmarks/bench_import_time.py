@@ -0,0 +1,67 @@
+"""
+Measure cold-start import cost per dashboard page with `python -X importtime`.
+
+Each page's imports run in a fresh interpreter so nothing is shared between
+measurements. Every page pays for main.py's module-level imports; "eager
+(before)" adds the AI stack main.py imported for every page before it was
+loaded lazily. Streamlit itself is the same for all pages and is left out so
+the script runs without it.
+
+Run from the project root:
+    python benchmarks/bench_import_time.py [repeats]
+"""
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# What main.py imports at module level (besides streamlit), paid by every page
+MAIN_IMPORTS = "import pandas, datetime, dotenv, data_utils, instrumentation, partitioned_store, arrow_snapshots"
+
+# Statements each page executes at import time (including lazy imports it triggers)
+PAGE_IMPORTS = {
+    'eager (before)': f"{MAIN_IMPORTS}; import chatgpt_integration, retrieval_index, conversation_memory, "
+                      "stream_renderer, report_jobs, openai",
+    'All Data Tables': MAIN_IMPORTS,
+    'AI Financial Assistant': f"{MAIN_IMPORTS}; import chatgpt_integration, conversation_memory, "
+                              "stream_renderer, openai",
+    'AI Reports': f"{MAIN_IMPORTS}; import chatgpt_integration, report_jobs, openai",
+}
+
+
+def measure(statement: str) -> Tuple[float, List[Tuple[int, str]]]:
+    """
+    Run a statement under -X importtime in a fresh interpreter.
+
+    Returns:
+        Tuple of (total import time in ms, [(self time in us, module)] sorted by cost)
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=PROJECT_ROOT, capture_output=True, text=True, check=True
+    )
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        modules.append((int(self_us), name.strip()))
+    modules.sort(reverse=True)
+    return sum(cost for cost, _ in modules) / 1000, modules
+
+
+if __name__ == "__main__":
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    results: Dict[str, float] = {}
+
+    for page, statement in PAGE_IMPORTS.items():
+        runs = [measure(statement) for _ in range(repeats)]
+        results[page] = statistics.median(total for total, _ in runs)
+        heaviest = ", ".join(f"{name} {cost / 1000:.0f}ms" for cost, name in runs[-1][1][:3])
+        print(f"{page:<24} {results[page]:8.1f} ms   heaviest: {heaviest}")
+
+    baseline = results['eager (before)']
+    print(f"\nFirst page (All Data Tables) imports {baseline / results['All Data Tables']:.1f}x faster than eager loading")
@@ -0,0 +1,163 @@
+"""
+End-to-end benchmark suite on a synthetic ledger.
+
+Generates (or reuses) a deterministic ledger of the requested size, times the data
+loading, validation, analysis and prompt-building hot paths, and writes the results
+as JSON so runs can be compared over time.
+
+Run from the project root:
+    python benchmarks/run_benchmarks.py --rows 100000
+    python benchmarks/run_benchmarks.py --rows 100000 --compare benchmarks/results/<earlier>.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Tuple
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+import numpy as np
+import pandas as pd
+
+from cash_forecast import CashForecaster
+from chatgpt_integration import FinancialChatBot
+from customer_scoring import PaymentBehaviorScorer
+from data_utils import DataLoader, FinancialAnalyzer
+from metrics_engine import FinancialMetricsEngine
+from spend_anomalies import SpendAnomalyDetector
+from synthetic_data import generate_ledger
+from trend_cube import TrendCube
+
+# Questions used for the prompt-building benchmarks
+QUESTIONS = [
+    "What is our total outstanding revenue from invoices?",
+    "Which vendors do we spend the most with and what are those expenses?",
+    "How much do we owe on outstanding bills this quarter?",
+]
+
+
+def time_call(func: Callable[[], Any], repeats: int) -> Dict[str, float]:
+    """Run func `repeats` times (after one warm-up call) and summarize wall time in seconds."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        func()
+        samples = []
+        for _ in range(repeats):
+            started = time.perf_counter()
+            func()
+            samples.append(time.perf_counter() - started)
+    return {
+        'min': min(samples), 'median': statistics.median(samples),
+        'mean': statistics.fmean(samples), 'repeats': repeats
+    }
+
+
+def build_cases(data_directory: str) -> List[Tuple[str, Callable[[], Any]]]:
+    """Benchmark cases as (name, zero-argument callable)."""
+    loader = DataLoader(data_directory)
+    with contextlib.redirect_stdout(io.StringIO()):
+        data = loader.load_all_data()
+        data.update(loader.load_all_reports())
+    bot = FinancialChatBot()
+
+    cases = [
+        ('DataLoader.load_all_data', loader.load_all_data),
+        ('DataLoader.load_projected[summary]',
+         lambda: loader.load_projected(FinancialChatBot.SUMMARY_COLUMNS)),
+        ('DataLoader.validate_data_integrity', lambda: loader.validate_data_integrity(data)),
+        ('FinancialAnalyzer.calculate_financial_ratios', lambda: FinancialAnalyzer.calculate_financial_ratios(data)),
+        ('FinancialAnalyzer.get_top_customers_by_revenue', lambda: FinancialAnalyzer.get_top_customers_by_revenue(data)),
+        ('FinancialAnalyzer.get_expense_trends', lambda: FinancialAnalyzer.get_expense_trends(data)),
+        ('TrendCube.build', lambda: TrendCube(data)),
+        # A fresh engine each run, so the series are computed rather than read from its cache
+        ('FinancialMetricsEngine.chart_series',
+         lambda: FinancialMetricsEngine(data, fingerprint='benchmark').chart_series()),
+        ('CashForecaster.forecast', lambda: CashForecaster(data).forecast()),
+        ('PaymentBehaviorScorer.score', lambda: PaymentBehaviorScorer().score(data['invoices'], data['customers'])),
+        ('SpendAnomalyDetector.detect', lambda: SpendAnomalyDetector().detect(data)),
+        ('FinancialChatBot.prepare_financial_summary', lambda: bot.prepare_financial_summary(data)),
+    ]
+    for i, question in enumerate(QUESTIONS, 1):
+        cases.append((f'FinancialChatBot.extract_relevant_data[q{i}]',
+                      lambda question=question: bot.extract_relevant_data(question, data)))
+    return cases
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=PROJECT_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(results: Dict[str, Any], baseline_path: str):
+    """Print the median change of every case against an earlier results file."""
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = json.load(f)
+    rows = baseline['meta']['rows']
+    size = f"{rows:,} rows" if rows is not None else baseline['meta']['data_directory']
+    print(f"\nCompared with {baseline_path} ({baseline['meta']['revision']}, {size}):")
+    for name, current in results['results'].items():
+        previous = baseline['results'].get(name)
+        if previous is None:
+            print(f"  {name:<52} new")
+            continue
+        ratio = current['median'] / previous['median'] if previous['median'] else float('inf')
+        print(f"  {name:<52} {previous['median'] * 1000:10.2f} ms -> {current['median'] * 1000:10.2f} ms  ({ratio:.2f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the dashboard's data and prompt hot paths.")
+    parser.add_argument("--rows", type=int, default=10000, help="Rows per transaction table (default: 10000)")
+    parser.add_argument("--seed", type=int, default=42, help="Synthetic ledger seed (default: 42)")
+    parser.add_argument("--repeats", type=int, default=5, help="Timed runs per case (default: 5)")
+    parser.add_argument("--data-dir", help="Benchmark an existing data directory instead of generating one")
+    parser.add_argument("--output", help="Results file (default: benchmarks/results/<rows>-<timestamp>.json)")
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    args = parser.parse_args()
+
+    data_directory = args.data_dir
+    if data_directory is None:
+        data_directory = os.path.join(PROJECT_ROOT, '.cache', 'synthetic', f"rows-{args.rows}-seed-{args.seed}")
+        if not os.path.exists(os.path.join(data_directory, 'invoices.csv')):
+            print(f"Generating {args.rows:,}-row ledger in {data_directory}...")
+            generate_ledger(data_directory, args.rows, args.seed, os.path.join(PROJECT_ROOT, 'data'))
+
+    results = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'revision': git_revision(),
+            'rows': args.rows if args.data_dir is None else None,
+            'seed': args.seed,
+            'data_directory': data_directory,
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+        },
+        'results': {}
+    }
+
+    for name, func in build_cases(data_directory):
+        results['results'][name] = stats = time_call(func, args.repeats)
+        print(f"{name:<54} median {stats['median'] * 1000:10.2f} ms   min {stats['min'] * 1000:10.2f} ms")
+
+    output = args.output or os.path.join(
+        PROJECT_ROOT, 'benchmarks', 'results', f"{args.rows}-{datetime.now():%Y%m%d-%H%M%S}.json"
+    )
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        compare(results, args.compare)
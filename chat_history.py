@@ -0,0 +1,446 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from data_utils import compute_data_fingerprint
+from instrumentation import metrics
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as pa_ipc
+except ImportError:  # pragma: no cover - pyarrow ships with Streamlit, but stay usable without it
+    pa = None
+    pa_ipc = None
+
+
+class ChatHistoryStore:
+    """
+    Persistent SQLite store of AI assistant conversations.
+
+    Turn text is stored zlib-compressed. The data slices, computed metrics, passages
+    and reports shown under an answer are stored once per content hash in a shared
+    blob table (DataFrames as zlib-compressed Arrow IPC) and turns refer to them by
+    hash, so the same table referenced by many answers is kept once, and an old
+    conversation re-renders its sources without re-running extract_relevant_data.
+    Full tables are keyed by data snapshot and table name instead of their content.
+    """
+
+    # Digest -> (kind, encode) of the blobs an answer references; encode() returns (data, raw_size)
+    PendingBlobs = Dict[str, Tuple[str, Callable[[], Tuple[bytes, int]]]]
+
+    def __init__(self, db_path: str = os.path.join('.cache', 'chat_history.sqlite3'),
+                 compression_level: int = 6, cached_blobs: int = 32):
+        """
+        Open (or create) the history database.
+
+        Args:
+            db_path: Path to the SQLite database file
+            compression_level: zlib level for turn text and JSON blobs
+            cached_blobs: Decoded blobs kept in memory for re-rendering on reruns
+        """
+        self.db_path = db_path
+        self.compression_level = compression_level
+        self.cached_blobs = cached_blobs
+        self._cache: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS conversations (
+                id TEXT PRIMARY KEY,
+                scope TEXT NOT NULL DEFAULT '',
+                title TEXT NOT NULL DEFAULT '',
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_conversations_scope ON conversations (scope, updated_at);
+            CREATE TABLE IF NOT EXISTS turns (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                conversation_id TEXT NOT NULL,
+                role TEXT NOT NULL,
+                content BLOB NOT NULL,
+                sources TEXT,
+                created_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_turns_conversation ON turns (conversation_id, id);
+            CREATE TABLE IF NOT EXISTS blobs (
+                hash TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                data BLOB NOT NULL,
+                raw_size INTEGER NOT NULL,
+                created_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS turn_blobs (
+                turn_id INTEGER NOT NULL,
+                hash TEXT NOT NULL,
+                PRIMARY KEY (turn_id, hash)
+            );
+            CREATE INDEX IF NOT EXISTS idx_turn_blobs_hash ON turn_blobs (hash);
+        """)
+
+    def _compress(self, text: str) -> bytes:
+        return zlib.compress(text.encode('utf-8'), self.compression_level)
+
+    @staticmethod
+    def _decompress(data: bytes) -> str:
+        return zlib.decompress(data).decode('utf-8')
+
+    def _existing_blobs(self, digests: List[str]) -> set:
+        """Which of the digests are already stored (caller holds the lock)."""
+        if not digests:
+            return set()
+        placeholders = ",".join("?" * len(digests))
+        return {row[0] for row in self._conn.execute(f"SELECT hash FROM blobs WHERE hash IN ({placeholders})", digests)}
+
+    def _add_pending(self, digest: str, kind: str, encode: Callable[[], Tuple[bytes, int]],
+                     pending: "ChatHistoryStore.PendingBlobs") -> str:
+        """
+        Add a blob to an answer's pending blobs. New blobs are encoded now, outside the write
+        transaction; stored ones are encoded only if they are collected before add_turn commits.
+        """
+        with self._lock:
+            stored = bool(self._existing_blobs([digest]))
+        if not stored:
+            encoded = encode()
+            encode = lambda: encoded
+        pending[digest] = (kind, encode)
+        return digest
+
+    def _frame_blob(self, df: pd.DataFrame, pending: "ChatHistoryStore.PendingBlobs", key: Optional[str] = None) -> str:
+        """
+        Register a DataFrame to store as a compressed Arrow IPC stream; returns its digest.
+
+        Args:
+            df: Frame to store
+            pending: Blobs the answer references, filled in by this call
+            key: Identity of the frame (e.g. data snapshot and table name); content hash when omitted
+        """
+        if pa is None:
+            raise ImportError("pyarrow is required to store data slices")
+        if key is not None:
+            digest = 't' + hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+        else:
+            digest = 'f' + compute_data_fingerprint({'frame': df})
+
+        def encode():
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            sink = pa.BufferOutputStream()
+            with pa_ipc.new_stream(sink, table.schema) as writer:
+                writer.write_table(table)
+            # zlib beats the IPC format's own buffer compression on the small slices answers reference
+            return zlib.compress(sink.getvalue().to_pybytes(), self.compression_level), int(df.memory_usage(deep=True).sum())
+
+        return self._add_pending(digest, 'frame', encode, pending)
+
+    def _json_blob(self, value: Any, pending: "ChatHistoryStore.PendingBlobs") -> str:
+        """Register a JSON-serializable value to store compressed; returns its content hash."""
+        text = json.dumps(value, sort_keys=True, default=str)
+        digest = 'j' + compute_data_fingerprint({'json': text})
+        return self._add_pending(digest, 'json', lambda: (self._compress(text), len(text)), pending)
+
+    def _get_blob(self, digest: str) -> Any:
+        """Decode a stored blob (DataFrame or JSON value), from the in-memory cache when possible."""
+        with self._lock:
+            if digest in self._cache:
+                self._cache.move_to_end(digest)
+                return self._cache[digest]
+            row = self._conn.execute("SELECT kind, data FROM blobs WHERE hash = ?", (digest,)).fetchone()
+        if row is None:
+            raise KeyError(f"Unknown blob: {digest}")
+
+        kind, data = row
+        if kind == 'frame':
+            if pa is None:
+                raise ImportError("pyarrow is required to read stored data slices")
+            value = pa_ipc.open_stream(pa.py_buffer(zlib.decompress(data))).read_all().to_pandas()
+        else:
+            value = json.loads(self._decompress(data))
+
+        with self._lock:
+            self._cache[digest] = value
+            while len(self._cache) > self.cached_blobs:
+                self._cache.popitem(last=False)
+        return value
+
+    def _store_sources(self, relevant_sources: Dict[str, Any], pending: "ChatHistoryStore.PendingBlobs",
+                       snapshot: Optional[str] = None) -> Dict[str, Any]:
+        """Register an answer's sources as blobs and return the manifest of hashes that references them."""
+        views = relevant_sources.get('views')
+        if not views:
+            from chatgpt_integration import FinancialChatBot
+            views = FinancialChatBot.prepare_source_views(relevant_sources)
+
+        manifest: Dict[str, Any] = {}
+        for section in ('filtered_data', 'tables'):
+            entries = []
+            for view in views.get(section, []):
+                # Full tables are whole snapshot tables, so they are keyed by snapshot instead of hashed
+                key = f"{snapshot}|{view['name']}" if section == 'tables' and snapshot else None
+                try:
+                    entries.append({'name': view['name'], 'rows': view['rows'],
+                                    'blob': self._frame_blob(view.get('source', view['df']), pending, key)})
+                except Exception as e:
+                    print(f"Error storing data source {view['name']}: {e}")
+            if entries:
+                manifest[section] = entries
+
+        for section in ('passages', 'metrics'):
+            if relevant_sources.get(section):
+                manifest[section] = self._json_blob(relevant_sources[section], pending)
+        reports = {name: content for name, content in (relevant_sources.get('reports') or {}).items() if content}
+        if reports:
+            manifest['reports'] = {name: self._json_blob(content, pending) for name, content in reports.items()}
+        return manifest
+
+    def start_conversation(self, scope: str = "") -> str:
+        """
+        Create an empty conversation.
+
+        Args:
+            scope: What the conversation is about (e.g. the tenant), used to filter listings
+
+        Returns:
+            Conversation ID
+        """
+        conversation_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO conversations (id, scope, created_at, updated_at) VALUES (?, ?, ?, ?)",
+                (conversation_id, scope, now, now)
+            )
+        return conversation_id
+
+    def add_turn(self, conversation_id: str, role: str, content: str,
+                 sources: Optional[Dict[str, Any]] = None, snapshot: Optional[str] = None) -> int:
+        """
+        Append a turn to a conversation.
+
+        Args:
+            conversation_id: ID from start_conversation
+            role: "user" or "assistant"
+            content: Message text
+            sources: The answer's data sources (output of extract_relevant_data, optionally with
+                'views', or {'metrics': ...} for tool-call answers)
+            snapshot: Key of the data snapshot the answer used (e.g. the source signature);
+                full tables are stored once per snapshot instead of being hashed
+
+        Returns:
+            Turn ID
+        """
+        with metrics.span('chat_history_add_turn'):
+            pending: ChatHistoryStore.PendingBlobs = {}
+            manifest = self._store_sources(sources, pending, snapshot) if sources else {}
+            now = time.time()
+            with self._lock:
+                self._conn.execute("BEGIN IMMEDIATE")
+                try:
+                    # Checked again inside the transaction that references the blobs, so a concurrent
+                    # delete_conversation cannot collect one between the check and the turn_blobs insert
+                    stored = self._existing_blobs(list(pending))
+                    for digest, (kind, encode) in pending.items():
+                        if digest in stored:
+                            metrics.increment('chat_history_blobs_deduplicated', kind=kind)
+                            continue
+                        data, raw_size = encode()
+                        self._conn.execute(
+                            "INSERT INTO blobs (hash, kind, data, raw_size, created_at) VALUES (?, ?, ?, ?, ?)",
+                            (digest, kind, data, raw_size, now)
+                        )
+                    cursor = self._conn.execute(
+                        "INSERT INTO turns (conversation_id, role, content, sources, created_at) VALUES (?, ?, ?, ?, ?)",
+                        (conversation_id, role, self._compress(content),
+                         json.dumps(manifest) if manifest else None, now)
+                    )
+                    turn_id = cursor.lastrowid
+                    self._conn.executemany("INSERT OR IGNORE INTO turn_blobs (turn_id, hash) VALUES (?, ?)",
+                                           [(turn_id, digest) for digest in pending])
+                    # The first question titles the conversation
+                    self._conn.execute(
+                        "UPDATE conversations SET updated_at = ?, "
+                        "title = CASE WHEN title = '' AND ? = 'user' THEN ? ELSE title END WHERE id = ?",
+                        (now, role, " ".join(content.split())[:80], conversation_id)
+                    )
+                    self._conn.execute("COMMIT")
+                except Exception:
+                    self._conn.execute("ROLLBACK")
+                    raise
+        return turn_id
+
+    def list_conversations(self, scope: Optional[str] = None, limit: int = 20) -> List[Dict[str, Any]]:
+        """
+        List conversations, most recently updated first.
+
+        Args:
+            scope: Only conversations with this scope (default: all)
+            limit: Maximum number of conversations
+
+        Returns:
+            List of {id, scope, title, turns, updated_at}
+        """
+        query = ("SELECT c.id, c.scope, c.title, c.updated_at, COUNT(t.id) FROM conversations c "
+                 "LEFT JOIN turns t ON t.conversation_id = c.id")
+        params: List[Any] = []
+        if scope is not None:
+            query += " WHERE c.scope = ?"
+            params.append(scope)
+        query += " GROUP BY c.id HAVING COUNT(t.id) > 0 ORDER BY c.updated_at DESC LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [{'id': row[0], 'scope': row[1], 'title': row[2] or "Untitled", 'updated_at': row[3], 'turns': row[4]}
+                for row in rows]
+
+    def load_turns(self, conversation_id: str) -> List[Dict[str, Any]]:
+        """
+        Load a conversation's turns, oldest first (sources are not decoded).
+
+        Returns:
+            List of {id, role, content, has_sources}
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, role, content, sources IS NOT NULL FROM turns WHERE conversation_id = ? ORDER BY id",
+                (conversation_id,)
+            ).fetchall()
+        return [{'id': row[0], 'role': row[1], 'content': self._decompress(row[2]), 'has_sources': bool(row[3])}
+                for row in rows]
+
+    def load_sources(self, turn_id: int) -> Dict[str, Any]:
+        """
+        Rebuild a turn's data sources in the shape display_data_sources expects.
+
+        Args:
+            turn_id: Turn ID from add_turn or load_turns
+
+        Returns:
+            Dictionary with 'views' (filtered_data and tables of {name, df, rows, source}),
+            'passages', 'metrics' and 'reports'; empty if the turn has no sources
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT sources FROM turns WHERE id = ?", (turn_id,)).fetchone()
+        if row is None or row[0] is None:
+            return {}
+
+        manifest = json.loads(row[0])
+        views = {'filtered_data': [], 'tables': []}
+        for section in views:
+            for entry in manifest.get(section, []):
+                df = self._get_blob(entry['blob'])
+                # Full tables show their first rows; the whole table stays available for exports
+                views[section].append({'name': entry['name'], 'rows': entry['rows'], 'source': df,
+                                       'df': df.head(10) if section == 'tables' else df})
+
+        sources: Dict[str, Any] = {'views': views}
+        for section in ('passages', 'metrics'):
+            if section in manifest:
+                sources[section] = self._get_blob(manifest[section])
+        if 'reports' in manifest:
+            sources['reports'] = {name: self._get_blob(digest) for name, digest in manifest['reports'].items()}
+        return sources
+
+    def delete_conversation(self, conversation_id: str) -> int:
+        """
+        Delete a conversation and any stored blobs no other turn references.
+
+        Returns:
+            Number of blobs removed
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "DELETE FROM turn_blobs WHERE turn_id IN (SELECT id FROM turns WHERE conversation_id = ?)",
+                    (conversation_id,)
+                )
+                self._conn.execute("DELETE FROM turns WHERE conversation_id = ?", (conversation_id,))
+                self._conn.execute("DELETE FROM conversations WHERE id = ?", (conversation_id,))
+                cursor = self._conn.execute(
+                    "DELETE FROM blobs WHERE hash NOT IN (SELECT hash FROM turn_blobs)"
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._cache.clear()
+            return cursor.rowcount
+
+    def stats(self) -> Dict[str, int]:
+        """Counts and sizes: conversations, turns, blobs, raw_bytes (uncompressed) and stored_bytes."""
+        with self._lock:
+            conversations = self._conn.execute("SELECT COUNT(*) FROM conversations").fetchone()[0]
+            turns, text_bytes = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(content)), 0) FROM turns"
+            ).fetchone()
+            blobs, raw_bytes, blob_bytes = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(raw_size), 0), COALESCE(SUM(LENGTH(data)), 0) FROM blobs"
+            ).fetchone()
+        return {'conversations': conversations, 'turns': turns, 'blobs': blobs,
+                'raw_bytes': raw_bytes, 'stored_bytes': text_bytes + blob_bytes}
+
+
+def get_chat_history_store() -> Optional[ChatHistoryStore]:
+    """
+    Return a chat history store unless disabled (CHAT_HISTORY=false).
+
+    The database path comes from CHAT_HISTORY_PATH (default .cache/chat_history.sqlite3).
+    """
+    if os.getenv('CHAT_HISTORY', 'true').lower() in ('0', 'false', 'no'):
+        return None
+    return ChatHistoryStore(os.getenv('CHAT_HISTORY_PATH', os.path.join('.cache', 'chat_history.sqlite3')))
+
+
+# Example usage and testing
+if __name__ == "__main__":
+    import sys
+    import tempfile
+
+    from chatgpt_integration import FinancialChatBot
+    from data_utils import DataLoader
+
+    loader = DataLoader(sys.argv[1] if len(sys.argv) > 1 else "data")
+    data = loader.load_all_data()
+    data.update(loader.load_all_reports())
+
+    bot = FinancialChatBot.__new__(FinancialChatBot)
+    store = ChatHistoryStore(os.path.join(tempfile.mkdtemp(prefix="chat-history-"), "history.sqlite3"))
+    conversation = store.start_conversation()
+
+    questions = ["Which invoices are outstanding?", "Show outstanding invoices by customer",
+                 "What are our biggest expenses?"]
+    for question in questions:
+        sources = bot.extract_relevant_data(question, data, passages=[])
+        store.add_turn(conversation, 'user', question)
+        started = time.perf_counter()
+        turn = store.add_turn(conversation, 'assistant', f"Answer to: {question}\n" * 20, sources)
+        print(f"Stored turn {turn} in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    stats = store.stats()
+    print(f"{stats['turns']} turns, {stats['blobs']} blobs: {stats['raw_bytes']:,} bytes in memory, "
+          f"{stats['stored_bytes']:,} bytes stored")
+
+    # A fresh store (as in a new session) re-renders sources without recomputing them
+    reopened = ChatHistoryStore(store.db_path)
+    print([c['title'] for c in reopened.list_conversations()])
+    for turn in reopened.load_turns(conversation):
+        if turn['has_sources']:
+            started = time.perf_counter()
+            views = reopened.load_sources(turn['id'])['views']
+            print(f"Turn {turn['id']}: {[view['name'] for view in views['filtered_data'] + views['tables']]} "
+                  f"in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    assert reopened.delete_conversation(conversation) == stats['blobs']
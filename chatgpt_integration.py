@@ -1,28 +1,76 @@
-from openai import OpenAI
 import os
 import pandas as pd
 from datetime import datetime
 import json
 import re
-from typing import Dict, Any, Tuple, List
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Any, Tuple, List, Optional
 from dotenv import load_dotenv
+from data_utils import DataLoader
+from metrics_engine import FinancialMetricsEngine, get_metrics_engine, snapshot_fingerprint
+from retrieval_index import get_retrieval_index, format_passages
+from request_scheduler import RequestScheduler, get_shared_scheduler
+from request_coalescer import make_request_key, shared_single_flight
+from model_router import ModelRouter
+from local_answers import LocalAnswerEngine
+from instrumentation import metrics
 
 # Load environment variables
 load_dotenv()
 
+# Shared worker pool that assembles "Data Sources" panels while the LLM request is in flight
+_source_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="data-sources")
+
 class FinancialChatBot:
     """
     A ChatGPT-powered financial analysis assistant that can analyze
     financial data and provide insights, recommendations, and explanations.
+    
+    One instance is meant to be shared by every session in the process: per-request
+    state is passed as arguments and the shared caches are guarded by locks.
     """
     
-    def __init__(self):
-        """Initialize the FinancialChatBot with OpenAI API configuration."""
+    # Columns read by the base sections of prepare_financial_summary, loaded through
+    # DataLoader.load_projected by prepare_projected_summary. The forecast, scoring,
+    # trend and anomaly sections need the full tables and are skipped there.
+    SUMMARY_COLUMNS = {
+        'invoices': ['amount', 'status'],
+        'expenses': ['amount', 'category'],
+        'bills': ['amount', 'status'],
+        'customers': ['active', 'credit_limit'],
+        'vendors': ['active'],
+        'services': ['hourly_rate', 'active']
+    }
+    
+    # Keywords indicating a question needs the financial data summary
+    FINANCIAL_KEYWORDS = ['revenue', 'expense', 'profit', 'cash', 'invoice', 'bill', 'customer', 'vendor', 'financial', 'money', 'cost', 'income', 'balance', 'account']
+    
+    def __init__(self, client: Optional[Any] = None, scheduler: Optional[RequestScheduler] = None,
+                 router: Optional[ModelRouter] = None):
+        """
+        Initialize the FinancialChatBot with OpenAI API configuration.
+        
+        Args:
+            client: Optional pre-built OpenAI-compatible client (e.g. a local stub)
+            scheduler: Optional request scheduler (defaults to the process-wide one)
+            router: Optional model router (defaults to routes configured in the environment)
+        """
         self.api_key = os.getenv('OPENAI_API_KEY')
-        self.client = None
-        if self.api_key:
+        self.client = client
+        # Rate limiting and retries are shared by every session in the process
+        self.scheduler = scheduler or get_shared_scheduler()
+        # Fast/deep model selection per question
+        self.router = router or ModelRouter(self.FINANCIAL_KEYWORDS)
+        if client is not None:
+            self.api_key = self.api_key or 'local-client'
+        elif self.api_key:
             try:
-                self.client = OpenAI(api_key=self.api_key)
+                # Imported here so the openai package only loads once a key is configured
+                from openai import OpenAI
+                # Retries are handled by the scheduler, not the client
+                self.client = OpenAI(api_key=self.api_key, max_retries=0)
             except Exception as e:
                 print(f"Error initializing OpenAI client: {e}")
                 self.client = None
@@ -54,11 +102,72 @@ class FinancialChatBot:
         Always provide clean, well-formatted responses without HTML entities or encoding issues.
         Be helpful, friendly, and professional in all interactions.
         """
+        
+        # Extra instructions used when the model can request exact metrics
+        self.tool_prompt = """
+        You can call tools to fetch exact figures computed from the company's ledgers
+        (status totals, top vendors and customers, aging buckets, monthly trends).
+        Prefer calling a tool over guessing, and quote the returned numbers exactly.
+        Tables available: invoices (receivables), bills (payables), expenses, vendors, customers.
+        """
+        
+        # Number of retrieved passages added to the prompt
+        self.retrieval_top_k = 5
+        
+        # Financial summaries pre-assembled per data snapshot; the bot is shared across sessions
+        self.summary_cache_size = 4
+        self._summary_cache: "OrderedDict[str, str]" = OrderedDict()
+        self._summary_cache_lock = threading.Lock()
     
     def is_configured(self) -> bool:
         """Check if the OpenAI API key is configured."""
         return bool(self.api_key and self.client)
     
+    def _create_completion(self, route: str, data_fingerprint: Optional[str] = None, **kwargs) -> Any:
+        """
+        Send a chat completion request through the shared rate-limited scheduler.
+        
+        The route selects the model, max_tokens and temperature. When a data fingerprint
+        is given, concurrent identical requests from any session are coalesced into one
+        upstream call and streamed chunks fan out to every caller.
+        
+        Args:
+            route: Model route name from the router ('fast' or 'deep')
+            data_fingerprint: Snapshot fingerprint the prompt was built from (enables coalescing)
+            **kwargs: Arguments for client.chat.completions.create
+            
+        Returns:
+            Completion response (or stream when stream=True)
+        """
+        kwargs = {**self.router.settings(route), **kwargs}
+        prompt_chars = sum(len(str(message.get('content') or '')) for message in kwargs.get('messages', []))
+        estimated_tokens = prompt_chars // 4 + kwargs.get('max_tokens', 1500)
+        
+        def send():
+            return self.scheduler.call(
+                lambda: self.client.chat.completions.create(**kwargs),
+                estimated_tokens=estimated_tokens
+            )
+        
+        def dispatch():
+            if data_fingerprint is None:
+                return send()
+            key = make_request_key(kwargs.get('model', ''), kwargs.get('messages', []), data_fingerprint)
+            if kwargs.get('stream'):
+                return shared_single_flight.stream(key, send)
+            return shared_single_flight.call(key, send)
+        
+        # For streams this measures time until the response starts
+        metrics.increment('openai_requests', route=route)
+        with metrics.span('openai_request', route=route, stream=bool(kwargs.get('stream'))):
+            return self.router.timed(route, dispatch)
+    
+    @staticmethod
+    def _has_columns(df: Optional[pd.DataFrame], columns: List[str]) -> bool:
+        """Whether a table was loaded with all of the given columns."""
+        return isinstance(df, pd.DataFrame) and set(columns).issubset(df.columns)
+    
+    @metrics.timed()
     def prepare_financial_summary(self, data: Dict) -> str:
         """
         Prepare a comprehensive financial summary from the data for AI analysis.
@@ -144,6 +253,16 @@ class FinancialChatBot:
                 if 'outstanding_invoices' in locals():
                     summary.append(f"- Net Working Capital Impact: ${outstanding_invoices - outstanding_bills:,.2f}")
             
+            # Forward-looking cash position (cached per snapshot by the metrics engine)
+            if self._has_columns(invoices, ['due_date', 'status', 'amount']) and \
+                    self._has_columns(bills, ['due_date', 'status', 'amount']):
+                forecast = get_metrics_engine(data).cash_forecast()
+                summary.append(f"\n13-WEEK CASH FORECAST (from {forecast['as_of']}):")
+                summary.append(f"- Opening Cash: ${forecast['opening_balance']:,.2f}")
+                summary.append(f"- Expected Inflows: ${forecast['inflows']:,.2f} (open invoices, adjusted for customer payment lag)")
+                summary.append(f"- Expected Outflows: ${forecast['outflows']:,.2f} (open bills and recurring expenses)")
+                summary.append(f"- Closing Cash: ${forecast['closing_balance']:,.2f}; lowest ${forecast['lowest_balance']:,.2f} in week {forecast['lowest_week']}")
+            
             # Customer and vendor counts
             customers = data.get('customers')
             vendors = data.get('vendors')
@@ -157,6 +276,48 @@ class FinancialChatBot:
                 if 'credit_limit' in customers.columns:
                     summary.append(f"- Average Customer Credit Limit: ${customers['credit_limit'].mean():,.2f}")
             
+            # Customer payment behavior (scored in batch once per snapshot)
+            if self._has_columns(invoices, ['customer_id', 'date_issued', 'due_date']) and customers is not None:
+                engine = get_metrics_engine(data)
+                behavior = engine.payment_behavior_summary()
+                summary.append(f"\nCUSTOMER PAYMENT BEHAVIOR:")
+                summary.append(f"- DSO (amount-weighted days to collect): {behavior['dso']:.1f} days")
+                summary.append(f"- On-Time Payment Rate: {behavior['on_time_rate']:.1f}%; Average Days Late: {behavior['avg_days_late']:.1f}")
+                summary.append(f"- Customers Over Credit Limit: {behavior['over_credit_limit']}")
+                for band, values in behavior['risk_bands'].items():
+                    summary.append(f"- {band} Risk: {values['customers']} customers, ${values['outstanding']:,.2f} outstanding")
+                riskiest = engine.customer_payment_scores(3)['customers']
+                if riskiest:
+                    summary.append("- Riskiest Payers: " + "; ".join(
+                        f"{c['customer_name']} (score {c['payment_score']:.0f}, ${c['outstanding']:,.2f} outstanding)"
+                        for c in riskiest))
+            
+            # Month-over-month and rolling figures (from the snapshot's trend cube)
+            if self._has_columns(invoices, ['date_issued']) and self._has_columns(expenses, ['date']):
+                cube = get_metrics_engine(data).trend_cube()
+                summary.append(f"\nMONTHLY TRENDS:")
+                for label, table in (('Revenue', 'invoices'), ('Expenses', 'expenses')):
+                    trend = cube.slice(table, months=1)
+                    if trend.empty:
+                        continue
+                    latest = trend.iloc[-1]
+                    line = f"- {label} {latest['month']}: ${latest['amount']:,.2f}"
+                    if pd.notna(latest['mom_pct']):
+                        line += f" ({latest['mom_pct']:+.1f}% MoM"
+                        line += f", {latest['yoy_pct']:+.1f}% YoY)" if pd.notna(latest['yoy_pct']) else ")"
+                    if pd.notna(latest['rolling_3m']):
+                        line += f"; trailing 3 months ${latest['rolling_3m']:,.2f}"
+                    if pd.notna(latest['rolling_12m']):
+                        line += f"; trailing 12 months ${latest['rolling_12m']:,.2f}"
+                    summary.append(line)
+            
+            # Duplicate payments and unusual spend (detected once per snapshot)
+            if self._has_columns(expenses, ['vendor_id', 'date']) and self._has_columns(bills, ['vendor_id', 'date_issued']):
+                anomalies = get_metrics_engine(data).spend_anomaly_summary()
+                summary.append(f"\nSPEND ANOMALIES:")
+                summary.append(f"- Possible Duplicate Payments: {anomalies['exact_duplicates']} exact, {anomalies['near_duplicates']} near (${anomalies['duplicate_amount']:,.2f})")
+                summary.append(f"- Unusually Large Amounts: {anomalies['outliers']} (${anomalies['outlier_amount']:,.2f})")
+            
             # Service portfolio
             services = data.get('services')
             if services is not None and hasattr(services, 'shape'):
@@ -178,13 +339,58 @@ class FinancialChatBot:
         
         return "\n".join(summary)
     
-    def extract_relevant_data(self, user_question: str, data: Dict) -> Dict[str, Any]:
+    def prepare_projected_summary(self, loader: DataLoader) -> str:
+        """
+        Prepare the base financial summary straight from a data directory, loading only
+        the SUMMARY_COLUMNS of each table (for callers that do not hold the data).
+        
+        Args:
+            loader: DataLoader for the data directory
+            
+        Returns:
+            String summary of financial data (see prepare_financial_summary)
+        """
+        data = loader.load_projected(self.SUMMARY_COLUMNS)
+        data.update(loader.load_all_reports())
+        return self.prepare_financial_summary(data)
+    
+    def get_financial_summary(self, data: Dict, data_fingerprint: Optional[str] = None) -> str:
+        """
+        Return the financial summary for a data snapshot, building it only once per snapshot.
+        
+        Args:
+            data: Dictionary containing all financial DataFrames and reports
+            data_fingerprint: Precomputed snapshot fingerprint, if already known
+            
+        Returns:
+            String summary of financial data (see prepare_financial_summary)
+        """
+        # The engine cache recognizes a known snapshot by identity, so this does not rehash the tables
+        data_fingerprint = data_fingerprint or snapshot_fingerprint(data)
+        with self._summary_cache_lock:
+            summary = self._summary_cache.get(data_fingerprint)
+            if summary is not None:
+                self._summary_cache.move_to_end(data_fingerprint)
+                return summary
+        
+        # Built outside the lock; concurrent first requests may both build the same string
+        summary = self.prepare_financial_summary(data)
+        with self._summary_cache_lock:
+            self._summary_cache[data_fingerprint] = summary
+            while len(self._summary_cache) > self.summary_cache_size:
+                self._summary_cache.popitem(last=False)
+        return summary
+    
+    @metrics.timed()
+    def extract_relevant_data(self, user_question: str, data: Dict,
+                              passages: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
         """
         Extract relevant data sources based on the user's question.
         
         Args:
             user_question: The user's question
             data: Dictionary containing all financial data
+            passages: Already retrieved passages, to avoid searching the index twice
             
         Returns:
             Dictionary with relevant tables and reports
@@ -192,11 +398,15 @@ class FinancialChatBot:
         relevant_sources = {
             'tables': {},
             'reports': {},
-            'filtered_data': {}
+            'filtered_data': {},
+            'passages': []
         }
         
         question_lower = user_question.lower()
         
+        # Pull the best-matching report sections and transaction descriptions
+        relevant_sources['passages'] = passages if passages is not None else self.retrieve_passages(user_question, data)
+        
         # Map keywords to data sources
         keyword_mapping = {
             'invoice': 'invoices',
@@ -268,6 +478,37 @@ class FinancialChatBot:
                         if not filtered_df.empty:
                             relevant_sources['filtered_data'][f'{table_name}_{status}'] = filtered_df
         
+        # Payment behavior questions use the batch customer scores instead of scanning invoices
+        if re.search(r"\b(pay(s|ing|ment)?|paid|late|on[- ]time|dso|days sales|credit|risk\w*|reliab\w*|collect\w*)\b",
+                     question_lower) and re.search(r"\b(customers?|clients?|payers?)\b", question_lower):
+            scores = get_metrics_engine(data).customer_scores()
+            relevant_sources['filtered_data']['customer_payment_scores'] = \
+                scores[scores['invoice_count'] > 0].head(10).reset_index().round(2)
+        
+        # Trend questions read slices of the cached trend cube instead of regrouping raw rows
+        if re.search(r"\b(trends?|trending|grow(th|ing|n)?|grew|declin\w*|increas\w*|decreas\w*|monthly|"
+                     r"month[- ]over[- ]month|year[- ]over[- ]year|mom|yoy|rolling|seasonal\w*)\b", question_lower):
+            cube = get_metrics_engine(data).trend_cube()
+            trend_tables = {'revenue': 'invoices', 'expense': 'expenses', 'bill': 'bills'}
+            mentioned = [name for name, table in trend_tables.items() if table in relevant_sources['tables']]
+            for name in mentioned or ['revenue', 'expense']:
+                trend = cube.slice(trend_tables[name], months=12)
+                if not trend.empty:
+                    relevant_sources['filtered_data'][f'{name}_monthly_trend'] = \
+                        trend.drop(columns='total').assign(month=trend['month'].astype(str)).round(2)
+            if 'expenses' in relevant_sources['tables'] or 'categor' in question_lower:
+                movers = cube.latest('expenses', 'category', k=10, by='mom_change')
+                if not movers.empty:
+                    relevant_sources['filtered_data']['expense_category_changes'] = movers.reset_index().round(2)
+        
+        # Duplicate and unusual-spend questions use the precomputed anomaly findings
+        if re.search(r"\b(duplicat\w*|double[- ]?(paid|pay\w*|charged?)|unusual|anomal\w*|outliers?|suspicious)\b",
+                     question_lower):
+            findings = get_metrics_engine(data).spend_findings()
+            for name, key in (('duplicate_payments', 'duplicates'), ('spend_outliers', 'outliers')):
+                if not findings[key].empty:
+                    relevant_sources['filtered_data'][name] = findings[key].head(10)
+        
         # Check for amount/value filters
         if any(word in question_lower for word in ['top', 'highest', 'largest', 'biggest']):
             for table_name, df in relevant_sources['tables'].items():
@@ -283,57 +524,269 @@ class FinancialChatBot:
         
         return relevant_sources
     
-    def get_financial_analysis_with_sources(self, user_question: str, data: Dict) -> Tuple[str, Dict[str, Any]]:
+    def try_local_answer(self, user_question: str, data: Dict) -> Optional[Dict[str, Any]]:
+        """
+        Answer computable questions (totals, rates, rankings) locally without calling OpenAI.
+        
+        Only short lookup-style questions are considered; anything the router sees as
+        analysis or that matches no known metric returns None and should go to the LLM.
+        
+        Args:
+            user_question: The user's question
+            data: Dictionary containing all financial DataFrames and reports
+            
+        Returns:
+            Dictionary with intent, answer (markdown) and table (DataFrame or None), or None
+        """
+        if self.router.classify(user_question) != 'fast':
+            return None
+        
+        try:
+            local = LocalAnswerEngine(get_metrics_engine(data)).answer(user_question)
+            if local is not None:
+                metrics.increment('local_answers', intent=local['intent'])
+            return local
+        except Exception as e:
+            print(f"Error computing local answer: {e}")
+            return None
+    
+    @metrics.timed()
+    def retrieve_passages(self, user_question: str, data: Dict) -> List[Dict[str, Any]]:
+        """
+        Retrieve the top report sections and transaction descriptions for a question.
+        
+        Args:
+            user_question: The user's question
+            data: Dictionary containing all financial data
+            
+        Returns:
+            List of passages, best first
+        """
+        try:
+            return get_retrieval_index(data).search(user_question, k=self.retrieval_top_k)
+        except Exception as e:
+            print(f"Error searching retrieval index: {e}")
+            return []
+    
+    @staticmethod
+    def prepare_source_views(relevant_sources: Dict[str, Any]) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Precompute the display-ready slices shown in the "Data Sources" panel.
+        
+        Args:
+            relevant_sources: Output of extract_relevant_data
+            
+        Returns:
+            Dictionary with 'filtered_data' and 'tables' lists of {name, df, rows, source}, where
+            df is what is displayed and source is the full slice or table for exports
+        """
+        views = {'filtered_data': [], 'tables': []}
+        filtered_data = relevant_sources.get('filtered_data', {})
+        
+        for data_name, df in filtered_data.items():
+            if not df.empty:
+                views['filtered_data'].append({
+                    'name': data_name.replace('_', ' ').title(),
+                    'df': df,
+                    'rows': len(df),
+                    'source': df
+                })
+        
+        # Full tables are skipped when a filtered slice of them is already shown
+        filtered_tables = [name.split('_')[0] for name in filtered_data.keys()]
+        for table_name, df in relevant_sources.get('tables', {}).items():
+            if not df.empty and table_name not in filtered_tables:
+                views['tables'].append({
+                    'name': table_name.replace('_', ' ').title(),
+                    'df': df.head(10),
+                    'rows': len(df),
+                    'source': df
+                })
+        
+        return views
+    
+    def _assemble_sources(self, user_question: str, data: Dict, passages: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Extract relevant data and prepare its panel views (runs in a worker thread)."""
+        try:
+            relevant_sources = self.extract_relevant_data(user_question, data, passages=passages)
+            relevant_sources['views'] = self.prepare_source_views(relevant_sources)
+            return relevant_sources
+        except Exception as e:
+            print(f"Error assembling data sources: {e}")
+            return {'passages': passages}
+    
+    def get_financial_analysis_with_sources(self, user_question: str, data: Dict,
+                                            history: Optional[List[Dict[str, str]]] = None) -> Tuple[str, Dict[str, Any]]:
         """
         Get AI-powered financial analysis with relevant data sources.
         
         Args:
             user_question: The user's question about financial data
             data: Dictionary containing all financial DataFrames and reports
+            history: Prior conversation messages (e.g. from ConversationMemory.build_context)
             
         Returns:
             Tuple of (AI response, relevant data sources)
         """
+        response, sources_future = self.start_financial_analysis(user_question, data, history)
+        if isinstance(response, str):
+            return response, {}
+        return response, sources_future.result()
+    
+    def start_financial_analysis(self, user_question: str, data: Dict,
+                                 history: Optional[List[Dict[str, str]]] = None) -> Tuple[Any, Future]:
+        """
+        Send the streaming analysis request while the data sources are assembled in the background.
+        
+        Only the passage retrieval needed for the prompt runs up front; table extraction and
+        panel preparation overlap with the OpenAI request and the streamed response.
+        
+        Args:
+            user_question: The user's question about financial data
+            data: Dictionary containing all financial DataFrames and reports
+            history: Prior conversation messages (e.g. from ConversationMemory.build_context)
+            
+        Returns:
+            Tuple of (AI response stream or error message, future resolving to the relevant data sources)
+        """
         if not self.is_configured():
-            return "❌ OpenAI API key not configured. Please add your API key to the .env file.", {}
+            empty_sources = Future()
+            empty_sources.set_result({})
+            return "❌ OpenAI API key not configured. Please add your API key to the .env file.", empty_sources
+        
+        # Retrieval is fast and feeds the prompt; everything else for the panel runs concurrently
+        passages = self.retrieve_passages(user_question, data)
+        sources_future = _source_executor.submit(self._assemble_sources, user_question, data, passages)
         
         try:
-            # Extract relevant data sources
-            relevant_sources = self.extract_relevant_data(user_question, data)
-            
             # Check if question is about financial analysis or general conversation
-            financial_keywords = ['revenue', 'expense', 'profit', 'cash', 'invoice', 'bill', 'customer', 'vendor', 'financial', 'money', 'cost', 'income', 'balance', 'account']
-            needs_financial_data = any(keyword in user_question.lower() for keyword in financial_keywords)
+            needs_financial_data = self.router.needs_financial_data(user_question)
+            # Simple lookups and small talk go to the fast route, analysis to the deep one
+            route = self.router.classify(user_question)
+            
+            # Retrieved passages (report sections, transaction descriptions) matching the question
+            passages_context = format_passages(passages)
             
             if needs_financial_data:
                 # Prepare financial data summary for financial questions
-                financial_summary = self.prepare_financial_summary(data)
+                financial_summary = self.get_financial_summary(data, snapshot_fingerprint(data))
                 user_message = f"""
                 Based on the following financial data for Youtiva Technology Solutions:
                 
                 {financial_summary}
                 
+                RELEVANT EXCERPTS:
+                {passages_context or "- None"}
+                
                 User Question: {user_question}
                 
                 Please provide a detailed analysis with specific insights and actionable recommendations.
                 """
+            elif passages_context:
+                # Keyword check missed, but the data mentions what the user asked about
+                user_message = f"""
+                Relevant excerpts from Youtiva Technology Solutions' financial records:
+                
+                {passages_context}
+                
+                User Question: {user_question}
+                """
             else:
                 # For general questions, just use the question directly
                 user_message = user_question
             
             # Make API call to OpenAI with streaming
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
+            response = self._create_completion(
+                route=route,
                 messages=[
                     {"role": "system", "content": self.system_prompt},
+                    *(history or []),
                     {"role": "user", "content": user_message}
                 ],
-                max_tokens=1500,
-                temperature=0.7,
                 stream=True
             )
             
-            return response, relevant_sources
+            return response, sources_future
+            
+        except Exception as e:
+            error_msg = str(e).lower()
+            if "authentication" in error_msg or "api key" in error_msg:
+                error_response = "❌ Invalid OpenAI API key. Please check your API key in the .env file."
+            elif "rate limit" in error_msg:
+                error_response = "⏳ OpenAI API rate limit exceeded. Please try again later."
+            elif "quota" in error_msg:
+                error_response = "💳 OpenAI quota exceeded. Please check your billing."
+            else:
+                error_response = f"❌ Error generating analysis: {str(e)}"
+            
+            return error_response, sources_future
+    
+    def get_financial_analysis_with_tools(self, user_question: str, data: Dict, max_tool_rounds: int = 4,
+                                          history: Optional[List[Dict[str, str]]] = None) -> Tuple[str, Dict[str, Any]]:
+        """
+        Get AI-powered financial analysis where the model requests exact metrics via function calling.
+        
+        Instead of sending the full text summary, the model calls metrics tools that are
+        answered locally from cached aggregates and returned as compact JSON.
+        
+        Args:
+            user_question: The user's question about financial data
+            data: Dictionary containing all financial DataFrames and reports
+            max_tool_rounds: Maximum number of tool-calling round trips before forcing an answer
+            history: Prior conversation messages (e.g. from ConversationMemory.build_context)
+            
+        Returns:
+            Tuple of (AI response, dictionary of tool results keyed by call)
+        """
+        if not self.is_configured():
+            return "❌ OpenAI API key not configured. Please add your API key to the .env file.", {}
+        
+        try:
+            engine = get_metrics_engine(data)
+            route = self.router.classify(user_question)
+            tool_results = {}
+            messages = [
+                {"role": "system", "content": self.system_prompt + self.tool_prompt},
+                *(history or []),
+                {"role": "user", "content": user_question}
+            ]
+            
+            for round_number in range(max_tool_rounds + 1):
+                # On the last round, withhold tools so the model must answer
+                request_kwargs = {}
+                if round_number < max_tool_rounds:
+                    request_kwargs = {"tools": FinancialMetricsEngine.TOOL_DEFINITIONS, "tool_choice": "auto"}
+                
+                response = self._create_completion(
+                    route=route,
+                    messages=messages,
+                    **request_kwargs
+                )
+                message = response.choices[0].message
+                tool_calls = getattr(message, 'tool_calls', None)
+                
+                if not tool_calls:
+                    return (message.content or "").strip(), tool_results
+                
+                messages.append({
+                    "role": "assistant",
+                    "content": message.content,
+                    "tool_calls": [
+                        {
+                            "id": call.id,
+                            "type": "function",
+                            "function": {"name": call.function.name, "arguments": call.function.arguments}
+                        }
+                        for call in tool_calls
+                    ]
+                })
+                
+                for call in tool_calls:
+                    result = engine.execute_tool(call.function.name, call.function.arguments)
+                    tool_results[f"{call.function.name}({call.function.arguments})"] = json.loads(result)
+                    messages.append({"role": "tool", "tool_call_id": call.id, "content": result})
+            
+            return "❌ Error generating analysis: too many tool calls", tool_results
             
         except Exception as e:
             error_msg = str(e).lower()
@@ -364,12 +817,14 @@ class FinancialChatBot:
         
         try:
             # Check if question is about financial analysis or general conversation
-            financial_keywords = ['revenue', 'expense', 'profit', 'cash', 'invoice', 'bill', 'customer', 'vendor', 'financial', 'money', 'cost', 'income', 'balance', 'account']
-            needs_financial_data = any(keyword in user_question.lower() for keyword in financial_keywords)
+            needs_financial_data = self.router.needs_financial_data(user_question)
+            # Simple lookups and small talk go to the fast route, analysis to the deep one
+            route = self.router.classify(user_question)
+            data_fingerprint = snapshot_fingerprint(data)
             
             if needs_financial_data:
                 # Prepare financial data summary for financial questions
-                financial_summary = self.prepare_financial_summary(data)
+                financial_summary = self.get_financial_summary(data, data_fingerprint)
                 user_message = f"""
                 Based on the following financial data for Youtiva Technology Solutions:
                 
@@ -383,15 +838,14 @@ class FinancialChatBot:
                 # For general questions, just use the question directly
                 user_message = user_question
             
-            # Make API call to OpenAI with streaming
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
+            # Make API call to OpenAI with streaming; identical concurrent requests share one call
+            response = self._create_completion(
+                data_fingerprint=data_fingerprint,
+                route=route,
                 messages=[
                     {"role": "system", "content": self.system_prompt},
                     {"role": "user", "content": user_message}
                 ],
-                max_tokens=1500,
-                temperature=0.7,
                 stream=True
             )
             
@@ -423,8 +877,11 @@ class FinancialChatBot:
             return "❌ OpenAI API key not configured. Please add your API key to the .env file."
         
         try:
+            route = self.router.classify(user_question)
+            data_fingerprint = snapshot_fingerprint(data)
+            
             # Prepare financial data summary
-            financial_summary = self.prepare_financial_summary(data)
+            financial_summary = self.get_financial_summary(data, data_fingerprint)
             
             # Create the user message with context
             user_message = f"""
@@ -437,15 +894,14 @@ class FinancialChatBot:
             Please provide a detailed, professional analysis with specific insights and actionable recommendations.
             """
             
-            # Make API call to OpenAI without streaming
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
+            # Make API call to OpenAI without streaming; identical concurrent requests share one call
+            response = self._create_completion(
+                data_fingerprint=data_fingerprint,
+                route=route,
                 messages=[
                     {"role": "system", "content": self.system_prompt},
                     {"role": "user", "content": user_message}
                 ],
-                max_tokens=1500,
-                temperature=0.7,
                 stream=False
             )
             
@@ -0,0 +1,141 @@
+import re
+from typing import Any, Dict, List, Optional
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate (about four characters per token plus message overhead)."""
+    return len(text) // 4 + 4
+
+
+def _first_sentence(text: str, max_chars: int) -> str:
+    """Return the first sentence of a message, trimmed to max_chars."""
+    flat = re.sub(r"[#*_`>|]+", "", re.sub(r"\s+", " ", text)).strip()
+    match = re.match(r"(.+?[.!?])(\s|$)", flat)
+    sentence = match.group(1) if match else flat
+    return sentence if len(sentence) <= max_chars else sentence[:max_chars - 1].rstrip() + "…"
+
+
+class ConversationMemory:
+    """
+    Bounded memory for an AI assistant chat session.
+    Keeps recent turns verbatim and folds older turns into a rolling summary,
+    so the context sent per request stays within a fixed token budget. The last
+    exchange is always kept verbatim, even when a long answer alone exceeds the
+    budget, so follow-up questions can refer to it.
+    """
+
+    def __init__(self, context_token_budget: int = 1200, summary_token_budget: int = 300,
+                 max_stored_turns: int = 60, keep_last_turns: int = 2):
+        """
+        Initialize an empty conversation memory.
+
+        Args:
+            context_token_budget: Maximum tokens of history sent with each request
+            summary_token_budget: Maximum tokens kept in the rolling summary
+            max_stored_turns: Maximum turns kept verbatim before folding into the summary
+            keep_last_turns: Most recent turns always sent verbatim (2 = the last question and answer)
+        """
+        self.context_token_budget = context_token_budget
+        self.summary_token_budget = summary_token_budget
+        self.max_stored_turns = max_stored_turns
+        self.keep_last_turns = keep_last_turns
+        self.turns: List[Dict[str, Any]] = []
+        self.summary_lines: List[str] = []
+        # Index of the first turn not yet folded into the summary
+        self._summarized_upto = 0
+
+    def add(self, role: str, content: str, sources_id: Optional[int] = None):
+        """
+        Append a turn and evict the oldest turns beyond the storage cap.
+
+        Args:
+            role: "user" or "assistant"
+            content: Message text
+            sources_id: ID under which the turn's data sources were saved (e.g. a ChatHistoryStore turn ID)
+        """
+        turn = {"role": role, "content": content}
+        if sources_id is not None:
+            turn["sources_id"] = sources_id
+        self.turns.append(turn)
+
+        overflow = len(self.turns) - self.max_stored_turns
+        if overflow > 0:
+            self._summarize(self.turns[self._summarized_upto:overflow])
+            self.turns = self.turns[overflow:]
+            self._summarized_upto = max(0, self._summarized_upto - overflow)
+
+    def clear(self):
+        """Forget all turns and the summary."""
+        self.turns = []
+        self.summary_lines = []
+        self._summarized_upto = 0
+
+    def _summarize(self, turns: List[Dict[str, Any]]):
+        """Fold turns into the rolling summary, keeping it within its budget."""
+        for turn in turns:
+            speaker = "User asked" if turn["role"] == "user" else "Assistant answered"
+            self.summary_lines.append(f"- {speaker}: {_first_sentence(turn['content'], 160)}")
+
+        while self.summary_lines and estimate_tokens("\n".join(self.summary_lines)) > self.summary_token_budget:
+            self.summary_lines.pop(0)
+
+    @property
+    def summary(self) -> str:
+        """Rolling summary of turns that no longer fit in the context window."""
+        return "\n".join(self.summary_lines)
+
+    def build_context(self, exclude_last: bool = False) -> List[Dict[str, str]]:
+        """
+        Build the history messages to send with the next request.
+
+        The most recent turns are included verbatim while they fit the token
+        budget (the last keep_last_turns always are); anything older is folded
+        into the rolling summary.
+
+        Args:
+            exclude_last: Skip the newest turn (e.g. the question being asked now)
+
+        Returns:
+            List of chat messages, starting with the summary if there is one
+        """
+        turns = self.turns[:-1] if exclude_last and self.turns else self.turns
+        # Reserve room for the summary at its maximum size
+        budget = self.context_token_budget - self.summary_token_budget
+
+        window_start = len(turns)
+        used = 0
+        while window_start > 0:
+            cost = estimate_tokens(turns[window_start - 1]["content"])
+            if used + cost > budget and window_start <= len(turns) - self.keep_last_turns:
+                break
+            used += cost
+            window_start -= 1
+
+        # Turns that slid out of the window are summarized exactly once
+        if window_start > self._summarized_upto:
+            self._summarize(turns[self._summarized_upto:window_start])
+            self._summarized_upto = window_start
+
+        messages = []
+        if self.summary_lines:
+            messages.append({
+                "role": "system",
+                "content": f"Summary of earlier conversation:\n{self.summary}"
+            })
+        messages.extend({"role": turn["role"], "content": turn["content"]} for turn in turns[window_start:])
+
+        return messages
+
+    def visible_turns(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Return the turns to render in the chat history.
+
+        Args:
+            limit: Maximum number of most recent turns to return
+
+        Returns:
+            List of turns, oldest first
+        """
+        if limit is None or limit >= len(self.turns):
+            return list(self.turns)
+        return self.turns[-limit:]
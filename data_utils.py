@@ -1,8 +1,12 @@
 import pandas as pd
 import os
+import hashlib
 from typing import Dict, Optional, List
 from datetime import datetime
 import numpy as np
+from pandas.api.types import is_datetime64_any_dtype as is_datetime
+
+from instrumentation import metrics
 
 class DataLoader:
     """
@@ -10,6 +14,34 @@ class DataLoader:
     Handles data validation, type conversion, and error handling.
     """
     
+    # Column types applied by load_table (the same conversions as the load_* methods)
+    TABLE_TYPES = {
+        'chart_of_accounts': {'numeric': ['balance'], 'ids': ['account_code']},
+        'vendors': {'bools': ['active'], 'ids': ['vendor_id'], 'lower': ['email']},
+        'expenses': {'dates': ['date'], 'numeric': ['amount'], 'ids': ['expense_id', 'vendor_id']},
+        'bills': {'dates': ['date_issued', 'due_date', 'payment_date'], 'numeric': ['amount'],
+                  'ids': ['bill_id', 'vendor_id']},
+        'customers': {'bools': ['active'], 'numeric': ['credit_limit'], 'ids': ['customer_id'], 'lower': ['email']},
+        'invoices': {'dates': ['date_issued', 'due_date', 'payment_date'],
+                     'numeric': ['amount', 'tax_amount', 'discount_amount'], 'ids': ['invoice_id', 'customer_id']},
+        'services': {'bools': ['active'], 'numeric': ['hourly_rate', 'standard_price'], 'ids': ['service_id']}
+    }
+    
+    # Row order of each table as returned by the load_* methods: (column, ascending)
+    TABLE_ORDER = {
+        'chart_of_accounts': ('account_code', True),
+        'expenses': ('date', False),
+        'bills': ('due_date', True),
+        'invoices': ('date_issued', False),
+        'services': ('service_name', True)
+    }
+    
+    # Tables that get a derived days_overdue column (from due_date and status)
+    OVERDUE_TABLES = ('bills', 'invoices')
+    
+    # Rows parsed per chunk when filtering a CSV file, bounding memory to the matching rows
+    FILTER_CHUNK_ROWS = 200_000
+    
     def __init__(self, data_directory: str = "data"):
         """
         Initialize DataLoader with the path to data directory.
@@ -87,6 +119,7 @@ class DataLoader:
             print(f"Unexpected error loading {file_path}: {e}")
             return pd.DataFrame()
     
+    @metrics.timed()
     def load_chart_of_accounts(self) -> pd.DataFrame:
         """
         Load and process chart of accounts data.
@@ -105,10 +138,11 @@ class DataLoader:
             df['account_code'] = df['account_code'].astype(str)
             
             # Sort by account code
-            df = df.sort_values('account_code')
+            df = df.sort_values('account_code', kind='stable')
         
         return df
     
+    @metrics.timed()
     def load_vendors(self) -> pd.DataFrame:
         """
         Load and process vendors data.
@@ -132,6 +166,7 @@ class DataLoader:
         
         return df
     
+    @metrics.timed()
     def load_expenses(self) -> pd.DataFrame:
         """
         Load and process expenses data.
@@ -155,10 +190,11 @@ class DataLoader:
             df['vendor_id'] = df['vendor_id'].astype(str)
             
             # Sort by date (newest first)
-            df = df.sort_values('date', ascending=False, na_position='last')
+            df = df.sort_values('date', ascending=False, na_position='last', kind='stable')
         
         return df
     
+    @metrics.timed()
     def load_bills(self) -> pd.DataFrame:
         """
         Load and process bills data.
@@ -185,17 +221,14 @@ class DataLoader:
             
             # Add days overdue calculation for outstanding bills
             if 'due_date' in df.columns and 'status' in df.columns:
-                current_date = datetime.now()
-                df['days_overdue'] = df.apply(lambda row: 
-                    max(0, (current_date - row['due_date']).days) 
-                    if row['status'] == 'Outstanding' and pd.notna(row['due_date']) 
-                    else 0, axis=1)
+                df['days_overdue'] = self._days_overdue(df)
             
             # Sort by due date
-            df = df.sort_values('due_date', ascending=True, na_position='last')
+            df = df.sort_values('due_date', ascending=True, na_position='last', kind='stable')
         
         return df
     
+    @metrics.timed()
     def load_customers(self) -> pd.DataFrame:
         """
         Load and process customers data.
@@ -222,6 +255,7 @@ class DataLoader:
         
         return df
     
+    @metrics.timed()
     def load_invoices(self) -> pd.DataFrame:
         """
         Load and process invoices data.
@@ -251,17 +285,14 @@ class DataLoader:
             
             # Add days overdue calculation for outstanding invoices
             if 'due_date' in df.columns and 'status' in df.columns:
-                current_date = datetime.now()
-                df['days_overdue'] = df.apply(lambda row: 
-                    max(0, (current_date - row['due_date']).days) 
-                    if row['status'] == 'Outstanding' and pd.notna(row['due_date']) 
-                    else 0, axis=1)
+                df['days_overdue'] = self._days_overdue(df)
             
             # Sort by date issued (newest first)
-            df = df.sort_values('date_issued', ascending=False, na_position='last')
+            df = df.sort_values('date_issued', ascending=False, na_position='last', kind='stable')
         
         return df
     
+    @metrics.timed()
     def load_services(self) -> pd.DataFrame:
         """
         Load and process services data.
@@ -286,10 +317,11 @@ class DataLoader:
             df['service_id'] = df['service_id'].astype(str)
             
             # Sort by service name
-            df = df.sort_values('service_name')
+            df = df.sort_values('service_name', kind='stable')
         
         return df
     
+    @metrics.timed()
     def load_markdown_report(self, report_name: str) -> str:
         """
         Load markdown report file.
@@ -311,6 +343,7 @@ class DataLoader:
         except Exception as e:
             return f"Error loading {report_name}: {str(e)}"
     
+    @metrics.timed()
     def load_all_reports(self) -> Dict[str, str]:
         """
         Load all markdown financial reports.
@@ -326,6 +359,7 @@ class DataLoader:
         
         return reports
     
+    @metrics.timed()
     def load_all_data(self) -> Dict[str, pd.DataFrame]:
         """
         Load all financial data files.
@@ -355,6 +389,213 @@ class DataLoader:
         
         return data
     
+    def load_all_data_shared(self) -> Dict:
+        """
+        Load all tables and reports through a shared memory-mapped Arrow snapshot.
+        
+        The first process to see a given version of the files publishes the snapshot;
+        every other process maps it read-only instead of parsing the CSVs. Falls back to
+        a regular load when snapshots are disabled or pyarrow is unavailable.
+        
+        Returns:
+            Dictionary containing all DataFrames and markdown reports (treat as read-only)
+        """
+        from arrow_snapshots import get_snapshot_store
+        
+        store = get_snapshot_store()
+        if store is not None:
+            try:
+                return store.load_or_publish(self)
+            except Exception as e:
+                print(f"Error using Arrow snapshot, loading CSV files instead: {e}")
+        
+        data = self.load_all_data()
+        data.update(self.load_all_reports())
+        return data
+    
+    def _convert_types(self, name: str, df: pd.DataFrame) -> pd.DataFrame:
+        """Apply TABLE_TYPES conversions to whichever of the columns were loaded."""
+        types = self.TABLE_TYPES.get(name, {})
+        for col in types.get('dates', []):
+            if col in df.columns:
+                df[col] = pd.to_datetime(df[col], errors='coerce')
+        for col in types.get('numeric', []):
+            if col in df.columns:
+                df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
+        for col in types.get('bools', []):
+            if col in df.columns:
+                df[col] = df[col].map({'TRUE': True, 'FALSE': False, True: True, False: False})
+        for col in types.get('ids', []):
+            if col in df.columns:
+                df[col] = df[col].astype(str)
+        for col in types.get('lower', []):
+            if col in df.columns:
+                df[col] = df[col].str.lower().str.strip()
+        return df
+    
+    @staticmethod
+    def _days_overdue(df: pd.DataFrame) -> pd.Series:
+        """Days past due of outstanding rows (0 for paid rows and rows without a due date)."""
+        overdue = (pd.Timestamp(datetime.now()) - df['due_date']).dt.days.clip(lower=0)
+        outstanding = (df['status'] == 'Outstanding') & df['due_date'].notna()
+        return overdue.where(outstanding, 0).astype('int64')
+    
+    @staticmethod
+    def _filter_mask(df: pd.DataFrame, filters: Dict) -> pd.Series:
+        """Boolean mask of the rows matching every filter (see load_table)."""
+        mask = pd.Series(True, index=df.index)
+        for col, value in filters.items():
+            if isinstance(value, tuple):
+                start, end = value
+                if start is not None:
+                    mask &= df[col] >= (pd.Timestamp(start) if is_datetime(df[col]) else start)
+                if end is not None:
+                    mask &= df[col] <= (pd.Timestamp(end) if is_datetime(df[col]) else end)
+            elif isinstance(value, (list, set, frozenset)):
+                mask &= df[col].isin(list(value))
+            else:
+                mask &= df[col] == value
+        return mask.fillna(False)
+    
+    @staticmethod
+    def _filter_expression(schema, filters: Dict):
+        """The filters of load_table as a pyarrow dataset expression, with values cast to column types."""
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+        
+        def scalar(col, value):
+            value = pd.Timestamp(value).to_pydatetime() if pa.types.is_timestamp(schema.field(col).type) else value
+            return pa.scalar(value).cast(schema.field(col).type)
+        
+        expression = None
+        for col, value in filters.items():
+            field = ds.field(col)
+            if isinstance(value, tuple):
+                start, end = value
+                parts = ([field >= scalar(col, start)] if start is not None else []) + \
+                    ([field <= scalar(col, end)] if end is not None else [])
+            elif isinstance(value, (list, set, frozenset)):
+                parts = [field.isin(pa.array([scalar(col, v) for v in value], type=schema.field(col).type))]
+            else:
+                parts = [field == scalar(col, value)]
+            for part in parts:
+                expression = part if expression is None else expression & part
+        return expression
+    
+    def _read_snapshot_table(self, name: str, columns: Optional[List[str]], filters: Dict) -> Optional[pd.DataFrame]:
+        """Read a projection of a table from the already-published Arrow snapshot, if there is one."""
+        from arrow_snapshots import get_snapshot_store, source_signature
+        
+        store = get_snapshot_store()
+        path = store.table_path(source_signature(self.file_paths), name) if store is not None else None
+        if path is None:
+            return None
+        
+        import pyarrow.dataset as ds
+        
+        dataset = ds.dataset(path, format='ipc')
+        missing = (set(columns or []) | set(filters)) - set(dataset.schema.names)
+        if missing:
+            raise ValueError(f"Unknown columns for {name}: {sorted(missing)}")
+        table = dataset.to_table(columns=columns, filter=self._filter_expression(dataset.schema, filters) if filters else None)
+        return table.to_pandas()
+    
+    def _read_csv_table(self, name: str, columns: Optional[List[str]], filters: Dict) -> pd.DataFrame:
+        """Read a projection of a table from CSV chunk by chunk, shaped like the load_* methods."""
+        file_path = self.file_paths[name]
+        if not self.validate_file_exists(file_path):
+            raise FileNotFoundError(f"File not found: {file_path}")
+        
+        available = list(pd.read_csv(file_path, nrows=0).columns)
+        overdue = name in self.OVERDUE_TABLES and {'due_date', 'status'} <= set(available)
+        known = available + (['days_overdue'] if overdue else [])
+        missing = (set(columns or []) | set(filters)) - set(known)
+        if missing:
+            raise ValueError(f"Unknown columns for {name}: {sorted(missing)}")
+        
+        output = list(columns) if columns is not None else known
+        sort_column, ascending = self.TABLE_ORDER.get(name, (None, True))
+        # Parse only the requested, filtered and sort columns (and the inputs of derived columns)
+        needed = set(output) | set(filters) | {sort_column}
+        if 'days_overdue' in needed:
+            needed |= {'due_date', 'status'}
+        usecols = [col for col in available if col in needed]
+        
+        chunks = []
+        for chunk in pd.read_csv(file_path, usecols=usecols, chunksize=self.FILTER_CHUNK_ROWS):
+            chunk = self._convert_types(name, chunk)
+            if 'days_overdue' in needed:
+                chunk['days_overdue'] = self._days_overdue(chunk)
+            chunks.append(chunk[self._filter_mask(chunk, filters)] if filters else chunk)
+        df = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=output)
+        
+        if sort_column in df.columns:
+            df = df.sort_values(sort_column, ascending=ascending, na_position='last', kind='stable')
+        return df[output].reset_index(drop=True)
+    
+    @metrics.timed()
+    def load_table(self, name: str, columns: Optional[List[str]] = None, filters: Optional[Dict] = None) -> pd.DataFrame:
+        """
+        Load only the needed columns and rows of a table.
+        
+        Columns and filters are pushed down into the reader: an already-published Arrow
+        snapshot is scanned with a pyarrow dataset projection and filter, otherwise the
+        CSV is parsed with usecols in chunks that keep only matching rows. Either way
+        the result matches the load_* methods: the same types, the derived
+        days_overdue column and the same row order, with columns in the requested
+        order (or the load_* order when all columns are loaded).
+        
+        Args:
+            name: Table name (a key of TABLE_TYPES)
+            columns: Columns to return (default: all)
+            filters: Column -> condition, all of which must hold. A scalar matches equal
+                values, a list or set matches any of its values, and a (start, end) tuple
+                is an inclusive range (either end may be None), e.g.
+                {'status': 'Outstanding', 'date': ('2024-01-01', None), 'active': True}
+                
+        Returns:
+            DataFrame with the requested columns of the matching rows
+            
+        Raises:
+            ValueError: If the table or a requested/filtered column is unknown
+            FileNotFoundError: If the table's CSV file does not exist
+        """
+        if name not in self.TABLE_TYPES:
+            raise ValueError(f"Unknown table: {name}")
+        filters = filters or {}
+        
+        try:
+            df = self._read_snapshot_table(name, columns, filters)
+        except (OSError, ImportError) as e:
+            print(f"Error reading {name} from Arrow snapshot, reading CSV instead: {e}")
+            df = None
+        
+        if df is None:
+            df = self._read_csv_table(name, columns, filters)
+        metrics.increment('projected_rows_loaded', len(df), table=name)
+        return df
+    
+    def load_projected(self, columns: Dict[str, Optional[List[str]]],
+                       filters: Optional[Dict[str, Dict]] = None) -> Dict[str, pd.DataFrame]:
+        """
+        Load several tables through load_table.
+        
+        Args:
+            columns: Table name -> columns to load (None for all columns)
+            filters: Optional table name -> filters (see load_table)
+            
+        Returns:
+            Dictionary of table name to DataFrame (empty DataFrame if a table fails to load)
+        """
+        data = {}
+        for name, table_columns in columns.items():
+            try:
+                data[name] = self.load_table(name, table_columns, (filters or {}).get(name))
+            except Exception as e:
+                print(f"❌ Error loading {name}: {e}")
+                data[name] = pd.DataFrame(columns=table_columns)
+        return data
+    
     def get_data_summary(self) -> Dict[str, dict]:
         """
         Get a summary of all data files including record counts and basic statistics.
@@ -362,7 +603,8 @@ class DataLoader:
         Returns:
             Dictionary containing summary statistics for each dataset
         """
-        data = self.load_all_data()
+        # Reads the published Arrow snapshot when there is one instead of parsing every CSV
+        data = self.load_projected({name: None for name in self.TABLE_TYPES})
         summary = {}
         
         for name, df in data.items():
@@ -395,46 +637,46 @@ class DataLoader:
         
         return summary
     
-    def validate_data_integrity(self) -> Dict[str, List[str]]:
+    def get_validation_report(self, data: Optional[Dict[str, pd.DataFrame]] = None,
+                              new_rows: Optional[Dict[str, pd.DataFrame]] = None,
+                              sample_limit: int = 20) -> Dict[str, List[dict]]:
+        """
+        Run the full validation engine and return per-row details.
+        
+        Args:
+            data: Already-loaded data (loaded from disk if omitted)
+            new_rows: Optional newly appended rows by table; only these are validated
+            sample_limit: Maximum offending rows reported per issue
+            
+        Returns:
+            Dictionary of table name to issues (see DataValidator.validate)
+        """
+        from data_validation import DataValidator
+        
+        if data is None:
+            data = self.load_all_data()
+        return DataValidator(sample_limit=sample_limit).validate(data, new_rows)
+    
+    @metrics.timed()
+    def validate_data_integrity(self, data: Optional[Dict[str, pd.DataFrame]] = None,
+                                new_rows: Optional[Dict[str, pd.DataFrame]] = None) -> Dict[str, List[str]]:
         """
         Validate data integrity across all datasets.
         
+        Checks primary key uniqueness, foreign keys (expenses/bills to vendors, invoices to
+        customers, every account_code to the chart of accounts), negative amounts and
+        future dates.
+        
+        Args:
+            data: Already-loaded data (loaded from disk if omitted)
+            new_rows: Optional newly appended rows by table; only these are validated
+            
         Returns:
             Dictionary containing validation issues for each dataset
         """
-        data = self.load_all_data()
-        issues = {}
+        from data_validation import summarize_issues
         
-        # Check for missing required fields
-        for name, df in data.items():
-            dataset_issues = []
-            
-            if df.empty:
-                dataset_issues.append("Dataset is empty")
-                continue
-            
-            # Check for duplicate IDs
-            id_columns = [col for col in df.columns if col.endswith('_id')]
-            for id_col in id_columns:
-                if df[id_col].duplicated().any():
-                    dataset_issues.append(f"Duplicate {id_col} found")
-            
-            # Check for negative amounts where not expected
-            if 'amount' in df.columns:
-                if (df['amount'] < 0).any():
-                    dataset_issues.append("Negative amounts found")
-            
-            # Check for future dates in historical data
-            date_columns = [col for col in df.columns if 'date' in col.lower()]
-            for date_col in date_columns:
-                if date_col in df.columns:
-                    future_dates = df[df[date_col] > datetime.now()][date_col]
-                    if not future_dates.empty:
-                        dataset_issues.append(f"Future dates found in {date_col}")
-            
-            issues[name] = dataset_issues
-        
-        return issues
+        return summarize_issues(self.get_validation_report(data, new_rows, sample_limit=3))
 
 # Utility functions for data analysis
 class FinancialAnalyzer:
@@ -481,16 +723,72 @@ class FinancialAnalyzer:
         
         return customer_revenue.nlargest(top_n, 'amount')
     
+    @staticmethod
+    def _monthly_breakdown(data: Dict, table: str, dimension: str, column: str) -> pd.DataFrame:
+        """Months x members with transactions, read from the snapshot's cached trend cube."""
+        from metrics_engine import get_metrics_engine
+        
+        trend = get_metrics_engine(data).trend_cube().slice(table, dimension)
+        trend = trend[trend['count'] > 0].rename(columns={dimension: column})
+        return trend.sort_values(['month', column]).reset_index(drop=True)
+    
     @staticmethod
     def get_expense_trends(data: Dict[str, pd.DataFrame]) -> pd.DataFrame:
-        """Analyze expense trends over time."""
-        expenses = data['expenses'].copy()
-        expenses['date'] = pd.to_datetime(expenses['date'])
-        expenses['month'] = expenses['date'].dt.to_period('M')
+        """
+        Analyze expense trends over time.
+        
+        Returns:
+            One row per month and category with transactions: month, category, amount
+        """
+        trend = FinancialAnalyzer._monthly_breakdown(data, 'expenses', 'category', 'category')
+        return trend[['month', 'category', 'amount']]
+    
+    @staticmethod
+    def get_expense_trend_cube(data: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+        """
+        Expense trends with rolling and period-over-period figures.
+        
+        Returns:
+            One row per month and category with amount, rolling 3/6/12-month sums and
+            month-over-month / year-over-year changes
+        """
+        return FinancialAnalyzer._monthly_breakdown(data, 'expenses', 'category', 'category')
+    
+    @staticmethod
+    def get_revenue_trend_cube(data: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+        """
+        Invoiced revenue trends with rolling and period-over-period figures.
         
-        monthly_expenses = expenses.groupby(['month', 'category'])['amount'].sum().reset_index()
+        Returns:
+            One row per month and revenue account with amount, rolling 3/6/12-month sums
+            and month-over-month / year-over-year changes
+        """
+        return FinancialAnalyzer._monthly_breakdown(data, 'invoices', 'account', 'account_code')
+
+def compute_data_fingerprint(data: Dict) -> str:
+    """
+    Compute a stable content fingerprint for a loaded data snapshot.
+    
+    Args:
+        data: Dictionary containing financial DataFrames and reports
         
-        return monthly_expenses
+    Returns:
+        Short hex digest that changes whenever any table or report changes
+    """
+    hasher = hashlib.sha1()
+    
+    for name in sorted(data):
+        value = data[name]
+        hasher.update(name.encode('utf-8'))
+        
+        if isinstance(value, pd.DataFrame):
+            hasher.update(f"{value.shape}|{','.join(map(str, value.columns))}".encode('utf-8'))
+            if not value.empty:
+                hasher.update(pd.util.hash_pandas_object(value, index=False).values.tobytes())
+        elif isinstance(value, str):
+            hasher.update(value.encode('utf-8'))
+    
+    return hasher.hexdigest()[:16]
 
 # Example usage and testing
 if __name__ == "__main__":
@@ -0,0 +1,252 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import metrics
+
+
+def _plain(value: Any) -> Any:
+    """JSON-friendly version of a cell value for issue reports."""
+    if pd.isna(value):
+        return None
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value.item() if isinstance(value, np.generic) else value
+
+
+class DataValidator:
+    """
+    Vectorized integrity checks across the financial datasets.
+    Every check is a column-wise mask (hash-set membership via isin for keys),
+    so cost grows linearly with rows; offending rows are reported with their
+    primary key up to a sample cap. Can validate only newly appended rows
+    against an already-loaded snapshot.
+    """
+
+    # Primary key of each table
+    PRIMARY_KEYS = {
+        'chart_of_accounts': 'account_code',
+        'vendors': 'vendor_id',
+        'customers': 'customer_id',
+        'expenses': 'expense_id',
+        'bills': 'bill_id',
+        'invoices': 'invoice_id',
+        'services': 'service_id'
+    }
+
+    # (table, column, referenced table, referenced column, required)
+    FOREIGN_KEYS = [
+        ('expenses', 'vendor_id', 'vendors', 'vendor_id', True),
+        ('bills', 'vendor_id', 'vendors', 'vendor_id', True),
+        ('invoices', 'customer_id', 'customers', 'customer_id', True),
+        ('expenses', 'account_code', 'chart_of_accounts', 'account_code', True),
+        ('bills', 'account_code', 'chart_of_accounts', 'account_code', True),
+        ('invoices', 'account_code', 'chart_of_accounts', 'account_code', True),
+        ('services', 'account_code', 'chart_of_accounts', 'account_code', True),
+        ('chart_of_accounts', 'parent_account', 'chart_of_accounts', 'account_code', False)
+    ]
+
+    # Date columns that legitimately hold future dates
+    FUTURE_DATE_ALLOWED = {'due_date'}
+
+    # String values the loaders produce for missing keys (e.g. astype(str) on NaN)
+    MISSING_KEY_VALUES = ['', 'nan', 'None', 'NaT', '<NA>']
+
+    def __init__(self, sample_limit: int = 20, now: Optional[datetime] = None):
+        """
+        Initialize the validator.
+
+        Args:
+            sample_limit: Maximum offending rows reported per issue
+            now: Reference time for the future-date check (defaults to the time of each run)
+        """
+        self.sample_limit = sample_limit
+        self.now = now
+
+    @classmethod
+    def _missing_mask(cls, values: pd.Series) -> pd.Series:
+        mask = values.isna()
+        if values.dtype == object or pd.api.types.is_string_dtype(values):
+            mask |= values.isin(cls.MISSING_KEY_VALUES)
+        return mask
+
+    @staticmethod
+    def _align_keys(keys: pd.Series, like: pd.Series) -> pd.Series:
+        """
+        Convert referenced keys to the referencing column's kind, so membership is
+        tested without converting the (much larger) referencing column.
+        """
+        keys = keys.dropna()
+        if pd.api.types.is_numeric_dtype(like):
+            return pd.to_numeric(keys, errors='coerce').dropna()
+        if pd.api.types.is_float_dtype(keys) and (keys % 1 == 0).all():
+            # Integer codes parsed as floats: 6220.0 -> "6220"
+            keys = keys.astype('int64')
+        return keys.astype(str)
+
+    def _issue(self, check: str, df: pd.DataFrame, mask: pd.Series, column: str, key: Optional[str],
+               message: str) -> Dict[str, Any]:
+        """Build an issue record with a capped sample of offending rows."""
+        count = int(mask.sum())
+        columns = [c for c in dict.fromkeys([key, column]) if c is not None and c in df.columns]
+        sample = df.loc[mask, columns].head(self.sample_limit)
+        rows = [
+            {'row': index, **{c: _plain(v) for c, v in values.items()}}
+            for index, values in zip(sample.index.tolist(), sample.to_dict('records'))
+        ]
+        return {'check': check, 'column': column, 'count': count, 'message': message.format(count=count), 'rows': rows}
+
+    def _check_table(self, name: str, df: pd.DataFrame, existing: Optional[pd.DataFrame],
+                     now: pd.Timestamp) -> List[Dict[str, Any]]:
+        """Checks that only need the table itself (plus existing rows for key uniqueness)."""
+        issues = []
+        key = self.PRIMARY_KEYS.get(name)
+
+        if key and key in df.columns:
+            missing = self._missing_mask(df[key])
+            if missing.any():
+                issues.append(self._issue('missing_key', df, missing, key, key, f"Missing {key} in {{count}} rows"))
+
+            duplicated = df[key].duplicated(keep=False) & ~missing
+            if existing is not None and key in existing.columns:
+                duplicated |= df[key].isin(existing[key]) & ~missing
+            if duplicated.any():
+                issues.append(self._issue('duplicate_key', df, duplicated, key, key,
+                                          f"Duplicate {key} found in {{count}} rows"))
+
+        if 'amount' in df.columns:
+            negative = pd.to_numeric(df['amount'], errors='coerce') < 0
+            if negative.any():
+                issues.append(self._issue('negative_amount', df, negative, 'amount', key,
+                                          "Negative amounts found in {count} rows"))
+
+        for column in df.columns:
+            if 'date' not in column.lower() or column in self.FUTURE_DATE_ALLOWED:
+                continue
+            dates = df[column] if pd.api.types.is_datetime64_any_dtype(df[column]) else \
+                pd.to_datetime(df[column], errors='coerce')
+            future = dates > now
+            if future.any():
+                issues.append(self._issue('future_date', df, future, column, key,
+                                          f"Future dates found in {column} ({{count}} rows)"))
+
+        return issues
+
+    def _check_foreign_key(self, df: pd.DataFrame, column: str, target_keys: pd.Series,
+                           target_name: str, required: bool, key: Optional[str]) -> List[Dict[str, Any]]:
+        values = df[column]
+        missing = self._missing_mask(values)
+        issues = []
+
+        if required and missing.any():
+            issues.append(self._issue('missing_foreign_key', df, missing, column, key,
+                                      f"Missing {column} in {{count}} rows"))
+
+        orphaned = ~missing & ~values.isin(self._align_keys(target_keys, values))
+        if orphaned.any():
+            issues.append(self._issue('foreign_key', df, orphaned, column, key,
+                                      f"{{count}} rows reference a {column} not in {target_name}"))
+        return issues
+
+    def validate(self, data: Dict[str, Any], new_rows: Optional[Dict[str, pd.DataFrame]] = None) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Run every check.
+
+        Args:
+            data: Dictionary of loaded DataFrames (non-DataFrame entries such as reports are ignored)
+            new_rows: Optional rows about to be appended, by table. When given, only these
+                rows are checked: keys must not collide with `data`, and references may point
+                at rows in `data` or in `new_rows`.
+
+        Returns:
+            Dictionary of table name to a list of issues, each with check, column, count,
+            message and a capped sample of offending rows (index plus key and column values)
+        """
+        # Evaluated once per run rather than per table or row
+        now = pd.Timestamp(self.now or datetime.now())
+        tables = {name: df for name, df in data.items() if isinstance(df, pd.DataFrame)}
+        checked = tables if new_rows is None else new_rows
+
+        def referenced_keys(table: str, column: str) -> pd.Series:
+            parts = [source[table][column] for source in (tables, new_rows or {})
+                     if table in source and column in source[table].columns]
+            return pd.concat(parts, ignore_index=True) if parts else pd.Series([], dtype=object)
+
+        issues: Dict[str, List[Dict[str, Any]]] = {}
+        for name, df in checked.items():
+            with metrics.span('validate_table', table=name):
+                if df.empty:
+                    issues[name] = [{'check': 'empty', 'column': None, 'count': 0,
+                                     'message': "Dataset is empty", 'rows': []}]
+                    continue
+
+                existing = tables.get(name) if new_rows is not None else None
+                table_issues = self._check_table(name, df, existing, now)
+                key = self.PRIMARY_KEYS.get(name)
+
+                for table, column, target_name, target_column, required in self.FOREIGN_KEYS:
+                    if table != name or column not in df.columns:
+                        continue
+                    target_keys = referenced_keys(target_name, target_column)
+                    if target_keys.empty:
+                        continue
+                    table_issues += self._check_foreign_key(df, column, target_keys, target_name, required, key)
+                issues[name] = table_issues
+
+        return issues
+
+
+def summarize_issues(issues: Dict[str, List[Dict[str, Any]]], examples: int = 3) -> Dict[str, List[str]]:
+    """
+    Flatten validation issues to human-readable messages.
+
+    Args:
+        issues: Result of DataValidator.validate
+        examples: Offending keys quoted per message
+
+    Returns:
+        Dictionary of table name to messages
+    """
+    summary = {}
+    for name, table_issues in issues.items():
+        messages = []
+        for issue in table_issues:
+            message = issue['message']
+            sample_keys: List[Any] = []
+            for row in issue['rows'][:examples]:
+                values = [v for k, v in row.items() if k != 'row' and v is not None]
+                sample_keys.append(values[0] if values else row['row'])
+            if sample_keys:
+                message += f" (e.g. {', '.join(map(str, sample_keys))})"
+            messages.append(message)
+        summary[name] = messages
+    return summary
+
+
+# Example usage and testing
+if __name__ == "__main__":
+    import sys
+    import time
+
+    from data_utils import DataLoader
+
+    directory = sys.argv[1] if len(sys.argv) > 1 else "data"
+    loader = DataLoader(directory)
+    data = loader.load_all_data()
+
+    started = time.perf_counter()
+    issues = DataValidator(sample_limit=5).validate(data)
+    elapsed = time.perf_counter() - started
+
+    for name, messages in summarize_issues(issues).items():
+        print(f"{name}: {'; '.join(messages) if messages else 'No issues found'}")
+    print(f"\nValidated {sum(len(df) for df in data.values()):,} rows in {elapsed:.2f}s")
+
+    # Incremental validation of rows about to be appended
+    new_expenses = data['expenses'].head(2).copy()
+    new_expenses['vendor_id'] = ['V999', new_expenses['vendor_id'].iloc[1]]
+    started = time.perf_counter()
+    new_issues = DataValidator().validate(data, new_rows={'expenses': new_expenses})
+    print(f"New rows: {summarize_issues(new_issues)} ({(time.perf_counter() - started) * 1000:.1f} ms)")
@@ -0,0 +1,229 @@
+import os
+import re
+import tempfile
+import time
+from typing import Dict, Iterator, List, Optional
+
+import pandas as pd
+
+from instrumentation import metrics
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - pyarrow ships with Streamlit, but stay usable without it
+    pa = None
+    pq = None
+
+try:
+    import xlsxwriter
+except ImportError:  # pragma: no cover - Excel export is optional
+    xlsxwriter = None
+
+
+# MIME type and file extension of each export format
+EXPORT_FORMATS = {
+    'csv': ('text/csv', '.csv'),
+    'parquet': ('application/vnd.apache.parquet', '.parquet'),
+    'xlsx': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', '.xlsx')
+}
+
+# Rows converted and written per batch; bounds the memory an export adds on top of the view
+CHUNK_ROWS = 100_000
+
+# Data rows per Excel worksheet (the format's limit is 1,048,576 rows including the header)
+EXCEL_MAX_ROWS = 1_048_575
+
+
+def available_formats() -> List[str]:
+    """Export formats whose writer libraries are installed."""
+    return [fmt for fmt in EXPORT_FORMATS
+            if (fmt != 'parquet' or pq is not None) and (fmt != 'xlsx' or xlsxwriter is not None)]
+
+
+def iter_batches(df: pd.DataFrame, chunk_rows: int = CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """Consecutive row slices of a DataFrame (views, not copies)."""
+    for start in range(0, len(df), chunk_rows):
+        yield df.iloc[start:start + chunk_rows]
+
+
+def write_csv(df: pd.DataFrame, path: str, chunk_rows: int = CHUNK_ROWS):
+    """Write a DataFrame to CSV one batch at a time."""
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        df.head(0).to_csv(f, index=False)
+        for batch in iter_batches(df, chunk_rows):
+            batch.to_csv(f, index=False, header=False)
+
+
+def _arrow_schema(df: pd.DataFrame) -> "pa.Schema":
+    """
+    Arrow schema for the whole DataFrame, inferred from a sample of rows.
+
+    Columns that are empty in the sample are typed from their first non-null value,
+    so a later batch cannot introduce a type the file's schema does not allow.
+    """
+    schema = pa.Schema.from_pandas(df.head(1000), preserve_index=False)
+    for i, field in enumerate(schema):
+        if pa.types.is_null(field.type):
+            first = df[field.name].first_valid_index()
+            if first is not None:
+                sample = pa.Array.from_pandas(df[field.name].loc[[first]])
+                schema = schema.set(i, pa.field(field.name, sample.type))
+    return schema
+
+
+def write_parquet(df: pd.DataFrame, path: str, chunk_rows: int = CHUNK_ROWS):
+    """Write a DataFrame to Parquet, one row group per batch."""
+    if pq is None:
+        raise ImportError("pyarrow is required for Parquet export")
+    schema = _arrow_schema(df)
+    with pq.ParquetWriter(path, schema, compression='snappy') as writer:
+        for batch in iter_batches(df, chunk_rows):
+            writer.write_table(pa.Table.from_pandas(batch, schema=schema, preserve_index=False))
+
+
+def write_excel(df: pd.DataFrame, path: str, sheet_name: str = 'Data', chunk_rows: int = CHUNK_ROWS):
+    """
+    Write a DataFrame to an .xlsx workbook with xlsxwriter's constant-memory mode.
+
+    Rows are flushed to disk as they are written, so memory stays flat however many
+    rows are exported. Views longer than one worksheet continue on "<sheet> (2)", ...
+    """
+    if xlsxwriter is None:
+        raise ImportError("xlsxwriter is required for Excel export")
+    sheet_name = re.sub(r"[\[\]:*?/\\]", " ", sheet_name)[:25] or 'Data'
+    workbook = xlsxwriter.Workbook(path, {'constant_memory': True, 'default_date_format': 'yyyy-mm-dd',
+                                          'nan_inf_to_errors': True})
+    header = workbook.add_format({'bold': True})
+    worksheet, row = None, EXCEL_MAX_ROWS
+    sheets = 0
+    try:
+        for batch in iter_batches(df, chunk_rows):
+            # Python objects with missing values as None, which xlsxwriter leaves blank
+            values = batch.astype(object).where(batch.notna(), None)
+            for record in values.itertuples(index=False, name=None):
+                if row >= EXCEL_MAX_ROWS:
+                    sheets += 1
+                    worksheet = workbook.add_worksheet(sheet_name if sheets == 1 else f"{sheet_name} ({sheets})")
+                    worksheet.write_row(0, 0, [str(column) for column in df.columns], header)
+                    row = 0
+                row += 1
+                worksheet.write_row(row, 0, record)
+        if worksheet is None:
+            workbook.add_worksheet(sheet_name).write_row(0, 0, [str(column) for column in df.columns], header)
+    finally:
+        workbook.close()
+
+
+class ExportStore:
+    """
+    Writes exports to files in a scratch directory so a download never needs the
+    whole file built in memory first, and removes exports older than max_age_seconds.
+    """
+
+    def __init__(self, directory: str = os.path.join('.cache', 'exports'), max_age_seconds: int = 3600):
+        """
+        Initialize the store.
+
+        Args:
+            directory: Directory that holds finished exports
+            max_age_seconds: Age after which exports are deleted
+        """
+        self.directory = directory
+        self.max_age_seconds = max_age_seconds
+        os.makedirs(directory, exist_ok=True)
+
+    def _prune(self):
+        """Delete expired exports (files still being downloaded stay readable on POSIX)."""
+        cutoff = time.time() - self.max_age_seconds
+        for entry in os.scandir(self.directory):
+            try:
+                if entry.is_file() and entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+            except OSError:
+                continue
+
+    def export(self, df: pd.DataFrame, name: str, fmt: str) -> str:
+        """
+        Export a table or filtered view.
+
+        Args:
+            df: Rows to export
+            name: Base name for the file (also the Excel sheet name)
+            fmt: One of EXPORT_FORMATS
+
+        Returns:
+            Path of the finished file
+
+        Raises:
+            ValueError: If the format is unknown
+            ImportError: If the format's writer library is not installed
+        """
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Unsupported export format: {fmt}")
+        self._prune()
+
+        safe_name = re.sub(r"[^A-Za-z0-9_-]+", "_", name).strip('_') or 'export'
+        extension = EXPORT_FORMATS[fmt][1]
+        # Written under a temporary name and renamed, so a half-written file is never served
+        handle, staging = tempfile.mkstemp(prefix=f".{safe_name}-", suffix=extension, dir=self.directory)
+        os.close(handle)
+        target = os.path.join(self.directory, os.path.basename(staging)[1:])
+        try:
+            with metrics.span('export', format=fmt):
+                if fmt == 'csv':
+                    write_csv(df, staging)
+                elif fmt == 'parquet':
+                    write_parquet(df, staging)
+                else:
+                    write_excel(df, staging, sheet_name=name)
+            os.replace(staging, target)
+        except Exception:
+            if os.path.exists(staging):
+                os.remove(staging)
+            raise
+        metrics.increment('export_rows', len(df), format=fmt)
+        return target
+
+
+_store: Optional[ExportStore] = None
+
+
+def get_export_store() -> ExportStore:
+    """Process-wide export store in EXPORT_DIRECTORY (default .cache/exports)."""
+    global _store
+    if _store is None:
+        _store = ExportStore(os.getenv('EXPORT_DIRECTORY', os.path.join('.cache', 'exports')))
+    return _store
+
+
+def export_file_name(name: str, fmt: str) -> str:
+    """Download file name for an export, e.g. "Invoices Outstanding" -> "invoices_outstanding.csv"."""
+    return (re.sub(r"[^A-Za-z0-9_-]+", "_", name).strip('_').lower() or 'export') + EXPORT_FORMATS[fmt][1]
+
+
+# Example usage and testing
+if __name__ == "__main__":
+    import resource
+    import sys
+
+    from synthetic_data import SyntheticLedgerGenerator
+
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    expenses = SyntheticLedgerGenerator(seed=7).generate(rows)['expenses']
+    expenses['date'] = pd.to_datetime(expenses['date'])
+    expenses['amount'] = expenses['amount'].astype(float)
+
+    store = ExportStore(tempfile.mkdtemp(prefix="exports-"))
+    results: Dict[str, str] = {}
+    for fmt in available_formats():
+        started = time.perf_counter()
+        path = store.export(expenses, 'Expenses', fmt)
+        results[fmt] = path
+        peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        print(f"{fmt:8} {os.path.getsize(path) / 1e6:8.1f} MB in {time.perf_counter() - started:6.2f} s "
+              f"(peak RSS so far {peak_mb:,.0f} MB)")
+
+    assert len(pd.read_csv(results['csv'])) == rows
+    if 'parquet' in results:
+        assert pd.read_parquet(results['parquet']).shape == expenses.shape
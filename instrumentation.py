@@ -0,0 +1,296 @@
+import atexit
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+
+# Labels are stored as a sorted tuple so they can be part of a dictionary key
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _format_labels(labels: LabelKey) -> str:
+    if not labels:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in labels)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(labels, escaped)) + "}"
+
+
+class _SpanStats:
+    """Running totals and a window of recent samples for one span series."""
+
+    def __init__(self, window: int):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.errors = 0
+        self.recent: Deque[float] = deque(maxlen=window)
+
+    def add(self, seconds: float, error: bool):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.errors += int(error)
+        self.recent.append(seconds)
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        if not self.recent:
+            return None
+        ordered = sorted(self.recent)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class Instrumentation:
+    """
+    In-process timing spans and counters for the dashboard's hot paths.
+    Spans keep running totals plus a window of recent samples for percentiles;
+    every recorded event is also kept in a ring buffer (and optionally appended
+    to a JSON lines file) so it can be exported for offline analysis. File writes
+    are batched by a background thread, so recording never waits on disk I/O.
+    """
+
+    def __init__(self, prefix: str = "youtiva", window: int = 500, max_events: int = 2000,
+                 jsonl_path: Optional[str] = None, jsonl_path_env: Optional[str] = None,
+                 flush_interval: float = 1.0):
+        """
+        Initialize an empty registry.
+
+        Args:
+            prefix: Prefix for exported Prometheus metric names
+            window: Recent samples kept per span series for percentiles
+            max_events: Recent events kept in memory for JSON lines export
+            jsonl_path: Optional file every event is appended to
+            jsonl_path_env: Environment variable naming the file when jsonl_path is not given;
+                read when the first event is recorded, so values loaded later (e.g. from .env) apply
+            flush_interval: Seconds between background writes of buffered events to the file
+        """
+        self.prefix = prefix
+        self.window = window
+        self.flush_interval = flush_interval
+        self._jsonl_path = jsonl_path
+        self._jsonl_path_env = jsonl_path_env if jsonl_path is None else None
+        self._pending: List[Dict[str, Any]] = []
+        self._writer: Optional[threading.Thread] = None
+        self._write_lock = threading.Lock()
+        self._spans: Dict[Tuple[str, LabelKey], _SpanStats] = {}
+        self._counters: Dict[Tuple[str, LabelKey], float] = {}
+        self._events: Deque[Dict[str, Any]] = deque(maxlen=max_events)
+        self._lock = threading.Lock()
+
+    @property
+    def jsonl_path(self) -> Optional[str]:
+        """File events are appended to, if any (resolved from jsonl_path_env on first use)."""
+        if self._jsonl_path_env is not None:
+            self._jsonl_path = os.getenv(self._jsonl_path_env) or None
+            self._jsonl_path_env = None
+        return self._jsonl_path
+
+    def _record_event(self, event: Dict[str, Any]):
+        """Append an event to the ring buffer and queue it for the JSON lines file (lock held by caller)."""
+        self._events.append(event)
+        if self.jsonl_path:
+            self._pending.append(event)
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, name="metrics-writer", daemon=True)
+                self._writer.start()
+                atexit.register(self.flush)
+
+    def _write_loop(self):
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    def flush(self):
+        """Append buffered events to the JSON lines file; the registry lock is not held while writing."""
+        with self._write_lock:
+            with self._lock:
+                pending, self._pending = self._pending, []
+            if not pending:
+                return
+            try:
+                with open(self.jsonl_path, 'a', encoding='utf-8') as f:
+                    f.write("".join(json.dumps(event) + "\n" for event in pending))
+            except OSError as e:
+                print(f"Error writing {len(pending)} metrics events: {e}")
+
+    def observe(self, name: str, seconds: float, error: bool = False, **labels):
+        """
+        Record a duration that was measured elsewhere (e.g. time to first token).
+
+        Args:
+            name: Span name
+            seconds: Duration in seconds
+            error: Whether the timed operation failed
+            **labels: Extra dimensions (e.g. table="invoices")
+        """
+        key = (name, _label_key(labels))
+        with self._lock:
+            stats = self._spans.get(key)
+            if stats is None:
+                stats = self._spans[key] = _SpanStats(self.window)
+            stats.add(seconds, error)
+            self._record_event({'type': 'span', 'name': name, 'labels': dict(key[1]),
+                                'seconds': round(seconds, 6), 'error': error, 'ts': time.time()})
+
+    def increment(self, name: str, amount: float = 1, **labels):
+        """
+        Add to a counter.
+
+        Args:
+            name: Counter name
+            amount: Amount to add
+            **labels: Extra dimensions
+        """
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+            self._record_event({'type': 'counter', 'name': name, 'labels': dict(key[1]),
+                                'amount': amount, 'ts': time.time()})
+
+    @contextmanager
+    def span(self, name: str, **labels) -> Iterator[None]:
+        """
+        Time the enclosed block; exceptions are counted as errors and re-raised.
+        Control-flow BaseExceptions (e.g. Streamlit's rerun) are timed but not counted.
+
+        Args:
+            name: Span name
+            **labels: Extra dimensions
+        """
+        started = time.perf_counter()
+        error = False
+        try:
+            yield
+        except Exception:
+            error = True
+            raise
+        finally:
+            self.observe(name, time.perf_counter() - started, error=error, **labels)
+
+    def timed(self, name: Optional[str] = None, **labels) -> Callable[[Callable], Callable]:
+        """
+        Decorator that records a span around every call of a function.
+
+        Args:
+            name: Span name (defaults to the function name)
+            **labels: Extra dimensions
+        """
+        def decorator(func: Callable) -> Callable:
+            span_name = name or func.__name__
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(span_name, **labels):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def snapshot(self) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Summarize every span and counter series.
+
+        Returns:
+            Dictionary with 'spans' (count, total, mean, p50, p95, max, errors in seconds)
+            and 'counters' (value), each a list of series sorted by name
+        """
+        with self._lock:
+            spans = [
+                {
+                    'name': name, 'labels': dict(labels), 'count': stats.count,
+                    'total': stats.total, 'mean': stats.total / stats.count, 'p50': stats.percentile(0.5),
+                    'p95': stats.percentile(0.95), 'max': stats.max, 'errors': stats.errors
+                }
+                for (name, labels), stats in sorted(self._spans.items())
+            ]
+            counters = [
+                {'name': name, 'labels': dict(labels), 'value': value}
+                for (name, labels), value in sorted(self._counters.items())
+            ]
+        return {'spans': spans, 'counters': counters}
+
+    def to_prometheus(self) -> str:
+        """
+        Render all series in the Prometheus text exposition format.
+
+        Spans become a `<prefix>_span_seconds` summary (p50/p95 quantiles over the recent
+        window, plus _sum and _count) and `<prefix>_span_errors_total`; counters become
+        `<prefix>_<name>_total`.
+
+        Returns:
+            Exposition text
+        """
+        with self._lock:
+            spans = sorted(self._spans.items())
+            counters = sorted(self._counters.items())
+
+            lines = []
+            if spans:
+                metric = f"{self.prefix}_span_seconds"
+                lines += [f"# HELP {metric} Duration of instrumented operations.", f"# TYPE {metric} summary"]
+                for (name, labels), stats in spans:
+                    series = (('span', name),) + labels
+                    for quantile in (0.5, 0.95):
+                        value = stats.percentile(quantile)
+                        lines.append(f"{metric}{_format_labels(series + (('quantile', str(quantile)),))} {value}")
+                    lines.append(f"{metric}_sum{_format_labels(series)} {stats.total}")
+                    lines.append(f"{metric}_count{_format_labels(series)} {stats.count}")
+
+                metric = f"{self.prefix}_span_errors_total"
+                lines += [f"# HELP {metric} Failed instrumented operations.", f"# TYPE {metric} counter"]
+                for (name, labels), stats in spans:
+                    lines.append(f"{metric}{_format_labels((('span', name),) + labels)} {stats.errors}")
+
+            declared = set()
+            for (name, labels), value in counters:
+                metric = f"{self.prefix}_{name}_total"
+                if metric not in declared:
+                    declared.add(metric)
+                    lines.append(f"# TYPE {metric} counter")
+                lines.append(f"{metric}{_format_labels(labels)} {value}")
+
+        return "\n".join(lines) + "\n"
+
+    def to_json_lines(self) -> str:
+        """Recent events, one JSON object per line."""
+        with self._lock:
+            events = list(self._events)
+        return "".join(json.dumps(event) + "\n" for event in events)
+
+    def reset(self):
+        """Forget every series and event."""
+        with self._lock:
+            self._spans.clear()
+            self._counters.clear()
+            self._events.clear()
+
+
+# One registry per process; METRICS_JSONL_PATH additionally streams events to a file. It is
+# read when the first event is recorded, after main.py has loaded .env
+metrics = Instrumentation(jsonl_path_env='METRICS_JSONL_PATH')
+
+
+# Example usage and testing
+if __name__ == "__main__":
+    demo = Instrumentation()
+
+    @demo.timed()
+    def load_table(rows: int) -> int:
+        time.sleep(0.001 * rows)
+        return rows
+
+    for rows in (5, 10, 20):
+        load_table(rows)
+    with demo.span("render_page", page="All Data Tables"):
+        time.sleep(0.01)
+    demo.increment("openai_stream_tokens", 128, route="fast")
+
+    print(demo.to_prometheus())
+    print(demo.to_json_lines())
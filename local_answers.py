@@ -0,0 +1,222 @@
+import re
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from metrics_engine import FinancialMetricsEngine
+
+
+def _money(value: float) -> str:
+    return f"${value:,.2f}"
+
+
+def _top_n(question: str, default: int = 5) -> int:
+    """Extract N from phrases like 'top 5', 'largest 10' or 'the 10 largest'."""
+    match = re.search(r"\b(?:top|largest|biggest|highest|lowest|smallest|bottom)\s+(\d{1,3})\b", question) or \
+        re.search(r"\b(\d{1,3})\s+(?:top|largest|biggest|highest|lowest|smallest|bottom)\b", question)
+    return max(1, min(int(match.group(1)), 100)) if match else default
+
+
+def _is_smallest(question: str) -> bool:
+    return bool(re.search(r"\b(lowest|smallest|bottom|least)\b", question))
+
+
+# Lead-in, filler and closing phrases a question may wrap around an intent without changing it
+_LEAD = (r"(?:(?:please|can\s+you|could\s+you)\s+)?"
+         r"(?:(?:what(?:'s|\s+is|\s+are|\s+was|\s+were)|how\s+(?:much|many)(?:\s+(?:is|are|do|did|have))?|"
+         r"which(?:\s+(?:is|are))?|who\s+(?:is|are)|show(?:\s+me)?|give\s+me|list|tell\s+me|get)\s+)?")
+_FILLER = r"(?:(?:the|our|my|all|current|currently|total|overall)\s+)*"
+_TAIL = (r"(?:\s+(?:right\s+now|now|currently|so\s+far|to\s+date|in\s+total|overall|do\s+we\s+have|"
+         r"have\s+we|we\s+have|is|are|please))*")
+
+_RANKING = r"(?:\d{1,3}\s+)?(?:top|largest|biggest|highest|lowest|smallest|bottom)(?:\s+\d{1,3})?"
+
+
+def _question(body: str) -> re.Pattern:
+    """Pattern matching a whole question that asks for `body` and nothing more."""
+    return re.compile(_LEAD + _FILLER + "(?:" + body + ")" + _TAIL)
+
+
+def _normalize(question: str) -> str:
+    """Lowercase a question, unify apostrophes and drop closing punctuation and extra spaces."""
+    question = re.sub(r"\s+", " ", question.lower().replace("\u2019", "'")).strip()
+    return re.sub(r"[\s?.!]+$", "", question)
+
+
+class LocalAnswerEngine:
+    """
+    Answers questions that map cleanly onto a known metric or ranking directly
+    from the snapshot's cached aggregates, without an LLM round-trip.
+
+    Intent patterns must match the whole question. Anything left over, such as a
+    period ("in March 2024", "this year"), a category, vendor or customer name, or a
+    ratio ("turnover"), changes what is being asked, so those questions return None
+    and fall through to OpenAI rather than getting an unqualified figure.
+    """
+
+    # Questions longer than this are treated as open-ended
+    MAX_WORDS = 16
+
+    def __init__(self, engine: FinancialMetricsEngine):
+        """
+        Initialize with the metrics engine of the current data snapshot.
+
+        Args:
+            engine: FinancialMetricsEngine bound to the snapshot
+        """
+        self.engine = engine
+        # Ordered (intent, pattern, handler); the first full match wins
+        self.intents: List[Tuple[str, re.Pattern, Callable[[str], Dict[str, Any]]]] = [
+            ('overdue_receivables', _question(
+                r"(?:overdue|past\s+due|late)\s+(?:invoices?|receivables?)|"
+                r"(?:invoices?|receivables?)\s+(?:that\s+)?(?:are\s+)?(?:overdue|past\s+due)"),
+             lambda q: self._overdue('invoices', 'receivables')),
+            ('overdue_payables', _question(
+                r"(?:overdue|past\s+due|late)\s+(?:bills?|payables?)|"
+                r"(?:bills?|payables?)\s+(?:that\s+)?(?:are\s+)?(?:overdue|past\s+due)"),
+             lambda q: self._overdue('bills', 'payables')),
+            ('outstanding_receivables', _question(
+                r"(?:(?:outstanding|unpaid|open)\s+)?(?:receivables?|accounts\s+receivable)(?:\s+balance)?|"
+                r"(?:outstanding|unpaid|open)\s+invoices?(?:\s+(?:amount|total|balance))?|"
+                r"invoices?\s+(?:are\s+)?(?:still\s+)?(?:outstanding|unpaid|open)"),
+             lambda q: self._headline('outstanding_receivables', "Outstanding receivables", self._status_table('invoices'))),
+            ('outstanding_payables', _question(
+                r"(?:(?:outstanding|unpaid|open)\s+)?(?:payables?|accounts\s+payable)(?:\s+balance)?|"
+                r"(?:outstanding|unpaid|open)\s+bills?(?:\s+(?:amount|total|balance))?|"
+                r"bills?\s+(?:are\s+)?(?:still\s+)?(?:outstanding|unpaid|open)|"
+                r"we\s+owe(?:\s+(?:to\s+)?(?:our\s+)?(?:vendors|suppliers))?"),
+             lambda q: self._headline('outstanding_payables', "Outstanding payables", self._status_table('bills'))),
+            ('collection_rate', _question(r"(?:invoice\s+)?collection\s+(?:rate|efficiency)"),
+             lambda q: self._percent('collection_rate', "Collection rate (paid ÷ total invoiced)")),
+            ('profit_margin', _question(r"(?:net\s+profit|profit|net)\s+margin"),
+             lambda q: self._percent('profit_margin', "Profit margin ((revenue − expenses) ÷ revenue)")),
+            ('gross_profit', _question(r"(?:gross\s+|net\s+)?profit"),
+             lambda q: self._headline('gross_profit', "Gross profit (revenue − expenses)")),
+            ('top_customers', _question(
+                _RANKING + r"\s+customers?(?:\s+by\s+(?:invoiced\s+)?(?:revenue|sales))?|"
+                r"(?:best|biggest)\s+customers?|"
+                r"customers?\s+(?:with\s+the\s+(?:most|highest)|(?:bring|brings|generate|generates)\s+(?:in\s+)?the\s+most)"
+                r"\s+(?:revenue|sales)"),
+             self._top_customers),
+            ('top_vendors', _question(
+                _RANKING + r"\s+(?:vendors?|suppliers?)(?:\s+by\s+spend(?:ing)?)?|"
+                r"(?:vendors?|suppliers?)\s+(?:do\s+)?we\s+spend\s+the\s+most\s+(?:with|on)|"
+                r"(?:vendors?|suppliers?)\s+with\s+the\s+(?:most|highest)\s+spend(?:ing)?"),
+             self._top_vendors),
+            ('top_expense_categories', _question(
+                _RANKING + r"\s+(?:expense\s+|spending\s+)?categor(?:y|ies)(?:\s+by\s+spend(?:ing)?)?|"
+                r"expenses?\s+by\s+category"),
+             self._top_categories),
+            ('top_expenses', _question(_RANKING + r"\s+expenses?"),
+             lambda q: self._top_records(q, 'expenses')),
+            ('top_invoices', _question(_RANKING + r"\s+(?:(?:outstanding|unpaid|open)\s+)?invoices?"),
+             lambda q: self._top_records(q, 'invoices')),
+            ('top_bills', _question(_RANKING + r"\s+(?:(?:outstanding|unpaid|open)\s+)?bills?"),
+             lambda q: self._top_records(q, 'bills')),
+            ('total_revenue', _question(r"(?:(?:total|overall|gross)\s+)?(?:revenue|income|sales)|(?:total\s+)?invoiced\s+(?:amount|revenue)"),
+             lambda q: self._headline('total_revenue', "Total revenue (all invoices)", self._status_table('invoices'))),
+            ('total_expenses', _question(r"(?:(?:total|overall)\s+)?(?:expenses?|spend(?:ing)?|costs?)|we\s+(?:spend|spent)"),
+             lambda q: self._headline('total_expenses', "Total expenses", self._category_table())),
+            ('active_customers', _question(
+                r"how\s+many\s+(?:active\s+)?customers(?:\s+(?:do\s+we\s+have|are\s+there|are\s+active))?|"
+                r"(?:number|count)\s+of\s+(?:active\s+)?customers|(?:active\s+)?customer\s+count"),
+             lambda q: self._count('active_customers', "Active customers")),
+            ('active_vendors', _question(
+                r"how\s+many\s+(?:active\s+)?(?:vendors|suppliers)(?:\s+(?:do\s+we\s+have|are\s+there|are\s+active))?|"
+                r"(?:number|count)\s+of\s+(?:active\s+)?(?:vendors|suppliers)|(?:active\s+)?vendor\s+count"),
+             lambda q: self._count('active_vendors', "Active vendors")),
+            ('average_hourly_rate', _question(
+                r"(?:average|avg|mean)\s+(?:hourly\s+|service\s+|billing\s+)?rate"
+                r"(?:\s+(?:across|for|of)\s+(?:all\s+)?(?:our\s+)?services)?"),
+             lambda q: self._headline('average_hourly_rate', "Average hourly rate across services")),
+        ]
+
+    def answer(self, question: str) -> Optional[Dict[str, Any]]:
+        """
+        Answer a question from cached aggregates if it maps to a known intent.
+
+        Args:
+            question: The user's question
+
+        Returns:
+            Dictionary with intent, answer (markdown) and table (DataFrame or None),
+            or None when the question should go to the LLM
+        """
+        question_lower = _normalize(question)
+        if not question_lower or len(question_lower.split()) > self.MAX_WORDS:
+            return None
+
+        for intent, pattern, handler in self.intents:
+            if pattern.fullmatch(question_lower):
+                result = handler(question_lower)
+                result['intent'] = intent
+                return result
+        return None
+
+    # Answer templates
+
+    def _headline(self, key: str, label: str, table: Optional[pd.DataFrame] = None) -> Dict[str, Any]:
+        value = self.engine.headline_totals()[key]
+        return {'answer': f"**{label}:** {_money(value)}", 'table': table}
+
+    def _percent(self, key: str, label: str) -> Dict[str, Any]:
+        totals = self.engine.headline_totals()
+        table = pd.DataFrame([
+            {'Metric': 'Total revenue', 'Value': _money(totals['total_revenue'])},
+            {'Metric': 'Paid invoices', 'Value': _money(totals['paid_invoices'])},
+            {'Metric': 'Total expenses', 'Value': _money(totals['total_expenses'])}
+        ])
+        return {'answer': f"**{label}:** {totals[key]:.1f}%", 'table': table}
+
+    def _count(self, key: str, label: str) -> Dict[str, Any]:
+        return {'answer': f"**{label}:** {self.engine.headline_totals()[key]:,}", 'table': None}
+
+    def _status_table(self, table: str) -> pd.DataFrame:
+        by_status = self.engine.sum_by_status(table)['by_status']
+        return pd.DataFrame([
+            {'Status': status, 'Records': values['count'], 'Amount': values['amount']}
+            for status, values in by_status.items()
+        ])
+
+    def _category_table(self) -> pd.DataFrame:
+        categories = self.engine.category_totals()
+        return pd.DataFrame({'Category': categories.index, 'Amount': categories.round(2).values})
+
+    def _overdue(self, table: str, label: str) -> Dict[str, Any]:
+        aging = self.engine.aging_buckets(table)['buckets']
+        overdue = {bucket: values for bucket, values in aging.items() if bucket != 'Current'}
+        amount = sum(values['amount'] for values in overdue.values())
+        count = sum(values['count'] for values in overdue.values())
+        rows = pd.DataFrame([
+            {'Days Past Due': bucket, 'Records': values['count'], 'Amount': values['amount']}
+            for bucket, values in aging.items()
+        ])
+        return {'answer': f"**Overdue {label}:** {_money(amount)} across {count} records", 'table': rows}
+
+    def _top_customers(self, question: str) -> Dict[str, Any]:
+        k = _top_n(question)
+        customers = self.engine.top_customers(k)['customers']
+        table = pd.DataFrame(customers).rename(columns={
+            'customer_id': 'Customer ID', 'customer_name': 'Customer', 'amount': 'Revenue'
+        })
+        return {'answer': f"**Top {len(table)} customers by invoiced revenue:**", 'table': table}
+
+    def _top_vendors(self, question: str) -> Dict[str, Any]:
+        k = _top_n(question)
+        vendors = self.engine.top_vendors(k, 'all')['vendors']
+        table = pd.DataFrame(vendors).rename(columns={
+            'vendor_id': 'Vendor ID', 'vendor_name': 'Vendor', 'amount': 'Spend'
+        })
+        return {'answer': f"**Top {len(table)} vendors by spend (expenses and bills):**", 'table': table}
+
+    def _top_categories(self, question: str) -> Dict[str, Any]:
+        table = self._category_table().head(_top_n(question))
+        return {'answer': f"**Top {len(table)} expense categories:**", 'table': table}
+
+    def _top_records(self, question: str, table_name: str) -> Dict[str, Any]:
+        smallest = _is_smallest(question)
+        status = 'Outstanding' if re.search(r"\b(outstanding|unpaid|open)\b", question) else None
+        records = self.engine.top_records(table_name, _top_n(question), largest=not smallest, status=status)
+        ranking = "smallest" if smallest else "largest"
+        qualifier = f"{status.lower()} " if status else ""
+        return {'answer': f"**The {len(records)} {ranking} {qualifier}{table_name} by amount:**", 'table': records}
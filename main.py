@@ -1,11 +1,23 @@
 import streamlit as st
 import pandas as pd
 import os
+import sys
+import time
 from datetime import datetime
+from dotenv import load_dotenv
 
-# Import our custom modules
+# Import our custom modules; the AI stack (openai, retrieval, report jobs) is imported
+# lazily by the pages that use it so cold starts serve the data tables sooner
 from data_utils import DataLoader
-from chatgpt_integration import FinancialChatBot
+from instrumentation import metrics
+from partitioned_store import get_partitioned_store
+from arrow_snapshots import source_signature
+
+# Load environment variables before anything reads them
+load_dotenv()
+
+# Number of chat messages rendered per page of history
+HISTORY_PAGE_SIZE = 20
 
 # Page configuration
 st.set_page_config(
@@ -37,23 +49,109 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-@st.cache_data
-def load_all_data():
-    """Load all financial data with caching"""
-    loader = DataLoader()
-    data = {
-        'chart_of_accounts': loader.load_chart_of_accounts(),
-        'vendors': loader.load_vendors(),
-        'expenses': loader.load_expenses(),
-        'bills': loader.load_bills(),
-        'customers': loader.load_customers(),
-        'invoices': loader.load_invoices(),
-        'services': loader.load_services()
+@st.cache_resource(max_entries=2)
+def load_data_snapshot(signature):
+    """Load (or map) the data for one version of the source files, shared by all sessions"""
+    return DataLoader().load_all_data_shared()
+
+def load_session_data():
+    """
+    Load the selected company's data in multi-tenant mode, or the single data directory otherwise.
+    Returns the data and its snapshot key (the source file signature, cheap enough for every rerun).
+    """
+    store = get_partitioned_store()
+    if store is None:
+        signature = source_signature(DataLoader().file_paths)
+        return load_data_snapshot(signature), signature
+    
+    tenants = store.list_tenants()
+    if not tenants:
+        raise FileNotFoundError(f"No tenant partitions found in {store.root}")
+    
+    tenant = st.sidebar.selectbox("🏢 Company", tenants, key="tenant")
+    periods = store.list_periods(tenant)
+    selected_periods = st.sidebar.multiselect("📅 Fiscal periods", periods, default=periods, key=f"periods_{tenant}")
+    
+    # Chat history refers to one company's books, so start over when the company changes
+    if st.session_state.get("active_tenant") != tenant:
+        st.session_state.active_tenant = tenant
+        st.session_state.pop("chat_memory", None)
+        st.session_state.pop("last_sources", None)
+        st.session_state.pop("conversation_id", None)
+    
+    data = store.load(tenant, selected_periods or None)
+    partition_files = {
+        f"{period}/{name}": path
+        for period in (sorted(selected_periods) or periods)
+        for name, path in store.partition_loader(tenant, period).file_paths.items()
     }
-    # Add markdown reports
-    reports = loader.load_all_reports()
-    data.update(reports)
-    return data
+    return data, source_signature(partition_files)
+
+@st.cache_resource
+def get_chatbot():
+    """Create the chatbot (OpenAI client, prompts) once per process and share it across sessions"""
+    from chatgpt_integration import FinancialChatBot
+    return FinancialChatBot()
+
+@st.cache_resource
+def get_report_worker_pool():
+    """Start the background report workers once per process"""
+    from report_jobs import ReportJobQueue, ReportWorkerPool
+    chatbot = get_chatbot()
+    pool = ReportWorkerPool(ReportJobQueue(), lambda: chatbot)
+    # Without an API key every job would fail, so only queue work when configured
+    if chatbot.is_configured():
+        pool.start()
+    return pool
+
+@st.cache_resource
+def get_chat_history():
+    """Open the persistent chat history once per process (None when CHAT_HISTORY=false)"""
+    from chat_history import get_chat_history_store
+    try:
+        return get_chat_history_store()
+    except Exception as e:
+        print(f"Error opening chat history: {e}")
+        return None
+
+def record_turn(memory, role, content, sources=None, snapshot=None):
+    """Add a turn to the chat memory and the persistent chat history; returns the saved turn ID, if any"""
+    history_store = get_chat_history()
+    turn_id = None
+    if history_store is not None:
+        try:
+            if "conversation_id" not in st.session_state:
+                st.session_state.conversation_id = history_store.start_conversation(st.session_state.get("active_tenant") or "")
+            turn_id = history_store.add_turn(st.session_state.conversation_id, role, content, sources, snapshot)
+        except Exception as e:
+            print(f"Error saving chat history: {e}")
+    has_sources = bool(sources) and any(sources.get(section) for section in ('filtered_data', 'tables', 'passages', 'metrics', 'reports'))
+    memory.add(role, content, sources_id=turn_id if has_sources else None)
+    return turn_id
+
+def show_answer_sources(sources, turn_id, memory):
+    """Display an answer's data sources and keep them for reruns (by turn ID once saved, so the DataFrames can be dropped)"""
+    key = f"sources_{len(memory.turns)}"
+    st.session_state.last_sources = (turn_id if turn_id is not None else sources, key)
+    display_data_sources(sources, key)
+
+def precompute_reports(data, snapshot):
+    """Queue AI reports for the current data snapshot on the background workers (one snapshot kept per tenant)"""
+    report_pool = get_report_worker_pool()
+    if report_pool.is_running:
+        report_pool.submit_snapshot(data, snapshot, st.session_state.get("active_tenant") or "")
+    return report_pool
+
+def warm_up_ai(data, snapshot):
+    """Build the session's retrieval index and queue its reports once per data snapshot"""
+    warm_key = (st.session_state.get("active_tenant") or "", snapshot)
+    if st.session_state.get("ai_warmed_snapshot") == warm_key:
+        return
+    from retrieval_index import get_retrieval_index
+    get_chatbot()
+    get_retrieval_index(data)
+    precompute_reports(data, snapshot)
+    st.session_state.ai_warmed_snapshot = warm_key
 
 def main():
     # Header
@@ -61,22 +159,110 @@ def main():
     
     # Load data
     try:
-        data = load_all_data()
+        data, snapshot = load_session_data()
     except Exception as e:
         st.error(f"Error loading data: {str(e)}")
         st.stop()
     
-    # Sidebar navigation - simplified to just 2 pages
+    # Sidebar navigation
     st.sidebar.title("📊 Navigation")
     page = st.sidebar.selectbox(
         "Choose a section:",
-        ["📊 All Data Tables", "🤖 AI Financial Assistant"]
+        ["📊 All Data Tables", "📉 Charts", "📈 Insights", "🤖 AI Financial Assistant", "📑 AI Reports"]
     )
     
-    if page == "📊 All Data Tables":
-        show_all_data_tables(data)
-    elif page == "🤖 AI Financial Assistant":
-        show_ai_assistant(data)
+    with metrics.span('page_render', page=page):
+        if page == "📊 All Data Tables":
+            show_all_data_tables(data)
+        elif page == "📉 Charts":
+            show_charts(data)
+        elif page == "📈 Insights":
+            show_insights(data)
+        elif page == "🤖 AI Financial Assistant":
+            show_ai_assistant(data, snapshot)
+        elif page == "📑 AI Reports":
+            show_ai_reports(data, snapshot, precompute_reports(data, snapshot))
+    
+    # Warm up the AI stack on the AI pages only after the page has been sent, so the first paint
+    # never waits on it; the data pages never load it
+    if page in ("🤖 AI Financial Assistant", "📑 AI Reports"):
+        try:
+            warm_up_ai(data, snapshot)
+        except Exception as e:
+            print(f"Error warming up AI resources: {e}")
+    
+    if os.getenv('DEV_METRICS_PANEL', '').lower() in ('1', 'true', 'yes'):
+        show_developer_panel()
+
+def show_developer_panel():
+    """Show timing spans, counters and model route latencies in the sidebar, with Prometheus and JSON lines exports"""
+    with st.sidebar.expander("🛠️ Developer metrics"):
+        snapshot = metrics.snapshot()
+        # Routes are timed by the chatbot; don't load the AI stack just to show that nothing ran yet
+        routes = get_chatbot().router.latency_stats() if 'chatgpt_integration' in sys.modules else {}
+        routes = {route: stats for route, stats in routes.items() if stats['count']}
+        if not snapshot['spans'] and not snapshot['counters'] and not routes:
+            st.caption("No measurements yet.")
+            return
+        
+        if snapshot['spans']:
+            st.markdown("**Spans (ms)**")
+            st.dataframe(pd.DataFrame([
+                {
+                    'span': span['name'] + (f" {span['labels']}" if span['labels'] else ""),
+                    'count': span['count'],
+                    'p50': round(span['p50'] * 1000, 1),
+                    'p95': round(span['p95'] * 1000, 1),
+                    'max': round(span['max'] * 1000, 1),
+                    'errors': span['errors']
+                }
+                for span in snapshot['spans']
+            ]), use_container_width=True, hide_index=True)
+        
+        if snapshot['counters']:
+            st.markdown("**Counters**")
+            st.dataframe(pd.DataFrame([
+                {'counter': counter['name'] + (f" {counter['labels']}" if counter['labels'] else ""),
+                 'value': counter['value']}
+                for counter in snapshot['counters']
+            ]), use_container_width=True, hide_index=True)
+        
+        if routes:
+            st.markdown("**Model routes (ms)**")
+            st.dataframe(pd.DataFrame([
+                {
+                    'route': route,
+                    'model': stats['model'],
+                    'count': stats['count'],
+                    'p50': round(stats['p50'] * 1000, 1),
+                    'p95': round(stats['p95'] * 1000, 1)
+                }
+                for route, stats in routes.items()
+            ]), use_container_width=True, hide_index=True)
+        
+        st.download_button("⬇️ Prometheus", metrics.to_prometheus(), file_name="metrics.prom", mime="text/plain")
+        st.download_button("⬇️ JSON lines", metrics.to_json_lines(), file_name="metrics.jsonl", mime="application/x-ndjson")
+
+def show_export_controls(df, name, key):
+    """Format picker and download button that export all rows of a table or filtered view"""
+    from exports import EXPORT_FORMATS, available_formats, export_file_name, get_export_store
+    
+    col1, col2, col3 = st.columns([2, 2, 3])
+    fmt = col1.selectbox("Export format", available_formats(), key=f"{key}_format",
+                         format_func=str.upper, label_visibility="collapsed")
+    if col2.button("📦 Prepare export", key=f"{key}_prepare"):
+        with st.spinner(f"Exporting {len(df):,} rows..."):
+            try:
+                # Written to disk in batches, so the full file is never assembled in memory
+                st.session_state[f"{key}_export"] = (fmt, get_export_store().export(df, name, fmt))
+            except Exception as e:
+                st.error(f"Export failed: {str(e)}")
+    
+    prepared = st.session_state.get(f"{key}_export")
+    if prepared and prepared[0] == fmt and os.path.exists(prepared[1]):
+        with open(prepared[1], 'rb') as f:
+            col3.download_button(f"⬇️ Download {export_file_name(name, fmt)}", f, file_name=export_file_name(name, fmt),
+                                 mime=EXPORT_FORMATS[fmt][0], key=f"{key}_download")
 
 def show_all_data_tables(data):
     """Show all data tables in a simple format"""
@@ -87,6 +273,7 @@ def show_all_data_tables(data):
     st.subheader("📊 Chart of Accounts")
     st.write(f"**Total Records:** {len(data['chart_of_accounts'])}")
     st.dataframe(data['chart_of_accounts'], use_container_width=True, height=300)
+    show_export_controls(data['chart_of_accounts'], "Chart of Accounts", key="export_chart_of_accounts")
     st.markdown('</div>', unsafe_allow_html=True)
     
     # Vendors
@@ -94,6 +281,7 @@ def show_all_data_tables(data):
     st.subheader("🏢 Vendors")
     st.write(f"**Total Records:** {len(data['vendors'])}")
     st.dataframe(data['vendors'], use_container_width=True, height=300)
+    show_export_controls(data['vendors'], "Vendors", key="export_vendors")
     st.markdown('</div>', unsafe_allow_html=True)
     
     # Customers
@@ -101,6 +289,7 @@ def show_all_data_tables(data):
     st.subheader("👥 Customers")
     st.write(f"**Total Records:** {len(data['customers'])}")
     st.dataframe(data['customers'], use_container_width=True, height=300)
+    show_export_controls(data['customers'], "Customers", key="export_customers")
     st.markdown('</div>', unsafe_allow_html=True)
     
     # Expenses
@@ -108,6 +297,7 @@ def show_all_data_tables(data):
     st.subheader("💸 Expenses")
     st.write(f"**Total Records:** {len(data['expenses'])}")
     st.dataframe(data['expenses'], use_container_width=True, height=300)
+    show_export_controls(data['expenses'], "Expenses", key="export_expenses")
     st.markdown('</div>', unsafe_allow_html=True)
     
     # Bills
@@ -115,6 +305,7 @@ def show_all_data_tables(data):
     st.subheader("📄 Bills")
     st.write(f"**Total Records:** {len(data['bills'])}")
     st.dataframe(data['bills'], use_container_width=True, height=300)
+    show_export_controls(data['bills'], "Bills", key="export_bills")
     st.markdown('</div>', unsafe_allow_html=True)
     
     # Invoices
@@ -122,6 +313,7 @@ def show_all_data_tables(data):
     st.subheader("📋 Invoices")
     st.write(f"**Total Records:** {len(data['invoices'])}")
     st.dataframe(data['invoices'], use_container_width=True, height=300)
+    show_export_controls(data['invoices'], "Invoices", key="export_invoices")
     st.markdown('</div>', unsafe_allow_html=True)
     
     # Services
@@ -129,6 +321,7 @@ def show_all_data_tables(data):
     st.subheader("⚙️ Services")
     st.write(f"**Total Records:** {len(data['services'])}")
     st.dataframe(data['services'], use_container_width=True, height=300)
+    show_export_controls(data['services'], "Services", key="export_services")
     st.markdown('</div>', unsafe_allow_html=True)
     
     # Financial Reports
@@ -158,35 +351,193 @@ def show_all_data_tables(data):
     
     st.markdown('</div>', unsafe_allow_html=True)
 
-def display_data_sources(relevant_sources):
-    """Display relevant data sources below the AI response"""
+def show_charts(data):
+    """Show dashboard charts drawn from aggregated series cached per data snapshot"""
+    import plotly.express as px
+    from metrics_engine import get_metrics_engine
+    
+    st.markdown('<h2 class="section-header">Financial Charts</h2>', unsafe_allow_html=True)
+    # Only these small aggregated frames reach the browser, never the underlying rows
+    series = get_metrics_engine(data).chart_series()
+    
+    st.markdown('<div class="data-section">', unsafe_allow_html=True)
+    st.subheader("💹 Revenue vs Expenses")
+    trend = series['revenue_vs_expenses']
+    if trend.empty:
+        st.info("No dated transactions to chart.")
+    else:
+        fig = px.line(trend, x='period', y=['revenue', 'expenses', 'bills', 'net'], markers=True,
+                      labels={'period': 'Period', 'value': 'Amount ($)', 'variable': 'Series'})
+        fig.update_layout(hovermode='x unified', yaxis_tickprefix='$', yaxis_tickformat=',.0f')
+        st.plotly_chart(fig, use_container_width=True)
+    st.markdown('</div>', unsafe_allow_html=True)
+    
+    st.markdown('<div class="data-section">', unsafe_allow_html=True)
+    st.subheader("⏳ Receivables and Payables Aging")
+    col1, col2 = st.columns(2)
+    for column, name, title in ((col1, 'ar_aging', "Accounts Receivable"), (col2, 'ap_aging', "Accounts Payable")):
+        with column:
+            fig = px.bar(series[name], x='bucket', y='amount', text='count', title=title,
+                         labels={'bucket': 'Days Past Due', 'amount': 'Outstanding ($)', 'count': 'Documents'})
+            fig.update_layout(yaxis_tickprefix='$', yaxis_tickformat=',.0f')
+            st.plotly_chart(fig, use_container_width=True)
+    st.markdown('</div>', unsafe_allow_html=True)
+    
+    st.markdown('<div class="data-section">', unsafe_allow_html=True)
+    st.subheader("🏆 Top Vendors and Customers")
+    col1, col2 = st.columns(2)
+    for column, name, title in ((col1, 'top_vendors', "Vendors by Spend"), (col2, 'top_customers', "Customers by Revenue")):
+        with column:
+            fig = px.bar(series[name], x='amount', y='name', orientation='h', title=title,
+                         labels={'name': '', 'amount': 'Amount ($)'})
+            fig.update_layout(yaxis={'categoryorder': 'array', 'categoryarray': series[name]['name'].tolist()[::-1]},
+                              xaxis_tickprefix='$', xaxis_tickformat=',.0f')
+            st.plotly_chart(fig, use_container_width=True)
+    st.markdown('</div>', unsafe_allow_html=True)
+
+def show_insights(data):
+    """Show forward-looking analytics computed from the current data snapshot"""
+    from metrics_engine import get_metrics_engine
+    
+    st.markdown('<h2 class="section-header">Financial Insights</h2>', unsafe_allow_html=True)
+    engine = get_metrics_engine(data)
+    
+    # 13-week cash forecast
+    st.markdown('<div class="data-section">', unsafe_allow_html=True)
+    st.subheader("💵 13-Week Cash Forecast")
+    forecaster = engine.cash_forecaster()
+    weekly = forecaster.forecast()
+    summary = forecaster.summary()
+    
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Opening Cash", f"${summary['opening_balance']:,.0f}")
+    col2.metric("Expected Inflows", f"${summary['inflows']:,.0f}")
+    col3.metric("Expected Outflows", f"${summary['outflows']:,.0f}")
+    col4.metric("Closing Cash", f"${summary['closing_balance']:,.0f}",
+                delta=f"{summary['closing_balance'] - summary['opening_balance']:,.0f}")
+    
+    st.line_chart(weekly.set_index('week_start')['cash_position'])
+    st.dataframe(weekly, use_container_width=True, hide_index=True, column_config={
+        'week_start': st.column_config.DateColumn("Week Starting"),
+        'inflows': st.column_config.NumberColumn("Inflows", format="$%.2f"),
+        'outflows': st.column_config.NumberColumn("Outflows", format="$%.2f"),
+        'net': st.column_config.NumberColumn("Net", format="$%.2f"),
+        'cash_position': st.column_config.NumberColumn("Cash Position", format="$%.2f")
+    })
+    st.caption(f"Opening cash from the chart of accounts as of {summary['as_of']}. Overdue invoices and bills "
+               f"are expected in week 1; invoices are shifted by each customer's average payment lag.")
+    st.markdown('</div>', unsafe_allow_html=True)
+    
+    # Customer payment behavior
+    st.markdown('<div class="data-section">', unsafe_allow_html=True)
+    st.subheader("🧾 Customer Payment Behavior")
+    behavior = engine.payment_behavior_summary()
+    scores = engine.customer_scores()
+    
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("DSO", f"{behavior['dso']:.1f} days")
+    col2.metric("On-Time Rate", f"{behavior['on_time_rate']:.1f}%")
+    col3.metric("Avg Days Late", f"{behavior['avg_days_late']:.1f}")
+    col4.metric("Over Credit Limit", behavior['over_credit_limit'])
+    
+    bands = st.multiselect("Risk band", ['High', 'Medium', 'Low'], default=['High', 'Medium', 'Low'])
+    shown = scores[(scores['invoice_count'] > 0) & scores['risk_band'].isin(bands)]
+    st.write(f"**Customers:** {len(shown):,} (riskiest first)")
+    st.dataframe(shown.head(500), use_container_width=True, height=400, column_config={
+        'payment_score': st.column_config.ProgressColumn("Score", min_value=0, max_value=100, format="%.0f"),
+        'dso': st.column_config.NumberColumn("DSO (days)", format="%.1f"),
+        'avg_days_late': st.column_config.NumberColumn("Avg Days Late", format="%.1f"),
+        'on_time_rate': st.column_config.NumberColumn("On-Time Rate", format="%.2f"),
+        'credit_utilization': st.column_config.NumberColumn("Credit Used", format="%.2f"),
+        'outstanding': st.column_config.NumberColumn("Outstanding", format="$%.2f"),
+        'overdue': st.column_config.NumberColumn("Overdue", format="$%.2f")
+    })
+    st.markdown('</div>', unsafe_allow_html=True)
+
+    # Duplicate payments and unusual spend
+    st.markdown('<div class="data-section">', unsafe_allow_html=True)
+    st.subheader("🚩 Spend Anomalies")
+    findings = engine.spend_findings()
+    anomalies = engine.spend_anomaly_summary()
+
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Exact Duplicates", anomalies['exact_duplicates'])
+    col2.metric("Near Duplicates", anomalies['near_duplicates'])
+    col3.metric("Amount Paid Twice", f"${anomalies['duplicate_amount']:,.0f}")
+    col4.metric("Unusual Amounts", anomalies['outliers'])
+
+    tab1, tab2 = st.tabs(["🔁 Possible Duplicates", "📈 Unusual Amounts"])
+    with tab1:
+        if findings['duplicates'].empty:
+            st.success("No likely duplicate payments found.")
+        else:
+            st.dataframe(findings['duplicates'].head(500), use_container_width=True, hide_index=True, column_config={
+                'amount': st.column_config.NumberColumn("Amount", format="$%.2f"),
+                'first_date': st.column_config.DateColumn("First Date"),
+                'second_date': st.column_config.DateColumn("Second Date")
+            })
+    with tab2:
+        if findings['outliers'].empty:
+            st.success("No unusual amounts found.")
+        else:
+            st.dataframe(findings['outliers'].head(500), use_container_width=True, hide_index=True, column_config={
+                'date': st.column_config.DateColumn("Date"),
+                'amount': st.column_config.NumberColumn("Amount", format="$%.2f"),
+                'baseline_median': st.column_config.NumberColumn("Typical Amount", format="$%.2f"),
+                'robust_z': st.column_config.NumberColumn("Robust Z", format="%.1f")
+            })
+    st.caption("Duplicates: same vendor and amount within a week, across expenses and bills. Unusual amounts: far "
+               "above the median of the vendor's or category's previous 12 transactions.")
+    st.markdown('</div>', unsafe_allow_html=True)
+
+def display_data_sources(relevant_sources, key="sources"):
+    """Display relevant data sources below the AI response; key keeps each answer's export widgets apart"""
     if not relevant_sources or not any(relevant_sources.values()):
         return
     
     st.markdown("---")
     st.markdown("### 📊 Data Sources")
     
+    # Display-ready slices are normally prepared in the background while the response streams
+    views = relevant_sources.get('views')
+    if not views:
+        from chatgpt_integration import FinancialChatBot
+        views = FinancialChatBot.prepare_source_views(relevant_sources)
+    
     # Display filtered/specific data first (most relevant)
-    if relevant_sources.get('filtered_data'):
+    if views['filtered_data']:
         st.markdown("#### 🎯 Relevant Data")
-        for data_name, df in relevant_sources['filtered_data'].items():
-            if not df.empty:
-                # Format the data name nicely
-                display_name = data_name.replace('_', ' ').title()
-                with st.expander(f"📋 {display_name} ({len(df)} records)", expanded=True):
-                    st.dataframe(df, use_container_width=True, height=200)
+        for i, view in enumerate(views['filtered_data']):
+            with st.expander(f"📋 {view['name']} ({view['rows']} records)", expanded=True):
+                st.dataframe(view['df'], use_container_width=True, height=200)
+                show_export_controls(view.get('source', view['df']), view['name'], key=f"{key}_filtered_{i}")
     
     # Display full tables if referenced
-    if relevant_sources.get('tables'):
+    if views['tables']:
         st.markdown("#### 📊 Referenced Tables")
-        for table_name, df in relevant_sources['tables'].items():
-            if not df.empty and table_name not in [name.split('_')[0] for name in relevant_sources.get('filtered_data', {}).keys()]:
-                display_name = table_name.replace('_', ' ').title()
-                with st.expander(f"📊 {display_name} (Full Table - {len(df)} records)"):
-                    # Show only first 10 rows for full tables
-                    st.dataframe(df.head(10), use_container_width=True, height=200)
-                    if len(df) > 10:
-                        st.info(f"Showing first 10 of {len(df)} records")
+        for i, view in enumerate(views['tables']):
+            with st.expander(f"📊 {view['name']} (Full Table - {view['rows']} records)"):
+                # Show only first 10 rows for full tables
+                st.dataframe(view['df'], use_container_width=True, height=200)
+                if view['rows'] > 10:
+                    st.info(f"Showing first 10 of {view['rows']} records")
+                show_export_controls(view.get('source', view['df']), view['name'], key=f"{key}_table_{i}")
+    
+    # Display retrieved passages (report sections and transaction descriptions)
+    if relevant_sources.get('passages'):
+        st.markdown("#### 🔎 Retrieved Passages")
+        with st.expander(f"🔎 Top {len(relevant_sources['passages'])} matching passages"):
+            for passage in relevant_sources['passages']:
+                source_name = passage['source'].replace('_', ' ').title()
+                st.markdown(f"**{source_name}** · {passage['title']} _(score {passage['score']})_")
+                st.caption(passage['text'][:600])
+    
+    # Display exact metrics returned to the model by tool calls
+    if relevant_sources.get('metrics'):
+        st.markdown("#### 🎯 Computed Metrics")
+        for call_name, result in relevant_sources['metrics'].items():
+            with st.expander(f"🧮 {call_name}"):
+                st.json(result)
     
     # Display markdown reports if referenced
     if relevant_sources.get('reports'):
@@ -197,12 +548,60 @@ def display_data_sources(relevant_sources):
                 with st.expander(f"📈 {display_name} Report"):
                     st.markdown(content)
 
-def show_ai_assistant(data):
+def show_ai_reports(data, snapshot, report_pool):
+    """Show AI reports and metric explanations precomputed by the background workers"""
+    st.markdown('<h2 class="section-header">AI Reports</h2>', unsafe_allow_html=True)
+    
+    if not report_pool.is_running:
+        st.warning("⚠️ Please add your OpenAI API key to the .env file to generate AI reports.")
+        return
+    
+    reports = report_pool.queue.get_results(snapshot, 'report')
+    explanations = report_pool.queue.get_results(snapshot, 'metric_explanation')
+    
+    status_icons = {'pending': '🕒 Queued', 'running': '⚙️ Generating', 'failed': '❌ Failed', 'stale': '🕒 Queued'}
+    
+    col1, col2 = st.columns([6, 1])
+    with col1:
+        st.info("💡 Reports are generated in the background whenever the data changes.")
+    with col2:
+        if st.button("🔄 Refresh"):
+            if any(job['status'] == 'failed' for job in {**reports, **explanations}.values()):
+                report_pool.queue.retry_failed(snapshot)
+            st.rerun()
+    
+    tabs = st.tabs(["📋 Summary", "🔍 Detailed", "👔 Executive", "📐 Metric Explanations"])
+    for tab, report_type in zip(tabs[:3], report_pool.queue.REPORT_TYPES):
+        with tab:
+            job = reports.get(report_type)
+            if job and job['status'] == 'done':
+                st.caption(f"Generated {datetime.fromtimestamp(job['updated_at']):%Y-%m-%d %H:%M}")
+                st.markdown(job['result'])
+            elif job:
+                st.write(status_icons.get(job['status'], job['status']))
+                if job['error']:
+                    st.caption(job['error'])
+            else:
+                st.write(status_icons['pending'])
+    
+    with tabs[3]:
+        for metric_name, job in explanations.items():
+            display_name = metric_name.replace('_', ' ').title()
+            with st.expander(f"📐 {display_name}"):
+                if job['status'] == 'done':
+                    st.markdown(job['result'])
+                else:
+                    st.write(status_icons.get(job['status'], job['status']))
+
+def show_ai_assistant(data, snapshot):
     st.markdown('<h2 class="section-header">AI Financial Assistant</h2>', unsafe_allow_html=True)
     
+    from conversation_memory import ConversationMemory
+    from stream_renderer import BufferedStreamRenderer
+    
     # Initialize chatbot
     try:
-        chatbot = FinancialChatBot()
+        chatbot = get_chatbot()
         
         if not chatbot.is_configured():
             st.warning("⚠️ Please add your OpenAI API key to the .env file to use the AI assistant.")
@@ -211,63 +610,144 @@ def show_ai_assistant(data):
         
         st.info("💡 Ask me anything about your financial data! I can help analyze trends, explain metrics, and provide insights.")
         
-        # Initialize chat history
-        if "messages" not in st.session_state:
-            st.session_state.messages = []
+        # Initialize bounded chat memory and the number of rendered messages
+        if "chat_memory" not in st.session_state:
+            st.session_state.chat_memory = ConversationMemory()
+        if "history_limit" not in st.session_state:
+            st.session_state.history_limit = HISTORY_PAGE_SIZE
+        memory = st.session_state.chat_memory
+        history_store = get_chat_history()
         
-        # Add clear chat button
+        # Add clear chat button and exact metrics toggle
         col1, col2 = st.columns([6, 1])
+        with col1:
+            use_tools = st.checkbox(
+                "🎯 Exact metrics mode",
+                help="Let the assistant request exact figures computed locally instead of sending a text summary."
+            )
         with col2:
             if st.button("🗑️ Clear Chat"):
-                st.session_state.messages = []
+                memory.clear()
+                st.session_state.pop("last_sources", None)
+                st.session_state.pop("conversation_id", None)
+                st.session_state.history_limit = HISTORY_PAGE_SIZE
+                st.rerun()
+        
+        # Earlier conversations are reloaded from the history store with their saved data sources
+        conversations = history_store.list_conversations(st.session_state.get("active_tenant") or "") if history_store else []
+        if conversations:
+            with st.expander("🗂️ Past conversations"):
+                labels = {
+                    conversation['id']: f"{conversation['title']} · {conversation['turns']} messages · "
+                                        f"{datetime.fromtimestamp(conversation['updated_at']):%Y-%m-%d %H:%M}"
+                    for conversation in conversations
+                }
+                selected = st.selectbox("Conversation", list(labels), format_func=labels.get, key="past_conversation")
+                if st.button("📂 Open conversation"):
+                    memory.clear()
+                    for turn in history_store.load_turns(selected):
+                        memory.add(turn['role'], turn['content'], sources_id=turn['id'] if turn['has_sources'] else None)
+                    st.session_state.conversation_id = selected
+                    st.session_state.pop("last_sources", None)
+                    st.session_state.history_limit = HISTORY_PAGE_SIZE
+                    st.rerun()
+        
+        # Display only the most recent chat messages; older ones are paged in on demand
+        hidden_count = len(memory.turns) - st.session_state.history_limit
+        if hidden_count > 0:
+            if st.button(f"⬆️ Show earlier messages ({hidden_count} hidden)"):
+                st.session_state.history_limit += HISTORY_PAGE_SIZE
                 st.rerun()
         
-        # Display chat messages
-        for message in st.session_state.messages:
+        latest_sources = st.session_state.get("last_sources", (None, None))[0]
+        for message in memory.visible_turns(st.session_state.history_limit):
             with st.chat_message(message["role"]):
                 st.markdown(message["content"])
+                # Saved sources of earlier answers are decoded only when asked for
+                sources_id = message.get("sources_id")
+                if sources_id is not None and sources_id != latest_sources and \
+                        st.checkbox("📊 Show data sources", key=f"show_sources_{sources_id}"):
+                    display_data_sources(history_store.load_sources(sources_id), key=f"sources_turn_{sources_id}")
         
         # Chat input
-        if prompt := st.chat_input("Ask about your financial data..."):
+        prompt = st.chat_input("Ask about your financial data...")
+        
+        # The latest answer's sources stay visible (and exportable) across reruns until the next question
+        if not prompt and st.session_state.get("last_sources"):
+            sources, key = st.session_state.last_sources
+            if isinstance(sources, int):
+                sources = history_store.load_sources(sources)
+            display_data_sources(sources, key)
+        
+        if prompt:
+            st.session_state.pop("last_sources", None)
             # Add user message to history and display
-            st.session_state.messages.append({"role": "user", "content": prompt})
+            record_turn(memory, "user", prompt)
+            history = memory.build_context(exclude_last=True)
             with st.chat_message("user"):
                 st.markdown(prompt)
             
             # Generate AI response
             with st.chat_message("assistant"):
                 message_placeholder = st.empty()
-                full_response = ""
                 
                 try:
-                    # Get streaming response with sources
-                    response_stream, relevant_sources = chatbot.get_financial_analysis_with_sources(prompt, data)
+                    # Computable lookups (totals, rates, rankings) are answered without an LLM round-trip
+                    local_started = time.perf_counter()
+                    local = chatbot.try_local_answer(prompt, data)
+                    if local is not None:
+                        message_placeholder.markdown(local['answer'])
+                        if local['table'] is not None:
+                            st.dataframe(local['table'], use_container_width=True, hide_index=True)
+                        st.caption(f"⚡ Answered locally from cached aggregates in {(time.perf_counter() - local_started) * 1000:.0f} ms")
+                        answer = local['answer']
+                        if local['table'] is not None:
+                            answer += "\n\n```\n" + local['table'].to_string(index=False) + "\n```"
+                        record_turn(memory, "assistant", answer)
+                        return
+
+                    if use_tools:
+                        # Model requests exact metrics, answered from cached aggregates
+                        with st.spinner("Computing metrics..."):
+                            answer, tool_results = chatbot.get_financial_analysis_with_tools(prompt, data, history=history)
+                        message_placeholder.markdown(answer)
+                        sources = {'metrics': tool_results}
+                        show_answer_sources(sources, record_turn(memory, "assistant", answer, sources, snapshot), memory)
+                        return
+                    
+                    # Start the streaming response; data sources are assembled concurrently
+                    renderer = BufferedStreamRenderer(message_placeholder)
+                    renderer.start()
+                    response_stream, sources_future = chatbot.start_financial_analysis(prompt, data, history=history)
                     
                     # Check if response is a string (error message)
                     if isinstance(response_stream, str):
                         message_placeholder.markdown(response_stream)
-                        st.session_state.messages.append({"role": "assistant", "content": response_stream})
+                        record_turn(memory, "assistant", response_stream)
                     else:
-                        # Handle streaming response
-                        for chunk in response_stream:
-                            if hasattr(chunk.choices[0].delta, 'content') and chunk.choices[0].delta.content is not None:
-                                content = chunk.choices[0].delta.content
-                                # Clean the content to avoid formatting issues
-                                full_response += content
-                                # Update display with typing indicator
-                                message_placeholder.markdown(full_response + " ▌")
+                        # Handle streaming response, updating the display on a throttled cadence
+                        full_response = renderer.consume(response_stream)
                         
-                        # Final message without cursor
-                        message_placeholder.markdown(full_response)
-                        st.session_state.messages.append({"role": "assistant", "content": full_response})
+                        stream_stats = renderer.stats()
+                        metrics.increment('openai_stream_tokens', stream_stats['tokens'])
+                        metrics.observe('openai_stream_total', stream_stats['total_time'])
+                        if stream_stats['time_to_first_token'] is not None:
+                            metrics.observe('openai_time_to_first_token', stream_stats['time_to_first_token'])
+                            st.caption(
+                                f"⏱️ First token {stream_stats['time_to_first_token']:.2f}s · "
+                                f"{stream_stats['tokens']} tokens in {stream_stats['total_time']:.1f}s"
+                                + (f" ({stream_stats['tokens_per_second']:.0f}/s)" if stream_stats['tokens_per_second'] else "")
+                            )
                         
-                        # Display data sources below the response
-                        display_data_sources(relevant_sources)
+                        # Display data sources below the response (ready by the time the stream ends); the
+                        # answer is saved with them so they can be re-rendered later without recomputing
+                        sources = sources_future.result()
+                        show_answer_sources(sources, record_turn(memory, "assistant", full_response, sources, snapshot), memory)
                         
                 except Exception as e:
                     error_msg = f"❌ Error generating response: {str(e)}"
                     message_placeholder.markdown(error_msg)
-                    st.session_state.messages.append({"role": "assistant", "content": error_msg})
+                    record_turn(memory, "assistant", error_msg)
         
     
     except Exception as e:
@@ -0,0 +1,686 @@
+import json
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from cash_forecast import CashForecaster
+from customer_scoring import PaymentBehaviorScorer
+from data_utils import FinancialAnalyzer, compute_data_fingerprint
+from partitioned_store import add_eviction_listener
+from spend_anomalies import SpendAnomalyDetector
+from trend_cube import TrendCube
+
+
+class FinancialMetricsEngine:
+    """
+    Answers metric requests from the AI assistant using vectorized,
+    cached aggregates over the DataLoader tables.
+    Each result is returned as compact JSON suitable for an OpenAI tool message.
+    """
+
+    # Tables that carry a status column the model may aggregate over
+    STATUS_TABLES = ['invoices', 'bills', 'expenses']
+
+    # Tables with a due date that can be bucketed by age
+    AGING_TABLES = ['invoices', 'bills']
+
+    # Date column used for monthly trends in each transactional table
+    TREND_DATE_COLUMNS = {
+        'invoices': 'date_issued',
+        'bills': 'date_issued',
+        'expenses': 'date'
+    }
+
+    # Aging bucket edges in days past due (Current = not yet due)
+    AGING_BUCKETS = [
+        ('Current', -np.inf, 0),
+        ('1-30', 0, 30),
+        ('31-60', 30, 60),
+        ('61-90', 60, 90),
+        ('90+', 90, np.inf)
+    ]
+
+    # Most points a dashboard time series is sent with; longer histories are rolled up
+    # from months to quarters, then years
+    MAX_CHART_POINTS = 36
+
+    # Named bars in the top vendor/customer charts (the rest are summed into "All others")
+    CHART_TOP_N = 10
+
+    # OpenAI function-calling definitions for the metrics above
+    TOOL_DEFINITIONS = [
+        {
+            "type": "function",
+            "function": {
+                "name": "sum_by_status",
+                "description": "Total amount and record count per status (e.g. Paid, Outstanding) for a transaction table.",
+                "parameters": {
+                    "type": "object",
+                    "properties": {
+                        "table": {"type": "string", "enum": STATUS_TABLES}
+                    },
+                    "required": ["table"]
+                }
+            }
+        },
+        {
+            "type": "function",
+            "function": {
+                "name": "top_vendors",
+                "description": "Top vendors ranked by total spend from expenses, bills or both.",
+                "parameters": {
+                    "type": "object",
+                    "properties": {
+                        "k": {"type": "integer", "minimum": 1, "maximum": 50},
+                        "source": {"type": "string", "enum": ["expenses", "bills", "all"]}
+                    },
+                    "required": ["k"]
+                }
+            }
+        },
+        {
+            "type": "function",
+            "function": {
+                "name": "top_customers",
+                "description": "Top customers ranked by total invoiced revenue.",
+                "parameters": {
+                    "type": "object",
+                    "properties": {
+                        "k": {"type": "integer", "minimum": 1, "maximum": 50}
+                    },
+                    "required": ["k"]
+                }
+            }
+        },
+        {
+            "type": "function",
+            "function": {
+                "name": "aging_buckets",
+                "description": "Outstanding amounts grouped by days past due (Current, 1-30, 31-60, 61-90, 90+).",
+                "parameters": {
+                    "type": "object",
+                    "properties": {
+                        "table": {"type": "string", "enum": AGING_TABLES}
+                    },
+                    "required": ["table"]
+                }
+            }
+        },
+        {
+            "type": "function",
+            "function": {
+                "name": "month_trend",
+                "description": "Monthly totals for a transaction table, optionally limited to the most recent months.",
+                "parameters": {
+                    "type": "object",
+                    "properties": {
+                        "table": {"type": "string", "enum": list(TREND_DATE_COLUMNS)},
+                        "months": {"type": "integer", "minimum": 1, "maximum": 120}
+                    },
+                    "required": ["table"]
+                }
+            }
+        },
+        {
+            "type": "function",
+            "function": {
+                "name": "trend_breakdown",
+                "description": "Monthly amounts with rolling 3/6/12-month sums and month-over-month and year-over-year changes, for a table total or one member (expense category, account, vendor or customer). Without a member, ranks members by their latest-month value of the chosen measure.",
+                "parameters": {
+                    "type": "object",
+                    "properties": {
+                        "table": {"type": "string", "enum": list(TREND_DATE_COLUMNS)},
+                        "dimension": {"type": "string", "enum": ["total", "category", "account", "vendor", "customer"]},
+                        "member": {"type": "string"},
+                        "months": {"type": "integer", "minimum": 1, "maximum": 120},
+                        "rank_by": {"type": "string", "enum": ["amount", "rolling_3m", "rolling_12m", "mom_change", "mom_pct", "yoy_change", "yoy_pct"]}
+                    },
+                    "required": ["table"]
+                }
+            }
+        },
+        {
+            "type": "function",
+            "function": {
+                "name": "cash_forecast",
+                "description": "Weekly projected cash inflows (open invoices adjusted for each customer's payment lag), outflows (open bills and recurring expenses) and closing cash position.",
+                "parameters": {
+                    "type": "object",
+                    "properties": {
+                        "weeks": {"type": "integer", "minimum": 1, "maximum": 26}
+                    }
+                }
+            }
+        },
+        {
+            "type": "function",
+            "function": {
+                "name": "customer_payment_scores",
+                "description": "Customers ranked by payment behavior score (0-100) with DSO, average days late, on-time rate and credit-limit utilization, riskiest or most reliable first.",
+                "parameters": {
+                    "type": "object",
+                    "properties": {
+                        "k": {"type": "integer", "minimum": 1, "maximum": 50},
+                        "order": {"type": "string", "enum": ["riskiest", "most_reliable"]}
+                    },
+                    "required": ["k"]
+                }
+            }
+        },
+        {
+            "type": "function",
+            "function": {
+                "name": "spend_anomalies",
+                "description": "Likely duplicate payments (same vendor and amount within a few days, across expenses and bills) and amounts far above the vendor's or category's recent history.",
+                "parameters": {
+                    "type": "object",
+                    "properties": {
+                        "k": {"type": "integer", "minimum": 1, "maximum": 50}
+                    },
+                    "required": ["k"]
+                }
+            }
+        }
+    ]
+
+    def __init__(self, data: Dict, as_of: Optional[datetime] = None, fingerprint: Optional[str] = None):
+        """
+        Initialize the engine for a single data snapshot.
+
+        Args:
+            data: Dictionary containing all financial DataFrames and reports
+            as_of: Reference date for aging calculations (defaults to today; get_metrics_engine
+                replaces cached engines when the date changes)
+            fingerprint: Precomputed snapshot fingerprint, if already known
+        """
+        self.data = data
+        self.as_of = pd.Timestamp(as_of) if as_of is not None else pd.Timestamp(datetime.now()).normalize()
+        self.fingerprint = fingerprint or compute_data_fingerprint(data)
+        self.identity = tuple((name, id(value)) for name, value in data.items())
+        self._cache: Dict[str, Any] = {}
+        # Sessions run on separate threads and share cached engines
+        self._cache_lock = threading.Lock()
+        self._handlers: Dict[str, Callable[..., Any]] = {
+            'sum_by_status': self.sum_by_status,
+            'top_vendors': self.top_vendors,
+            'top_customers': self.top_customers,
+            'aging_buckets': self.aging_buckets,
+            'month_trend': self.month_trend,
+            'trend_breakdown': self.trend_breakdown,
+            'cash_forecast': self.cash_forecast,
+            'customer_payment_scores': self.customer_payment_scores,
+            'spend_anomalies': self.spend_anomalies
+        }
+
+    def _table(self, name: str) -> pd.DataFrame:
+        """Return a table from the snapshot, or an empty DataFrame if missing."""
+        df = self.data.get(name)
+        return df if isinstance(df, pd.DataFrame) else pd.DataFrame()
+
+    def _cached(self, key: str, compute: Callable[[], Any]) -> Any:
+        """Memoize an aggregate for the lifetime of this snapshot."""
+        with self._cache_lock:
+            if key in self._cache:
+                return self._cache[key]
+        # Computed outside the lock so slow aggregates do not block unrelated ones; if two
+        # threads race, the first stored result wins
+        value = compute()
+        with self._cache_lock:
+            return self._cache.setdefault(key, value)
+
+    def sum_by_status(self, table: str) -> Dict[str, Any]:
+        """Total amount and count per status for a transaction table."""
+        if table not in self.STATUS_TABLES:
+            raise ValueError(f"Unsupported table for sum_by_status: {table}")
+
+        def compute():
+            df = self._table(table)
+            if df.empty or 'status' not in df.columns:
+                return {}
+            grouped = df.groupby('status')['amount'].agg(['sum', 'count'])
+            return {
+                str(status): {'amount': round(float(row['sum']), 2), 'count': int(row['count'])}
+                for status, row in grouped.iterrows()
+            }
+
+        return {'table': table, 'by_status': self._cached(f"status:{table}", compute)}
+
+    def _vendor_spend(self, source: str) -> pd.Series:
+        """Total spend per vendor_id for the requested source tables."""
+        sources = ['expenses', 'bills'] if source == 'all' else [source]
+        frames = [self._table(name)[['vendor_id', 'amount']] for name in sources
+                  if {'vendor_id', 'amount'}.issubset(self._table(name).columns)]
+        if not frames:
+            return pd.Series(dtype=float)
+        return pd.concat(frames, ignore_index=True).groupby('vendor_id')['amount'].sum().sort_values(ascending=False)
+
+    def top_vendors(self, k: int = 5, source: str = 'all') -> Dict[str, Any]:
+        """Top-k vendors by total spend."""
+        if source not in ('expenses', 'bills', 'all'):
+            raise ValueError(f"Unsupported source for top_vendors: {source}")
+
+        spend = self._cached(f"vendor_spend:{source}", lambda: self._vendor_spend(source))
+        names = self._cached('vendor_names', lambda: self._name_lookup('vendors', 'vendor_id', 'vendor_name'))
+
+        return {
+            'source': source,
+            'vendors': [
+                {'vendor_id': vid, 'vendor_name': names.get(vid, vid), 'amount': round(float(amount), 2)}
+                for vid, amount in spend.head(int(k)).items()
+            ]
+        }
+
+    def _customer_revenue(self) -> pd.Series:
+        """Total invoiced revenue per customer_id."""
+        invoices = self._table('invoices')
+        if invoices.empty:
+            return pd.Series(dtype=float)
+        return invoices.groupby('customer_id')['amount'].sum().sort_values(ascending=False)
+
+    def top_customers(self, k: int = 5) -> Dict[str, Any]:
+        """Top-k customers by total invoiced revenue."""
+        revenue = self._cached('customer_revenue', self._customer_revenue)
+        names = self._cached('customer_names', lambda: self._name_lookup('customers', 'customer_id', 'customer_name'))
+
+        return {
+            'customers': [
+                {'customer_id': cid, 'customer_name': names.get(cid, cid), 'amount': round(float(amount), 2)}
+                for cid, amount in revenue.head(int(k)).items()
+            ]
+        }
+
+    def aging_buckets(self, table: str) -> Dict[str, Any]:
+        """Outstanding amounts bucketed by days past due."""
+        if table not in self.AGING_TABLES:
+            raise ValueError(f"Unsupported table for aging_buckets: {table}")
+
+        def compute():
+            df = self._table(table)
+            if df.empty:
+                return {}
+            outstanding = df[df['status'] == 'Outstanding']
+            days_past_due = (self.as_of - outstanding['due_date']).dt.days.to_numpy(dtype=float)
+            amounts = outstanding['amount'].to_numpy(dtype=float)
+
+            buckets = {}
+            for label, low, high in self.AGING_BUCKETS:
+                mask = (days_past_due > low) & (days_past_due <= high)
+                buckets[label] = {'amount': round(float(amounts[mask].sum()), 2), 'count': int(mask.sum())}
+            return buckets
+
+        return {
+            'table': table,
+            'as_of': self.as_of.strftime('%Y-%m-%d'),
+            'buckets': self._cached(f"aging:{table}", compute)
+        }
+
+    def trend_cube(self) -> TrendCube:
+        """Month x member trend cube for this snapshot (see TrendCube)."""
+        return self._cached('trend_cube', lambda: TrendCube(self.data))
+
+    def month_trend(self, table: str, months: Optional[int] = None) -> Dict[str, Any]:
+        """Monthly totals for a transaction table."""
+        if table not in self.TREND_DATE_COLUMNS:
+            raise ValueError(f"Unsupported table for month_trend: {table}")
+
+        trend = self.trend_cube().slice(table, months=months)
+        return {
+            'table': table,
+            'months': {str(period): round(float(amount), 2) for period, amount in zip(trend['month'], trend['amount'])}
+        }
+
+    def trend_breakdown(self, table: str, dimension: str = 'total', member: Optional[str] = None,
+                        months: Optional[int] = 12, rank_by: str = 'amount') -> Dict[str, Any]:
+        """Rolling sums and MoM/YoY changes for a table total or member, or members ranked by a measure."""
+        cube = self.trend_cube()
+
+        def rounded(values: Dict[str, Any]) -> Dict[str, Any]:
+            return {name: None if pd.isna(value) else int(value) if name == 'count' else round(float(value), 2)
+                    for name, value in values.items()}
+
+        if dimension != 'total' and member is None:
+            ranked = cube.latest(table, dimension, k=10, by=rank_by)
+            periods = cube.periods(table)
+            return {
+                'table': table,
+                'dimension': dimension,
+                'month': str(periods[-1]) if len(periods) else None,
+                'rank_by': rank_by,
+                'members': [{'member': name, **rounded(values)} for name, values in ranked.to_dict('index').items()]
+            }
+
+        trend = cube.slice(table, dimension, members=None if member is None else [member], months=months)
+        if dimension != 'total' and trend.empty:
+            raise ValueError(f"Unknown {dimension} for {table}: {member}")
+        return {
+            'table': table,
+            'dimension': dimension,
+            'member': member or 'All',
+            'months': [{'month': str(row.pop('month')), **rounded({k: v for k, v in row.items() if k != dimension})}
+                       for row in trend.to_dict('records')]
+        }
+
+    @classmethod
+    def _downsample(cls, monthly: pd.DataFrame) -> pd.DataFrame:
+        """Roll a month-indexed frame of sums up to quarters, then years, until it fits MAX_CHART_POINTS."""
+        for freq in ('Q', 'Y'):
+            if len(monthly) <= cls.MAX_CHART_POINTS:
+                break
+            monthly = monthly.groupby(monthly.index.asfreq(freq)).sum()
+        return monthly
+
+    def _top_with_others(self, totals: pd.Series, names: Dict[str, str]) -> pd.DataFrame:
+        """Largest CHART_TOP_N entries by display name, with the remainder summed into one bar."""
+        top = totals.head(self.CHART_TOP_N)
+        chart = pd.DataFrame({'name': [names.get(key, key) for key in top.index], 'amount': top.to_numpy()})
+        rest = float(totals.iloc[self.CHART_TOP_N:].sum())
+        if rest:
+            chart.loc[len(chart)] = ['All others', rest]
+        return chart
+
+    def chart_series(self) -> Dict[str, pd.DataFrame]:
+        """
+        Aggregated, downsampled series for the dashboard charts.
+
+        Returns:
+            Dictionary of small DataFrames, computed once per snapshot:
+            - revenue_vs_expenses: period, revenue, expenses, bills and net (revenue - expenses),
+              at most MAX_CHART_POINTS rows
+            - ar_aging / ap_aging: bucket, amount, count of outstanding invoices / bills
+            - top_vendors / top_customers: name, amount
+        """
+        def compute():
+            cube = self.trend_cube()
+            columns = {'revenue': 'invoices', 'expenses': 'expenses', 'bills': 'bills'}
+            monthly = pd.DataFrame({
+                name: pd.Series(trend['amount'].to_numpy(), index=pd.PeriodIndex(trend['month'], freq='M'))
+                for name, trend in ((name, cube.slice(table)) for name, table in columns.items()) if not trend.empty
+            }).reindex(columns=list(columns)).fillna(0.0)
+            if len(monthly):
+                monthly = monthly.reindex(pd.period_range(monthly.index.min(), monthly.index.max(), freq='M'),
+                                          fill_value=0.0)
+            monthly = self._downsample(monthly)
+            monthly['net'] = monthly['revenue'] - monthly['expenses']
+            revenue_vs_expenses = monthly.rename_axis('period').reset_index()
+            revenue_vs_expenses['period'] = revenue_vs_expenses['period'].dt.start_time
+
+            aging = {}
+            for name, table in (('ar_aging', 'invoices'), ('ap_aging', 'bills')):
+                buckets = self.aging_buckets(table)['buckets']
+                aging[name] = pd.DataFrame([{'bucket': label, **values} for label, values in buckets.items()],
+                                           columns=['bucket', 'amount', 'count'])
+
+            vendor_names = self._cached('vendor_names', lambda: self._name_lookup('vendors', 'vendor_id', 'vendor_name'))
+            customer_names = self._cached('customer_names',
+                                          lambda: self._name_lookup('customers', 'customer_id', 'customer_name'))
+            vendor_spend = self._cached('vendor_spend:all', lambda: self._vendor_spend('all'))
+            customer_revenue = self._cached('customer_revenue', self._customer_revenue)
+            return {
+                'revenue_vs_expenses': revenue_vs_expenses,
+                **aging,
+                'top_vendors': self._top_with_others(vendor_spend, vendor_names),
+                'top_customers': self._top_with_others(customer_revenue, customer_names)
+            }
+
+        return self._cached('chart_series', compute)
+
+    def cash_forecaster(self, weeks: int = 13) -> CashForecaster:
+        """CashForecaster for this snapshot, starting at the engine's as-of date."""
+        return self._cached(f"cash_forecaster:{int(weeks)}",
+                            lambda: CashForecaster(self.data, as_of=self.as_of, weeks=int(weeks)))
+
+    def cash_forecast(self, weeks: int = 13) -> Dict[str, Any]:
+        """Weekly cash position projected from open invoices, bills and recurring expenses."""
+        forecaster = self.cash_forecaster(weeks)
+        weekly = forecaster.forecast()
+        return {
+            **forecaster.summary(),
+            'by_week': [
+                {
+                    'week': int(row.week),
+                    'week_start': row.week_start.strftime('%Y-%m-%d'),
+                    'inflows': round(float(row.inflows), 2),
+                    'outflows': round(float(row.outflows), 2),
+                    'cash_position': round(float(row.cash_position), 2)
+                }
+                for row in weekly.itertuples(index=False)
+            ]
+        }
+
+    def customer_scores(self) -> pd.DataFrame:
+        """Payment behavior scores for every customer, riskiest first (see PaymentBehaviorScorer)."""
+        return self._cached('customer_scores', lambda: PaymentBehaviorScorer(self.as_of).score(
+            self._table('invoices'), self._table('customers')))
+
+    def payment_behavior_summary(self) -> Dict[str, Any]:
+        """Receivables-wide payment behavior (DSO, on-time rate, risk bands)."""
+        return self._cached('payment_behavior_summary',
+                            lambda: PaymentBehaviorScorer.portfolio_summary(self.customer_scores()))
+
+    def customer_payment_scores(self, k: int = 10, order: str = 'riskiest') -> Dict[str, Any]:
+        """Top-k customers by payment behavior score, riskiest or most reliable first."""
+        if order not in ('riskiest', 'most_reliable'):
+            raise ValueError(f"Unsupported order for customer_payment_scores: {order}")
+
+        scores = self.customer_scores()
+        scores = scores[scores['invoice_count'] > 0]
+        selected = scores.head(int(k)) if order == 'riskiest' else scores.iloc[::-1].head(int(k))
+        columns = ['payment_score', 'risk_band', 'dso', 'avg_days_late', 'on_time_rate', 'credit_utilization',
+                   'outstanding', 'overdue']
+        return {
+            'order': order,
+            'summary': self.payment_behavior_summary(),
+            'customers': [
+                {
+                    'customer_id': customer_id,
+                    'customer_name': row.get('customer_name', customer_id),
+                    **{column: (None if pd.isna(row[column]) else
+                                row[column] if isinstance(row[column], str) else round(float(row[column]), 2))
+                       for column in columns}
+                }
+                for customer_id, row in selected.to_dict('index').items()
+            ]
+        }
+
+    def spend_findings(self) -> Dict[str, pd.DataFrame]:
+        """Duplicate payments and spend outliers in this snapshot (see SpendAnomalyDetector)."""
+        return self._cached('spend_findings', lambda: SpendAnomalyDetector().detect(self.data))
+
+    def spend_anomaly_summary(self) -> Dict[str, Any]:
+        """Counts and amounts of duplicate payments and spend outliers."""
+        return self._cached('spend_anomaly_summary', lambda: SpendAnomalyDetector.summarize(self.spend_findings()))
+
+    def spend_anomalies(self, k: int = 10) -> Dict[str, Any]:
+        """Top-k likely duplicate payments and spend outliers."""
+        findings = self.spend_findings()
+
+        def records(df: pd.DataFrame, columns: List[str]) -> List[Dict[str, Any]]:
+            rows = df[columns].head(int(k)).copy()
+            for column in rows.columns:
+                if pd.api.types.is_datetime64_any_dtype(rows[column]):
+                    rows[column] = rows[column].dt.strftime('%Y-%m-%d')
+                elif pd.api.types.is_float_dtype(rows[column]):
+                    rows[column] = rows[column].round(2)
+            return rows.astype(object).where(rows.notna(), None).to_dict('records')
+
+        return {
+            'summary': self.spend_anomaly_summary(),
+            'duplicates': records(findings['duplicates'], ['vendor_id', 'amount', 'match', 'days_apart', 'first_id',
+                                                           'first_date', 'second_id', 'second_date']),
+            'outliers': records(findings['outliers'], ['source', 'id', 'vendor_id', 'category', 'date', 'amount',
+                                                       'group', 'baseline_median', 'robust_z'])
+        }
+
+    def headline_totals(self) -> Dict[str, float]:
+        """Headline figures used in the financial summary (revenue, payables, margins, counts)."""
+        def compute():
+            invoices = self._table('invoices')
+            expenses = self._table('expenses')
+            bills = self._table('bills')
+            customers = self._table('customers')
+            vendors = self._table('vendors')
+            services = self._table('services')
+
+            invoice_status = invoices.groupby('status')['amount'].sum() if not invoices.empty else pd.Series(dtype=float)
+            total_revenue = float(invoices['amount'].sum()) if not invoices.empty else 0.0
+            paid_invoices = float(invoice_status.get('Paid', 0.0))
+            total_expenses = float(expenses['amount'].sum()) if not expenses.empty else 0.0
+            profit = total_revenue - total_expenses
+
+            return {
+                'total_revenue': total_revenue,
+                'outstanding_receivables': float(invoice_status.get('Outstanding', 0.0)),
+                'paid_invoices': paid_invoices,
+                'collection_rate': paid_invoices / total_revenue * 100 if total_revenue > 0 else 0.0,
+                'total_expenses': total_expenses,
+                'outstanding_payables': float(bills.loc[bills['status'] == 'Outstanding', 'amount'].sum()) if not bills.empty else 0.0,
+                'gross_profit': profit,
+                'profit_margin': profit / total_revenue * 100 if total_revenue > 0 else 0.0,
+                'active_customers': int((customers['active'] == True).sum()) if not customers.empty else 0,
+                'active_vendors': int((vendors['active'] == True).sum()) if not vendors.empty else 0,
+                'active_services': int((services['active'] == True).sum()) if not services.empty else 0,
+                'average_hourly_rate': float(services['hourly_rate'].mean()) if not services.empty else 0.0,
+                'average_credit_limit': float(customers['credit_limit'].mean()) if 'credit_limit' in customers.columns else 0.0
+            }
+
+        return self._cached('headline_totals', compute)
+
+    def financial_ratios(self) -> Dict[str, float]:
+        """FinancialAnalyzer.calculate_financial_ratios for this snapshot."""
+        return self._cached('financial_ratios', lambda: FinancialAnalyzer.calculate_financial_ratios(self.data))
+
+    def category_totals(self) -> pd.Series:
+        """Total expenses per category, largest first."""
+        def compute():
+            expenses = self._table('expenses')
+            if expenses.empty or 'category' not in expenses.columns:
+                return pd.Series(dtype=float)
+            return expenses.groupby('category')['amount'].sum().sort_values(ascending=False)
+
+        return self._cached('category_totals', compute)
+
+    def top_records(self, table: str, k: int = 5, largest: bool = True, status: Optional[str] = None) -> pd.DataFrame:
+        """
+        Largest (or smallest) records of a transaction table by amount.
+
+        Args:
+            table: Table name (expenses, bills, invoices)
+            k: Number of records
+            largest: Return the largest amounts if True, smallest otherwise
+            status: Optional status filter (e.g. Outstanding)
+
+        Returns:
+            DataFrame with the selected records
+        """
+        df = self._table(table)
+        if df.empty:
+            return df
+        if status:
+            df = df[df['status'] == status]
+        return df.nlargest(int(k), 'amount') if largest else df.nsmallest(int(k), 'amount')
+
+    def _name_lookup(self, table: str, id_column: str, name_column: str) -> Dict[str, str]:
+        """Build an id -> display name mapping for a reference table."""
+        df = self._table(table)
+        if df.empty or name_column not in df.columns:
+            return {}
+        return dict(zip(df[id_column], df[name_column]))
+
+    def execute_tool(self, name: str, arguments: Any) -> str:
+        """
+        Execute a metrics tool call requested by the model.
+
+        Args:
+            name: Tool (function) name
+            arguments: JSON string or dict of arguments
+
+        Returns:
+            Compact JSON string with the result or an error description
+        """
+        handler = self._handlers.get(name)
+        if handler is None:
+            return json.dumps({'error': f"Unknown tool: {name}"})
+
+        try:
+            kwargs = json.loads(arguments) if isinstance(arguments, str) else dict(arguments or {})
+            result = handler(**kwargs)
+        except Exception as e:
+            return json.dumps({'error': f"{name} failed: {str(e)}"})
+
+        return json.dumps(result, separators=(',', ':'))
+
+
+# Engines are cached per data snapshot and day (aging is relative to today) so aggregates
+# are computed once
+_engine_cache: Dict[tuple, FinancialMetricsEngine] = {}
+_engine_cache_lock = threading.Lock()
+_ENGINE_CACHE_SIZE = 4
+
+
+def get_metrics_engine(data: Dict) -> FinancialMetricsEngine:
+    """
+    Return the cached metrics engine for a data snapshot, building it if needed.
+
+    Args:
+        data: Dictionary containing all financial DataFrames and reports
+
+    Returns:
+        FinancialMetricsEngine bound to the snapshot
+    """
+    today = pd.Timestamp(datetime.now()).normalize()
+    # The same dictionary holding the same objects is the same snapshot; cached engines keep
+    # them alive, so their ids cannot be reused and the content hash can be skipped
+    identity = tuple((name, id(value)) for name, value in data.items())
+    fingerprint = None
+    with _engine_cache_lock:
+        for engine in _engine_cache.values():
+            if engine.data is data and engine.identity == identity:
+                if engine.as_of == today:
+                    return engine
+                # Same snapshot seen on an earlier day: reuse its fingerprint, rebuild the aggregates
+                fingerprint = engine.fingerprint
+
+    # Hashed outside the lock; concurrent first requests for a snapshot may both hash it
+    fingerprint = fingerprint or compute_data_fingerprint(data)
+    with _engine_cache_lock:
+        engine = _engine_cache.get((fingerprint, today))
+        if engine is None:
+            engine = FinancialMetricsEngine(data, as_of=today, fingerprint=fingerprint)
+            if len(_engine_cache) >= _ENGINE_CACHE_SIZE:
+                _engine_cache.pop(next(iter(_engine_cache)))
+            _engine_cache[(fingerprint, today)] = engine
+        return engine
+
+
+def discard_metrics_engines(data: Dict):
+    """
+    Drop cached engines bound to a data snapshot, e.g. a view the partition store evicted.
+
+    Engines hold their snapshot, so without this an evicted view would stay in memory for as
+    long as its engine stays cached.
+
+    Args:
+        data: The released data dictionary
+    """
+    with _engine_cache_lock:
+        for key in [key for key, engine in _engine_cache.items() if engine.data is data]:
+            del _engine_cache[key]
+
+
+add_eviction_listener(discard_metrics_engines)
+
+
+def snapshot_fingerprint(data: Dict) -> str:
+    """
+    Content fingerprint of a data snapshot, hashed once per snapshot.
+
+    Args:
+        data: Dictionary containing all financial DataFrames and reports
+
+    Returns:
+        The fingerprint of the snapshot's cached metrics engine
+    """
+    return get_metrics_engine(data).fingerprint
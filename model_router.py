@@ -0,0 +1,141 @@
+import os
+import re
+import statistics
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+
+class ModelRouter:
+    """
+    Chooses a model route for each question using a cheap local classification.
+    Small talk and simple lookups go to a fast route with a small completion budget;
+    analytical questions go to a deep route. Latency is recorded per route.
+    """
+
+    # Words that signal the user wants analysis rather than a single figure, matched as whole
+    # words so e.g. "explanation" or "asterisk" do not count as "plan" or "risk"
+    DEEP_PATTERN = re.compile(
+        r"\b(analy\w*|why|recommend\w*|suggest\w*|improv\w*|optimi\w*|strateg\w*|forecast\w*|predict\w*|"
+        r"trend\w*|compar\w*|explain\w*|assess\w*|risks?|risky|opportunit\w*|report\w*|plan(s|ned|ning)?|"
+        r"should\s+we|how\s+can|what\s+if|breakdowns?|insights?)\b",
+        re.IGNORECASE
+    )
+
+    # Phrasings typical of a simple lookup
+    LOOKUP_PATTERN = re.compile(
+        r"^\s*(what\s+(is|are|was|were)|what's|how\s+(much|many)|show|list|give\s+me|total|which|who|"
+        r"top|highest|lowest|largest|biggest)\b",
+        re.IGNORECASE
+    )
+
+    # Questions longer than this are treated as analytical
+    MAX_LOOKUP_WORDS = 18
+
+    def __init__(self, financial_keywords: List[str], routes: Optional[Dict[str, Dict[str, Any]]] = None,
+                 latency_window: int = 200):
+        """
+        Initialize the router.
+
+        Args:
+            financial_keywords: Keywords indicating a question needs financial data
+            routes: Per-route completion settings (defaults from environment variables)
+            latency_window: Number of recent latencies kept per route
+        """
+        self.financial_keywords = financial_keywords
+        self.routes = routes or self.routes_from_env()
+        self._latencies: Dict[str, Deque[float]] = {name: deque(maxlen=latency_window) for name in self.routes}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def routes_from_env() -> Dict[str, Dict[str, Any]]:
+        """
+        Build route settings from environment variables.
+
+        OPENAI_MODEL sets the default for both routes; OPENAI_FAST_MODEL / OPENAI_DEEP_MODEL,
+        OPENAI_FAST_MAX_TOKENS / OPENAI_DEEP_MAX_TOKENS and OPENAI_FAST_TEMPERATURE /
+        OPENAI_DEEP_TEMPERATURE override individual settings.
+
+        Returns:
+            Dictionary of route name to completion settings
+        """
+        default_model = os.getenv('OPENAI_MODEL', 'gpt-3.5-turbo')
+        return {
+            'fast': {
+                'model': os.getenv('OPENAI_FAST_MODEL', default_model),
+                'max_tokens': int(os.getenv('OPENAI_FAST_MAX_TOKENS', '400')),
+                'temperature': float(os.getenv('OPENAI_FAST_TEMPERATURE', '0.5'))
+            },
+            'deep': {
+                'model': os.getenv('OPENAI_DEEP_MODEL', default_model),
+                'max_tokens': int(os.getenv('OPENAI_DEEP_MAX_TOKENS', '1500')),
+                'temperature': float(os.getenv('OPENAI_DEEP_TEMPERATURE', '0.7'))
+            }
+        }
+
+    def needs_financial_data(self, question: str) -> bool:
+        """Whether the question mentions any financial keyword."""
+        question_lower = question.lower()
+        return any(keyword in question_lower for keyword in self.financial_keywords)
+
+    def classify(self, question: str) -> str:
+        """
+        Pick a route for a question.
+
+        Args:
+            question: The user's question
+
+        Returns:
+            Route name ('fast' or 'deep')
+        """
+        if self.DEEP_PATTERN.search(question):
+            return 'deep'
+        # Small talk: nothing financial in the question
+        if not self.needs_financial_data(question):
+            return 'fast'
+        # Short factual lookups about the data
+        if len(question.split()) <= self.MAX_LOOKUP_WORDS and self.LOOKUP_PATTERN.match(question):
+            return 'fast'
+        return 'deep'
+
+    def settings(self, route: str) -> Dict[str, Any]:
+        """Completion settings (model, max_tokens, temperature) for a route."""
+        return dict(self.routes[route])
+
+    def timed(self, route: str, request: Callable[[], Any]) -> Any:
+        """
+        Run a request and record its latency under a route.
+
+        Args:
+            route: Route name
+            request: Zero-argument callable performing the request
+
+        Returns:
+            Whatever the request returns
+        """
+        started = time.perf_counter()
+        try:
+            return request()
+        finally:
+            with self._lock:
+                self._latencies[route].append(time.perf_counter() - started)
+
+    def latency_stats(self) -> Dict[str, Dict[str, Optional[float]]]:
+        """
+        Latency summary per route.
+
+        Returns:
+            Dictionary of route name to count, p50 and p95 (seconds)
+        """
+        stats = {}
+        with self._lock:
+            for route, samples in self._latencies.items():
+                ordered = sorted(samples)
+                stats[route] = {
+                    'model': self.routes[route]['model'],
+                    'count': len(ordered),
+                    'p50': statistics.median(ordered) if ordered else None,
+                    'p95': ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] if ordered else None
+                }
+        return stats
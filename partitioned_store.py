@@ -0,0 +1,266 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from data_utils import DataLoader
+from instrumentation import metrics
+
+
+# Tables whose rows describe entities rather than transactions; when several periods
+# are combined the latest period's version of each row wins
+MASTER_TABLE_KEYS = {
+    'chart_of_accounts': 'account_code',
+    'vendors': 'vendor_id',
+    'customers': 'customer_id',
+    'services': 'service_id'
+}
+
+REPORT_NAMES = ['balance_sheet', 'cash_flow', 'profit_loss']
+
+# Called with each view a store evicts, so caches built from a view (e.g. metrics engines)
+# can drop it too instead of keeping it alive past the memory budget
+_eviction_listeners: List[Callable[[Dict], None]] = []
+
+
+def add_eviction_listener(listener: Callable[[Dict], None]):
+    """
+    Register a callback run with every view evicted from any PartitionedDataStore.
+
+    Args:
+        listener: Callable taking the evicted data dictionary
+    """
+    if listener not in _eviction_listeners:
+        _eviction_listeners.append(listener)
+
+
+def estimate_footprint(data: Dict) -> int:
+    """
+    Approximate in-memory size of a loaded data dictionary in bytes.
+
+    Args:
+        data: Dictionary of DataFrames and report strings
+
+    Returns:
+        Size in bytes (deep memory usage for DataFrames, UTF-8 length for strings)
+    """
+    total = 0
+    for value in data.values():
+        if isinstance(value, pd.DataFrame):
+            total += int(value.memory_usage(deep=True).sum())
+        elif isinstance(value, str):
+            total += len(value.encode('utf-8'))
+    return total
+
+
+class PartitionedDataStore:
+    """
+    Loads client books from a partitioned layout, one directory per tenant and
+    fiscal period:
+
+        <root>/<tenant>/<period>/{vendors,customers,expenses,...}.csv
+
+    Nothing is read until a session asks for a tenant. Loaded views are kept in a
+    process-wide LRU bounded by memory footprint, so memory follows the tenants
+    that are actually in use rather than the number of tenants on disk.
+    """
+
+    def __init__(self, root: str, max_bytes: int = 512 * 1024 * 1024):
+        """
+        Initialize the store (no data is loaded).
+
+        Args:
+            root: Directory containing one subdirectory per tenant
+            max_bytes: Memory budget for cached views; least recently used views are evicted
+        """
+        self.root = root
+        self.max_bytes = max_bytes
+        self._cache: "OrderedDict[Tuple[str, Tuple[str, ...]], Tuple[Dict, int]]" = OrderedDict()
+        self._cached_bytes = 0
+        self._lock = threading.Lock()
+        # One lock per view so concurrent sessions asking for the same view load it once
+        self._load_locks: Dict[Tuple[str, Tuple[str, ...]], threading.Lock] = {}
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    def list_tenants(self) -> List[str]:
+        """Tenant names (subdirectories of the root)."""
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(entry.name for entry in os.scandir(self.root) if entry.is_dir())
+
+    def list_periods(self, tenant: str) -> List[str]:
+        """Fiscal periods available for a tenant, oldest first."""
+        tenant_dir = os.path.join(self.root, tenant)
+        if not os.path.isdir(tenant_dir):
+            return []
+        return sorted(entry.name for entry in os.scandir(tenant_dir) if entry.is_dir())
+
+    def partition_loader(self, tenant: str, period: str) -> DataLoader:
+        """DataLoader for a single tenant/period partition."""
+        return DataLoader(os.path.join(self.root, tenant, period))
+
+    def _read_partition(self, tenant: str, period: str) -> Dict:
+        loader = self.partition_loader(tenant, period)
+        with metrics.span('load_partition', tenant=tenant):
+            return loader.load_all_data_shared()
+
+    @staticmethod
+    def _combine(partitions: List[Dict]) -> Dict:
+        """Concatenate partitions (given oldest first) into one view."""
+        if len(partitions) == 1:
+            return partitions[0]
+
+        combined = {}
+        tables = dict.fromkeys(name for partition in partitions for name, value in partition.items()
+                               if isinstance(value, pd.DataFrame))
+        for name in tables:
+            frames = [partition[name] for partition in partitions
+                      if isinstance(partition.get(name), pd.DataFrame) and not partition[name].empty]
+            df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+            key = MASTER_TABLE_KEYS.get(name)
+            if key and key in df.columns:
+                df = df.drop_duplicates(subset=key, keep='last')
+            # Restore the order DataLoader gives a single partition (e.g. newest expenses first)
+            sort_column, ascending = DataLoader.TABLE_ORDER.get(name, (None, True))
+            if sort_column in df.columns:
+                df = df.sort_values(sort_column, ascending=ascending, kind='stable')
+            combined[name] = df.reset_index(drop=True)
+
+        # Statements describe a period, so the latest period's reports are used
+        for report in REPORT_NAMES:
+            combined[report] = partitions[-1].get(report, f"Report {report} not found")
+        return combined
+
+    def _evict(self, keep: Tuple[str, Tuple[str, ...]]) -> List[Dict]:
+        """
+        Drop least recently used views until within budget (lock held by caller).
+
+        Returns:
+            The evicted views, for the caller to pass to the eviction listeners once unlocked
+        """
+        evicted = []
+        while self._cached_bytes > self.max_bytes and len(self._cache) > 1:
+            key, (data, size) = next(iter(self._cache.items()))
+            if key == keep:
+                self._cache.move_to_end(key)
+                continue
+            del self._cache[key]
+            self._load_locks.pop(key, None)
+            self._cached_bytes -= size
+            self.stats['evictions'] += 1
+            evicted.append(data)
+        return evicted
+
+    def load(self, tenant: str, periods: Optional[Sequence[str]] = None) -> Dict:
+        """
+        Load a tenant's data for some or all fiscal periods.
+
+        Args:
+            tenant: Tenant name
+            periods: Periods to include (default: all periods of the tenant)
+
+        Returns:
+            Dictionary of DataFrames and reports, shaped like DataLoader.load_all_data
+            plus load_all_reports. Treat it as read-only: it is shared across sessions.
+
+        Raises:
+            FileNotFoundError: If the tenant or a requested period does not exist
+        """
+        available = self.list_periods(tenant)
+        if not available:
+            raise FileNotFoundError(f"No partitions found for tenant: {tenant}")
+        selected = tuple(sorted(periods)) if periods else tuple(available)
+        unknown = set(selected) - set(available)
+        if unknown:
+            raise FileNotFoundError(f"Unknown periods for {tenant}: {sorted(unknown)}")
+
+        key = (tenant, selected)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self.stats['hits'] += 1
+                return cached[0]
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        with load_lock:
+            # Another session may have finished loading while we waited
+            with self._lock:
+                cached = self._cache.get(key)
+                if cached is not None:
+                    self._cache.move_to_end(key)
+                    self.stats['hits'] += 1
+                    return cached[0]
+
+            data = self._combine([self._read_partition(tenant, period) for period in selected])
+            size = estimate_footprint(data)
+
+            with self._lock:
+                self.stats['misses'] += 1
+                self._cache[key] = (data, size)
+                self._cached_bytes += size
+                evicted = self._evict(keep=key)
+
+            for view in evicted:
+                for listener in list(_eviction_listeners):
+                    listener(view)
+            return data
+
+    def memory_usage(self) -> Dict[str, int]:
+        """Cached views and their total footprint in bytes."""
+        with self._lock:
+            return {'views': len(self._cache), 'bytes': self._cached_bytes, 'max_bytes': self.max_bytes}
+
+
+_stores: Dict[str, PartitionedDataStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_partitioned_store(root: Optional[str] = None) -> Optional[PartitionedDataStore]:
+    """
+    Return the process-wide store for a partition root.
+
+    Args:
+        root: Partition root (defaults to the DATA_PARTITIONS_ROOT environment variable)
+
+    Returns:
+        Shared PartitionedDataStore, or None when no partition root is configured
+    """
+    root = root or os.getenv('DATA_PARTITIONS_ROOT')
+    if not root:
+        return None
+    with _stores_lock:
+        if root not in _stores:
+            max_mb = int(os.getenv('DATA_CACHE_MAX_MB', '512'))
+            _stores[root] = PartitionedDataStore(root, max_bytes=max_mb * 1024 * 1024)
+        return _stores[root]
+
+
+# Example usage and testing
+if __name__ == "__main__":
+    import shutil
+    import tempfile
+
+    from synthetic_data import generate_ledger
+
+    root = tempfile.mkdtemp(prefix="partitions-")
+    try:
+        for tenant_number in range(1, 4):
+            for period in ('2023', '2024'):
+                generate_ledger(os.path.join(root, f"tenant-{tenant_number}", period), rows=2000,
+                                seed=tenant_number * 100 + int(period))
+
+        store = PartitionedDataStore(root, max_bytes=4 * 1024 * 1024)
+        print(f"Tenants: {store.list_tenants()}, periods: {store.list_periods('tenant-1')}")
+
+        for tenant in store.list_tenants():
+            data = store.load(tenant)
+            print(f"{tenant}: {len(data['invoices']):,} invoices, {len(data['vendors'])} vendors, "
+                  f"cache {store.memory_usage()}")
+        store.load('tenant-3', ['2024'])
+        store.load('tenant-3', ['2024'])
+        print(f"Stats: {store.stats}, cache {store.memory_usage()}")
+    finally:
+        shutil.rmtree(root)
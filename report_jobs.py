@@ -0,0 +1,393 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from data_utils import FinancialAnalyzer, compute_data_fingerprint
+
+
+# Prefixes used by FinancialChatBot for error responses
+ERROR_PREFIXES = ("❌", "⏳", "💳")
+
+
+def collect_response_text(response: Any) -> str:
+    """
+    Turn a FinancialChatBot response (error string or completion stream) into text.
+
+    Args:
+        response: String or iterable of streamed chat completion chunks
+
+    Returns:
+        Full response text
+    """
+    if isinstance(response, str):
+        return response
+
+    parts = []
+    for chunk in response:
+        if chunk.choices and getattr(chunk.choices[0].delta, 'content', None):
+            parts.append(chunk.choices[0].delta.content)
+    return "".join(parts)
+
+
+class ReportJobQueue:
+    """
+    Persistent SQLite-backed queue of report generation jobs.
+    Jobs are keyed by data snapshot so each snapshot's reports are generated once,
+    and jobs left running by a crashed or restarted process are picked up again.
+    Each job also records its scope (the tenant in multi-tenant mode) so a new
+    snapshot only supersedes pending work of the same scope.
+    """
+
+    REPORT_TYPES = ['summary', 'detailed', 'executive']
+
+    def __init__(self, db_path: str = os.path.join('.cache', 'report_jobs.sqlite3'), max_attempts: int = 3,
+                 lease_seconds: float = 600.0):
+        """
+        Open (or create) the job database.
+
+        Args:
+            db_path: Path to the SQLite database file
+            max_attempts: Attempts per job before it is marked failed
+            lease_seconds: How long a running job may go without a lease renewal before it is assumed abandoned
+        """
+        self.db_path = db_path
+        self.max_attempts = max_attempts
+        self.lease_seconds = lease_seconds
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS report_jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                snapshot TEXT NOT NULL,
+                scope TEXT NOT NULL DEFAULT '',
+                kind TEXT NOT NULL,
+                job_key TEXT NOT NULL,
+                params TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                result TEXT,
+                error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                UNIQUE (snapshot, kind, job_key)
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_report_jobs_status ON report_jobs (status, snapshot)")
+        self.recover()
+
+    def recover(self) -> int:
+        """
+        Return jobs interrupted mid-run (e.g. by a restart) to the pending state.
+
+        Only jobs whose lease has expired are recovered. Workers renew the lease
+        while a job runs (see renew), so jobs still running in another process
+        sharing the database are left alone however long they take.
+
+        Returns:
+            Number of jobs recovered
+        """
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE report_jobs SET status = 'pending', updated_at = ? "
+                "WHERE status = 'running' AND updated_at < ?",
+                (now, now - self.lease_seconds)
+            )
+            return cursor.rowcount
+
+    def enqueue(self, snapshot: str, kind: str, job_key: str, params: Dict[str, Any], scope: str = '') -> bool:
+        """
+        Add a job unless an identical one already exists for the snapshot.
+
+        Returns:
+            True if a new job was added
+        """
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO report_jobs (snapshot, scope, kind, job_key, params, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (snapshot, scope, kind, job_key, json.dumps(params), now, now)
+            )
+            return cursor.rowcount > 0
+
+    def enqueue_snapshot(self, data: Dict, snapshot: Optional[str] = None, scope: str = '') -> int:
+        """
+        Queue every precomputed report and ratio explanation for a data snapshot.
+
+        Args:
+            data: Dictionary containing all financial DataFrames and reports
+            snapshot: Snapshot key (e.g. the source file signature); content fingerprint when omitted
+            scope: Scope the snapshot belongs to (the tenant in multi-tenant mode)
+
+        Returns:
+            Number of new jobs added
+        """
+        snapshot = snapshot or compute_data_fingerprint(data)
+        self.recover()
+        added = 0
+
+        for report_type in self.REPORT_TYPES:
+            added += self.enqueue(snapshot, 'report', report_type, {'report_type': report_type}, scope)
+
+        ratios = FinancialAnalyzer.calculate_financial_ratios(data)
+        for metric_name, value in ratios.items():
+            added += self.enqueue(snapshot, 'metric_explanation', metric_name,
+                                  {'metric_name': metric_name, 'current_value': round(float(value), 2)}, scope)
+
+        # Work queued for this scope's older snapshots is no longer worth doing; revive this
+        # snapshot's if it returns. Other scopes (tenants) keep their queued work.
+        with self._lock:
+            now = time.time()
+            self._conn.execute(
+                "UPDATE report_jobs SET status = 'stale', updated_at = ? "
+                "WHERE status = 'pending' AND scope = ? AND snapshot != ?",
+                (now, scope, snapshot)
+            )
+            self._conn.execute(
+                "UPDATE report_jobs SET status = 'pending', updated_at = ? WHERE status = 'stale' AND snapshot = ?",
+                (now, snapshot)
+            )
+
+        return added
+
+    def claim_next(self, snapshots: List[str]) -> Optional[Dict[str, Any]]:
+        """
+        Atomically claim the oldest pending job for one of the given snapshots.
+
+        Args:
+            snapshots: Snapshot fingerprints this worker has data for
+
+        Returns:
+            Claimed job as a dictionary, or None if nothing is pending
+        """
+        if not snapshots:
+            return None
+
+        placeholders = ",".join("?" * len(snapshots))
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    f"SELECT id, snapshot, kind, job_key, params, attempts FROM report_jobs "
+                    f"WHERE status = 'pending' AND snapshot IN ({placeholders}) ORDER BY id LIMIT 1",
+                    snapshots
+                ).fetchone()
+                if row is None:
+                    self._conn.execute("COMMIT")
+                    return None
+                self._conn.execute(
+                    "UPDATE report_jobs SET status = 'running', attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                    (time.time(), row[0])
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+        return {
+            'id': row[0], 'snapshot': row[1], 'kind': row[2], 'job_key': row[3],
+            'params': json.loads(row[4]), 'attempts': row[5] + 1
+        }
+
+    def renew(self, job_id: int) -> bool:
+        """
+        Extend the lease of a running job.
+
+        Returns:
+            False if the job is no longer running (e.g. it was recovered by another process)
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE report_jobs SET updated_at = ? WHERE id = ? AND status = 'running'",
+                (time.time(), job_id)
+            )
+            return cursor.rowcount > 0
+
+    def complete(self, job_id: int, result: str):
+        """Store a job's result."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE report_jobs SET status = 'done', result = ?, error = NULL, updated_at = ? WHERE id = ?",
+                (result, time.time(), job_id)
+            )
+
+    def fail(self, job_id: int, error: str):
+        """Record a failed attempt; the job is retried until max_attempts is reached."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE report_jobs SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                "error = ?, updated_at = ? WHERE id = ?",
+                (self.max_attempts, error, time.time(), job_id)
+            )
+
+    def get_results(self, snapshot: str, kind: str) -> Dict[str, Dict[str, Any]]:
+        """
+        Fetch the status and stored result of every job of a kind for a snapshot.
+
+        Returns:
+            Dictionary keyed by job key with status, result, error and updated_at
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT job_key, status, result, error, updated_at FROM report_jobs "
+                "WHERE snapshot = ? AND kind = ? ORDER BY id",
+                (snapshot, kind)
+            ).fetchall()
+        return {
+            row[0]: {'status': row[1], 'result': row[2], 'error': row[3], 'updated_at': row[4]}
+            for row in rows
+        }
+
+    def retry_failed(self, snapshot: str) -> int:
+        """Reset failed jobs of a snapshot so they run again."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE report_jobs SET status = 'pending', attempts = 0, updated_at = ? "
+                "WHERE snapshot = ? AND status = 'failed'",
+                (time.time(), snapshot)
+            )
+            return cursor.rowcount
+
+
+class ReportWorkerPool:
+    """
+    Background threads that drain the report job queue using FinancialChatBot.
+    The latest snapshot of each scope (tenant) is kept so sessions viewing
+    different tenants do not cancel each other's reports.
+    """
+
+    # Scopes whose latest snapshot stays registered; older scopes' jobs wait until resubmitted
+    MAX_SCOPES = 8
+
+    def __init__(self, queue: ReportJobQueue, bot_factory: Callable[[], Any], workers: int = 2,
+                 poll_interval: float = 1.0):
+        """
+        Initialize the pool (call start() to launch workers).
+
+        Args:
+            queue: Job queue to drain
+            bot_factory: Callable returning a configured FinancialChatBot
+            workers: Number of worker threads
+            poll_interval: Seconds to sleep when the queue is empty
+        """
+        self.queue = queue
+        self.bot_factory = bot_factory
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self._snapshots: "OrderedDict[str, Tuple[str, Dict]]" = OrderedDict()
+        self._snapshots_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def submit_snapshot(self, data: Dict, snapshot: str, scope: str = '') -> str:
+        """
+        Register a data snapshot and queue its jobs (no-op for a known snapshot).
+
+        Args:
+            data: Dictionary containing all financial DataFrames and reports
+            snapshot: Snapshot key, e.g. the source file signature (cheap to compute on every rerun)
+            scope: Scope the snapshot belongs to (the tenant in multi-tenant mode)
+
+        Returns:
+            Snapshot key
+        """
+        with self._snapshots_lock:
+            current = self._snapshots.get(scope)
+            if current is not None and current[0] == snapshot:
+                self._snapshots.move_to_end(scope)
+                return snapshot
+            # Only the latest snapshot of each scope is worth precomputing
+            self._snapshots[scope] = (snapshot, data)
+            self._snapshots.move_to_end(scope)
+            while len(self._snapshots) > self.MAX_SCOPES:
+                self._snapshots.popitem(last=False)
+
+        self.queue.enqueue_snapshot(data, snapshot, scope)
+        self._wake.set()
+        return snapshot
+
+    @property
+    def is_running(self) -> bool:
+        """Whether worker threads have been started."""
+        return bool(self._threads) and not self._stop.is_set()
+
+    def start(self):
+        """Launch the worker threads."""
+        if self._threads:
+            return
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"report-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        """Signal workers to exit after their current job."""
+        self._stop.set()
+        self._wake.set()
+
+    def _run(self):
+        bot = self.bot_factory()
+        while not self._stop.is_set():
+            with self._snapshots_lock:
+                snapshots = dict(self._snapshots.values())
+
+            job = self.queue.claim_next(list(snapshots))
+            if job is None:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+                continue
+
+            heartbeat = self._start_heartbeat(job['id'])
+            try:
+                result = self._execute(bot, job, snapshots[job['snapshot']])
+                if result.startswith(ERROR_PREFIXES):
+                    self.queue.fail(job['id'], result)
+                else:
+                    self.queue.complete(job['id'], result)
+            except Exception as e:
+                print(f"Error running report job {job['id']}: {e}")
+                self.queue.fail(job['id'], str(e))
+            finally:
+                heartbeat.set()
+
+    def _start_heartbeat(self, job_id: int) -> threading.Event:
+        """
+        Renew a job's lease in the background until the returned event is set.
+
+        Renewing several times per lease keeps long-running jobs from being
+        recovered (and run twice) while the worker is still alive.
+        """
+        done = threading.Event()
+        interval = self.queue.lease_seconds / 4
+
+        def beat():
+            while not done.wait(interval):
+                if not self.queue.renew(job_id):
+                    return
+
+        threading.Thread(target=beat, name=f"report-heartbeat-{job_id}", daemon=True).start()
+        return done
+
+    @staticmethod
+    def _execute(bot: Any, job: Dict[str, Any], data: Dict) -> str:
+        """Run one job with the chatbot and return its text."""
+        params = job['params']
+        if job['kind'] == 'report':
+            response = bot.generate_financial_report(params['report_type'], data)
+        elif job['kind'] == 'metric_explanation':
+            response = bot.explain_financial_metric(params['metric_name'], params['current_value'], data)
+        else:
+            raise ValueError(f"Unknown job kind: {job['kind']}")
+        return collect_response_text(response).strip()
@@ -0,0 +1,164 @@
+import hashlib
+import json
+import threading
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+
+def make_request_key(model: str, messages: List[Dict[str, Any]], data_fingerprint: str = "") -> str:
+    """
+    Build the coalescing key for a request.
+
+    Args:
+        model: Model name
+        messages: Chat messages sent to the model
+        data_fingerprint: Fingerprint of the data snapshot the prompt was built from
+
+    Returns:
+        Hex digest identifying identical requests
+    """
+    payload = json.dumps({'model': model, 'messages': messages, 'data': data_fingerprint},
+                         sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class _Flight:
+    """A single in-progress upstream request and the chunks received so far."""
+
+    def __init__(self):
+        self.chunks: List[Any] = []
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.done = False
+        self._condition = threading.Condition()
+
+    def append(self, chunk: Any):
+        with self._condition:
+            self.chunks.append(chunk)
+            self._condition.notify_all()
+
+    def finish(self, result: Any = None, error: Optional[BaseException] = None):
+        with self._condition:
+            self.result = result
+            self.error = error
+            self.done = True
+            self._condition.notify_all()
+
+    def wait(self) -> Any:
+        """Block until the flight finishes and return its result."""
+        with self._condition:
+            while not self.done:
+                self._condition.wait()
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+    def replay(self) -> Iterator[Any]:
+        """Yield every chunk from the start, then follow the live stream until it ends."""
+        index = 0
+        while True:
+            with self._condition:
+                while index >= len(self.chunks) and not self.done:
+                    self._condition.wait()
+                if index < len(self.chunks):
+                    batch = self.chunks[index:]
+                    index = len(self.chunks)
+                elif self.error is not None:
+                    raise self.error
+                else:
+                    return
+            yield from batch
+
+
+class SingleFlight:
+    """
+    Deduplicates concurrent identical requests within a process.
+    The first caller for a key performs the upstream call; callers arriving while
+    it is in flight share its result, and streamed chunks fan out to all of them.
+    """
+
+    def __init__(self):
+        self._flights: Dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+        self.stats = {'upstream_calls': 0, 'coalesced': 0}
+
+    def _join(self, key: str):
+        """Return (flight, is_leader) for a key, registering a new flight if none is active."""
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                self.stats['coalesced'] += 1
+                return flight, False
+            flight = _Flight()
+            self._flights[key] = flight
+            self.stats['upstream_calls'] += 1
+            return flight, True
+
+    def _land(self, key: str, flight: _Flight):
+        """Retire a finished flight so later requests start fresh."""
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+
+    def call(self, key: str, request: Callable[[], Any]) -> Any:
+        """
+        Run a non-streaming request once for all concurrent callers with the same key.
+
+        Args:
+            key: Coalescing key (see make_request_key)
+            request: Zero-argument callable performing the upstream call
+
+        Returns:
+            The shared result
+        """
+        flight, is_leader = self._join(key)
+        if is_leader:
+            try:
+                flight.finish(result=request())
+            except BaseException as e:
+                flight.finish(error=e)
+            finally:
+                self._land(key, flight)
+        return flight.wait()
+
+    def stream(self, key: str, start: Callable[[], Iterable[Any]]) -> Iterator[Any]:
+        """
+        Start or join a streaming request and return an iterator over its chunks.
+
+        The leader opens the upstream stream in the calling thread, so connection
+        errors surface to it directly; a background thread then pumps chunks to
+        every subscriber, each of which reads at its own pace.
+
+        Args:
+            key: Coalescing key (see make_request_key)
+            start: Zero-argument callable returning the upstream chunk iterable
+
+        Returns:
+            Iterator over the streamed chunks
+        """
+        flight, is_leader = self._join(key)
+        if not is_leader:
+            return flight.replay()
+
+        try:
+            upstream = start()
+        except BaseException as e:
+            flight.finish(error=e)
+            self._land(key, flight)
+            raise
+
+        def pump():
+            try:
+                for chunk in upstream:
+                    flight.append(chunk)
+                flight.finish()
+            except BaseException as e:
+                flight.finish(error=e)
+            finally:
+                self._land(key, flight)
+
+        threading.Thread(target=pump, name="single-flight-pump", daemon=True).start()
+        return flight.replay()
+
+
+# One coalescer per process so identical requests from all sessions share a call
+shared_single_flight = SingleFlight()
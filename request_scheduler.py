@@ -0,0 +1,308 @@
+import heapq
+import os
+import random
+import threading
+import time
+from typing import Any, Callable, List, Optional
+
+
+class TokenBucket:
+    """
+    Classic token bucket: holds up to `capacity` units and refills continuously
+    at `refill_rate` units per second.
+    """
+
+    def __init__(self, capacity: float, refill_rate: float, clock: Callable[[], float] = time.monotonic):
+        """
+        Initialize a full bucket.
+
+        Args:
+            capacity: Maximum units the bucket can hold (burst size)
+            refill_rate: Units added per second
+            clock: Monotonic clock, injectable for testing
+        """
+        self.capacity = float(capacity)
+        self.refill_rate = float(refill_rate)
+        self.clock = clock
+        self.available = float(capacity)
+        self._last_refill = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self.available = min(self.capacity, self.available + (now - self._last_refill) * self.refill_rate)
+        self._last_refill = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` units are available (0 if available now)."""
+        self._refill()
+        # Requests larger than the bucket are allowed once it is full
+        amount = min(amount, self.capacity)
+        if self.available >= amount:
+            return 0.0
+        return (amount - self.available) / self.refill_rate
+
+    def consume(self, amount: float):
+        """Take `amount` units (may go negative for oversized requests)."""
+        self._refill()
+        self.available -= amount
+
+
+class RateLimitedError(Exception):
+    """Raised when a request still hits the rate limit after all retries."""
+
+
+class RequestScheduler:
+    """
+    Shared scheduler for OpenAI requests.
+    Enforces requests-per-minute and tokens-per-minute quotas with token buckets,
+    serves waiting callers in FIFO order across threads (Streamlit sessions),
+    and retries rate-limited or transient failures with jittered exponential
+    backoff, honoring Retry-After headers. A retried request keeps its original
+    place in the queue.
+    """
+
+    # HTTP status codes worth retrying
+    RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+    def __init__(self, requests_per_minute: int = 500, tokens_per_minute: int = 60000,
+                 max_retries: int = 5, base_delay: float = 0.5, max_delay: float = 30.0,
+                 clock: Callable[[], float] = time.monotonic, sleep: Callable[[float], None] = time.sleep):
+        """
+        Initialize the scheduler.
+
+        Args:
+            requests_per_minute: Request quota per minute
+            tokens_per_minute: Token quota per minute (prompt plus completion)
+            max_retries: Retries per request after the first attempt
+            base_delay: Initial backoff delay in seconds
+            max_delay: Upper bound for a single backoff delay in seconds
+            clock: Monotonic clock, injectable for testing
+            sleep: Sleep function, injectable for testing
+        """
+        self.request_bucket = TokenBucket(requests_per_minute, requests_per_minute / 60.0, clock)
+        self.token_bucket = TokenBucket(tokens_per_minute, tokens_per_minute / 60.0, clock)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.clock = clock
+        self.sleep = sleep
+
+        self._condition = threading.Condition()
+        self._next_ticket = 0
+        # Tickets of the callers waiting for their turn; the lowest (oldest) is served next
+        self._waiting: List[int] = []
+        # Set after a 429 so queued callers wait out the server's cooldown too
+        self._paused_until = 0.0
+
+        self.stats = {'requests': 0, 'retries': 0, 'rate_limited': 0, 'failures': 0, 'queue_wait': 0.0}
+
+    def _count(self, stat: str, amount: float = 1):
+        with self._condition:
+            self.stats[stat] += amount
+
+    def _acquire(self, estimated_tokens: int, ticket: Optional[int] = None) -> int:
+        """
+        Wait for this caller's turn in the queue and for quota to be available.
+
+        Args:
+            estimated_tokens: Tokens charged against the TPM quota
+            ticket: Ticket from an earlier attempt of the same request, so a retry
+                queues ahead of requests that arrived after it
+
+        Returns:
+            The caller's ticket
+        """
+        with self._condition:
+            if ticket is None:
+                ticket = self._next_ticket
+                self._next_ticket += 1
+            heapq.heappush(self._waiting, ticket)
+            queued_at = self.clock()
+
+            while True:
+                if ticket == self._waiting[0]:
+                    wait = max(
+                        self._paused_until - self.clock(),
+                        self.request_bucket.wait_time(1),
+                        self.token_bucket.wait_time(estimated_tokens)
+                    )
+                    if wait <= 0:
+                        break
+                    # Condition.wait releases the lock so other callers can enqueue
+                    self._condition.wait(timeout=min(wait, 1.0))
+                else:
+                    self._condition.wait(timeout=1.0)
+
+            heapq.heappop(self._waiting)
+            self.request_bucket.consume(1)
+            self.token_bucket.consume(estimated_tokens)
+            self.stats['queue_wait'] += self.clock() - queued_at  # lock already held
+            self._condition.notify_all()
+            return ticket
+
+    @staticmethod
+    def _status_code(error: Exception) -> Optional[int]:
+        status = getattr(error, 'status_code', None)
+        if status is None:
+            status = getattr(getattr(error, 'response', None), 'status_code', None)
+        return status
+
+    @staticmethod
+    def _retry_after(error: Exception) -> Optional[float]:
+        """Server-suggested delay in seconds from Retry-After / retry-after-ms headers."""
+        headers = getattr(getattr(error, 'response', None), 'headers', None)
+        if not headers:
+            return None
+        try:
+            if headers.get('retry-after-ms'):
+                return float(headers['retry-after-ms']) / 1000.0
+            if headers.get('retry-after'):
+                return float(headers['retry-after'])
+        except (TypeError, ValueError):
+            return None
+        return None
+
+    def is_retryable(self, error: Exception) -> bool:
+        """Whether a failed request should be retried."""
+        message = str(error).lower()
+        # Exhausted billing quota also returns 429 but will not recover by waiting
+        if "insufficient_quota" in message or ("quota" in message and "rate limit" not in message):
+            return False
+
+        status = self._status_code(error)
+        if status is not None:
+            return status in self.RETRYABLE_STATUS_CODES
+        return "rate limit" in message or "timeout" in message or "connection" in message
+
+    def backoff_delay(self, attempt: int, error: Optional[Exception] = None) -> float:
+        """Delay before retry `attempt` (0-based): Retry-After if given, else full-jitter exponential."""
+        retry_after = self._retry_after(error) if error is not None else None
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def call(self, request: Callable[[], Any], estimated_tokens: int = 1000) -> Any:
+        """
+        Run a request under the rate limits, retrying retryable failures.
+
+        Args:
+            request: Zero-argument callable that performs the API call
+            estimated_tokens: Prompt plus completion tokens charged against the TPM quota
+
+        Returns:
+            Whatever the request returns
+
+        Raises:
+            RateLimitedError: If the request is still rate limited after all retries
+            Exception: Any non-retryable error from the request
+        """
+        ticket = None
+        for attempt in range(self.max_retries + 1):
+            ticket = self._acquire(estimated_tokens, ticket)
+            self._count('requests')
+
+            try:
+                return request()
+            except Exception as e:
+                is_rate_limit = self._status_code(e) == 429 or "rate limit" in str(e).lower()
+                if is_rate_limit:
+                    self._count('rate_limited')
+
+                if not self.is_retryable(e) or attempt == self.max_retries:
+                    self._count('failures')
+                    if is_rate_limit:
+                        raise RateLimitedError(f"Rate limit exceeded after {attempt + 1} attempts: {e}") from e
+                    raise
+
+                delay = self.backoff_delay(attempt, e)
+                self._count('retries')
+
+                if is_rate_limit:
+                    # Hold the whole queue so other sessions don't pile more 429s on the server
+                    with self._condition:
+                        self._paused_until = max(self._paused_until, self.clock() + delay)
+                        self._condition.notify_all()
+                else:
+                    self.sleep(delay)
+
+
+_shared_scheduler: Optional[RequestScheduler] = None
+_shared_scheduler_lock = threading.Lock()
+
+
+def get_shared_scheduler() -> RequestScheduler:
+    """
+    Return the process-wide scheduler, sized from OPENAI_RPM, OPENAI_TPM and OPENAI_MAX_RETRIES.
+
+    Returns:
+        Shared RequestScheduler instance
+    """
+    global _shared_scheduler
+    with _shared_scheduler_lock:
+        if _shared_scheduler is None:
+            _shared_scheduler = RequestScheduler(
+                requests_per_minute=int(os.getenv('OPENAI_RPM', '500')),
+                tokens_per_minute=int(os.getenv('OPENAI_TPM', '60000')),
+                max_retries=int(os.getenv('OPENAI_MAX_RETRIES', '5'))
+            )
+        return _shared_scheduler
+
+
+# Example usage and testing against a local mock server
+if __name__ == "__main__":
+    import json
+    from concurrent.futures import ThreadPoolExecutor
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    from openai import OpenAI
+
+    class ScriptedHandler(BaseHTTPRequestHandler):
+        """Returns 429 with Retry-After for every third request, otherwise a completion."""
+        counter = 0
+        lock = threading.Lock()
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            with ScriptedHandler.lock:
+                ScriptedHandler.counter += 1
+                throttle = ScriptedHandler.counter % 3 == 0
+
+            if throttle:
+                body = json.dumps({"error": {"message": "Rate limit reached", "type": "rate_limit_error"}})
+                self.send_response(429)
+                self.send_header('Retry-After', '0.2')
+            else:
+                body = json.dumps({
+                    "id": "cmpl-local", "object": "chat.completion", "created": 0, "model": "mock",
+                    "choices": [{"index": 0, "finish_reason": "stop",
+                                 "message": {"role": "assistant", "content": "ok"}}]
+                })
+                self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.end_headers()
+            self.wfile.write(body.encode('utf-8'))
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), ScriptedHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    client = OpenAI(api_key="test", base_url=f"http://127.0.0.1:{server.server_port}/v1", max_retries=0)
+    scheduler = RequestScheduler(requests_per_minute=600, tokens_per_minute=600000)
+
+    def one_request(i):
+        response = scheduler.call(
+            lambda: client.chat.completions.create(model="mock", messages=[{"role": "user", "content": str(i)}]),
+            estimated_tokens=100
+        )
+        return response.choices[0].message.content
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(one_request, range(30)))
+    elapsed = time.monotonic() - started
+    server.shutdown()
+
+    print(f"Completed {results.count('ok')}/30 requests in {elapsed:.2f}s")
+    print(f"Scheduler stats: {scheduler.stats}")
@@ -0,0 +1,346 @@
+import re
+import threading
+import weakref
+from collections import Counter, OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+# Words too common to help ranking financial passages
+STOPWORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'how', 'in', 'is',
+    'it', 'of', 'on', 'or', 'our', 'that', 'the', 'this', 'to', 'was', 'we', 'what',
+    'which', 'with', 'do', 'does', 'did', 'can', 'you', 'me', 'my', 'i', 'us', 'about'
+}
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[.'][a-z0-9]+)*")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokenization with stopword removal."""
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+def chunk_markdown_report(report_name: str, content: str) -> List[Dict[str, str]]:
+    """
+    Split a markdown report into one passage per section heading.
+
+    Args:
+        report_name: Name of the report (balance_sheet, cash_flow, profit_loss)
+        content: Markdown content of the report
+
+    Returns:
+        List of passages with a title (heading path) and body text
+    """
+    passages = []
+    headings: Dict[int, str] = {}
+    body: List[str] = []
+
+    def flush():
+        text = "\n".join(body).strip()
+        if text:
+            title = " > ".join(headings[level] for level in sorted(headings)) or report_name
+            passages.append({'title': title, 'text': text})
+
+    for line in content.splitlines():
+        match = re.match(r"^(#{1,6})\s+(.*)$", line)
+        if match:
+            flush()
+            body = []
+            level = len(match.group(1))
+            heading = match.group(2).replace('*', '').split('|')[0].strip()
+            headings = {lvl: name for lvl, name in headings.items() if lvl < level}
+            headings[level] = heading
+            # Total lines written as headings carry their figures in the heading itself
+            if '|' in match.group(2):
+                body.append(match.group(2).replace('*', ''))
+        else:
+            body.append(line)
+    flush()
+
+    return passages
+
+
+class RetrievalIndex:
+    """
+    Local BM25 index over markdown report sections and transaction descriptions.
+    Sources are re-indexed incrementally: only tables or reports that were replaced
+    since the last refresh are re-tokenized, and their old passages are compacted away.
+    """
+
+    # Reports chunked by section
+    REPORT_SOURCES = ['balance_sheet', 'cash_flow', 'profit_loss']
+
+    # Tables whose description column is indexed, with the columns shown in each passage
+    TABLE_SOURCES = {
+        'expenses': ['expense_id', 'date', 'vendor_id', 'category', 'amount', 'status'],
+        'bills': ['bill_id', 'vendor_id', 'due_date', 'amount', 'status'],
+        'invoices': ['invoice_id', 'customer_id', 'due_date', 'amount', 'status'],
+        'services': ['service_id', 'service_name', 'service_category', 'hourly_rate']
+    }
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        """
+        Initialize an empty index.
+
+        Args:
+            k1: BM25 term-frequency saturation parameter
+            b: BM25 length normalization parameter
+        """
+        self.k1 = k1
+        self.b = b
+        self.documents: List[Dict[str, Any]] = []
+        self._term_counts: List[Counter] = []
+        self._alive: List[bool] = []
+        # What each source was indexed from: the report text, or a weak reference to the table
+        self._source_versions: Dict[str, Any] = {}
+        self._source_docs: Dict[str, List[int]] = {}
+        self._lock = threading.Lock()
+        self._compiled: Optional[Dict[str, Any]] = None
+
+    def _add_document(self, source: str, title: str, text: str, record_id: Optional[str] = None,
+                      title_terms: Optional[List[str]] = None):
+        """Tokenize and append a single passage."""
+        doc_index = len(self.documents)
+        self.documents.append({'source': source, 'title': title, 'text': text, 'record_id': record_id})
+        terms = tokenize(f"{title} {text}") if title_terms is None else title_terms + tokenize(text)
+        self._term_counts.append(Counter(terms))
+        self._alive.append(True)
+        self._source_docs.setdefault(source, []).append(doc_index)
+
+    def _remove_source(self, source: str) -> bool:
+        """Retire all passages belonging to a source; returns whether there were any."""
+        doc_indexes = self._source_docs.pop(source, [])
+        for doc_index in doc_indexes:
+            self._alive[doc_index] = False
+            self._term_counts[doc_index] = Counter()
+        return bool(doc_indexes)
+
+    def _compact(self):
+        """Drop retired passages so replaced sources do not accumulate (lock held by caller)."""
+        keep = [doc_index for doc_index, alive in enumerate(self._alive) if alive]
+        if len(keep) == len(self._alive):
+            return
+        new_positions = np.full(len(self._alive), -1, dtype=np.int64)
+        new_positions[keep] = np.arange(len(keep))
+        self.documents = [self.documents[i] for i in keep]
+        self._term_counts = [self._term_counts[i] for i in keep]
+        self._alive = [True] * len(keep)
+        self._source_docs = {source: new_positions[docs].tolist() for source, docs in self._source_docs.items()}
+
+    def _index_report(self, source: str, content: str):
+        """Index a markdown report section by section."""
+        if not content or content.startswith("Report") or content.startswith("Error"):
+            return
+        for passage in chunk_markdown_report(source, content):
+            self._add_document(source, passage['title'], passage['text'])
+
+    def _index_table_rows(self, source: str, df: pd.DataFrame):
+        """Index the description column of a table, one passage per row."""
+        if df.empty or 'description' not in df.columns:
+            return
+
+        columns = [col for col in self.TABLE_SOURCES[source] if col in df.columns]
+        id_column = columns[0] if columns else None
+        details = pd.Series("", index=df.index)
+        if columns:
+            # Column-wise concatenation; a row-wise join is orders of magnitude slower on large tables
+            details = df[columns[0]].astype(str)
+            for column in columns[1:]:
+                details = details + " | " + df[column].astype(str)
+        descriptions = df['description'].fillna('').astype(str)
+        record_ids = df[id_column].astype(str) if id_column else pd.Series(None, index=df.index)
+
+        # Descriptions repeat across rows, so each distinct one is tokenized once
+        description_terms: Dict[str, List[str]] = {}
+        for record_id, description, detail in zip(record_ids, descriptions, details):
+            terms = description_terms.get(description)
+            if terms is None:
+                terms = description_terms[description] = tokenize(description)
+            self._add_document(source, description, detail, record_id, title_terms=terms)
+
+    def _is_current(self, source: str, value: Any) -> bool:
+        """Whether a source was last indexed from this exact report text or table object."""
+        version = self._source_versions.get(source)
+        if isinstance(value, str):
+            return version == value
+        return isinstance(version, weakref.ref) and version() is value
+
+    def refresh(self, data: Dict) -> List[str]:
+        """
+        Bring the index up to date with a data snapshot.
+
+        Freshness is checked by identity (the same table object, the same report text),
+        so an unchanged snapshot costs a few comparisons rather than a content hash.
+
+        Args:
+            data: Dictionary containing all financial DataFrames and reports
+
+        Returns:
+            Names of sources that were (re)indexed
+        """
+        refreshed = []
+
+        with self._lock:
+            removed = False
+            for source in self.REPORT_SOURCES + list(self.TABLE_SOURCES):
+                value = data.get(source)
+                if value is None or self._is_current(source, value):
+                    continue
+
+                removed = self._remove_source(source) or removed
+                if isinstance(value, str):
+                    self._index_report(source, value)
+                    self._source_versions[source] = value
+                elif isinstance(value, pd.DataFrame):
+                    self._index_table_rows(source, value)
+                    self._source_versions[source] = weakref.ref(value)
+                refreshed.append(source)
+
+            if removed:
+                self._compact()
+            if refreshed:
+                self._compiled = None
+
+        return refreshed
+
+    def add_rows(self, source: str, rows: pd.DataFrame):
+        """
+        Index newly appended rows of a table without touching existing passages.
+
+        Args:
+            source: Table name (expenses, bills, invoices, services)
+            rows: DataFrame containing only the new rows
+        """
+        if source not in self.TABLE_SOURCES:
+            raise ValueError(f"Source {source} is not indexed")
+
+        with self._lock:
+            self._index_table_rows(source, rows)
+            # The indexed table no longer matches any table object; the next refresh re-indexes it
+            self._source_versions.pop(source, None)
+            self._compiled = None
+
+    def _compile(self) -> Dict[str, Any]:
+        """Build CSR postings (doc ids and BM25 weights grouped by term) from the live passages."""
+        doc_count = len(self.documents)
+        lengths = np.fromiter((sum(counts.values()) for counts in self._term_counts), dtype=float, count=doc_count)
+        alive = np.array(self._alive, dtype=bool)
+        live_count = int(alive.sum())
+        avg_length = lengths[alive].mean() if live_count else 0.0
+
+        sizes = np.fromiter((len(counts) for counts in self._term_counts), dtype=np.int64, count=doc_count)
+        doc_ids = np.repeat(np.arange(doc_count, dtype=np.int64), sizes)
+        terms = [term for counts in self._term_counts for term in counts]
+        tfs = np.fromiter((tf for counts in self._term_counts for tf in counts.values()), dtype=float, count=len(terms))
+        codes, vocabulary = pd.factorize(pd.Index(terms, dtype=object))
+
+        order = np.argsort(codes, kind='stable')
+        codes, doc_ids, tfs = codes[order], doc_ids[order], tfs[order]
+        doc_freq = np.bincount(codes, minlength=len(vocabulary))
+        idf = np.log(1 + (live_count - doc_freq + 0.5) / (doc_freq + 0.5))
+        norm = tfs + self.k1 * (1 - self.b + self.b * lengths[doc_ids] / max(avg_length, 1e-9))
+
+        return {
+            'vocabulary': pd.Index(vocabulary),
+            'offsets': np.concatenate([[0], np.cumsum(doc_freq)]),
+            'doc_ids': doc_ids,
+            'weights': idf[codes] * tfs * (self.k1 + 1) / norm,
+            'sources': np.array([doc['source'] for doc in self.documents], dtype=object),
+            'doc_count': doc_count
+        }
+
+    def search(self, query: str, k: int = 5, sources: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Return the top-k passages for a query.
+
+        Args:
+            query: Free-text question
+            k: Number of passages to return
+            sources: Optional list of source names to restrict results to
+
+        Returns:
+            List of passages (source, title, text, record_id, score), best first
+        """
+        with self._lock:
+            if self._compiled is None:
+                self._compiled = self._compile()
+            compiled = self._compiled
+            documents = self.documents
+
+        terms = list(set(tokenize(query)))
+        if not terms or compiled['doc_count'] == 0:
+            return []
+
+        scores = np.zeros(compiled['doc_count'])
+        offsets = compiled['offsets']
+        for position in compiled['vocabulary'].get_indexer(terms):
+            if position >= 0:
+                start, end = offsets[position], offsets[position + 1]
+                # A term lists each passage once, so plain fancy-index addition is safe
+                scores[compiled['doc_ids'][start:end]] += compiled['weights'][start:end]
+
+        if sources:
+            scores[~np.isin(compiled['sources'], sources)] = 0
+
+        candidates = np.flatnonzero(scores > 0)
+        if candidates.size == 0:
+            return []
+        if candidates.size > k:
+            candidates = candidates[np.argpartition(-scores[candidates], k)[:k]]
+        ranked = candidates[np.argsort(-scores[candidates])]
+
+        return [dict(documents[i], score=round(float(scores[i]), 3)) for i in ranked]
+
+
+# One index per data snapshot, so one tenant's questions never retrieve another tenant's
+# passages. An index is dropped when its snapshot's tables are garbage-collected (e.g. after
+# the partition LRU evicts the view) and at most MAX_INDEXES are kept.
+MAX_INDEXES = 4
+_indexes: "OrderedDict[Tuple[Tuple[str, int], ...], RetrievalIndex]" = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def _discard_index(key: Tuple[Tuple[str, int], ...]):
+    with _indexes_lock:
+        _indexes.pop(key, None)
+
+
+def get_retrieval_index(data: Dict) -> RetrievalIndex:
+    """
+    Return the retrieval index of a data snapshot, building it on first use.
+
+    Args:
+        data: Dictionary containing all financial DataFrames and reports
+
+    Returns:
+        Up-to-date RetrievalIndex
+    """
+    # The snapshot is identified by the objects it holds; a live object's id cannot be reused
+    key = tuple((name, id(value)) for name, value in data.items())
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is not None:
+            _indexes.move_to_end(key)
+        else:
+            index = _indexes[key] = RetrievalIndex()
+            for value in data.values():
+                if isinstance(value, pd.DataFrame):
+                    weakref.finalize(value, _discard_index, key)
+            while len(_indexes) > MAX_INDEXES:
+                _indexes.popitem(last=False)
+    # Builds the index on first use; concurrent callers wait on the index lock
+    index.refresh(data)
+    return index
+
+
+def format_passages(passages: List[Dict[str, Any]]) -> str:
+    """Render retrieved passages as compact prompt context."""
+    lines = []
+    for passage in passages:
+        label = passage['source'].replace('_', ' ').title()
+        text = re.sub(r"\s+", " ", passage['text']).strip()
+        lines.append(f"- [{label}] {passage['title']}: {text[:600]}")
+    return "\n".join(lines)
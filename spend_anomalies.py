@@ -0,0 +1,309 @@
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import metrics
+
+
+class SpendAnomalyDetector:
+    """
+    Flags likely duplicate payments and unusual amounts across expenses and bills.
+
+    Duplicates: rows are sorted by (vendor, amount, date), so candidate duplicates
+    end up next to each other and each row is compared with only its few nearest
+    neighbours (shifted arrays) instead of every other row. Two rows with the same
+    vendor and amount dated within the window are reported, whether they come from
+    the same table or one is an expense and the other a bill.
+
+    Outliers: each amount is compared with the previous transactions of the same
+    vendor (and, for expenses, the same category) using a robust z-score, i.e.
+    (amount - rolling median) / (rolling IQR / 1.349), so a few extreme values do
+    not hide each other. Only unusually large amounts are flagged.
+
+    Like DataValidator, detect() can check only newly appended rows against an
+    already-loaded snapshot.
+    """
+
+    # Date and document ID column of each checked table
+    SOURCES = {
+        'expenses': ('date', 'expense_id'),
+        'bills': ('date_issued', 'bill_id')
+    }
+
+    # Columns of the duplicate and outlier results
+    DUPLICATE_COLUMNS = ['vendor_id', 'amount', 'match', 'days_apart', 'first_source', 'first_id', 'first_date',
+                         'second_source', 'second_id', 'second_date']
+    OUTLIER_COLUMNS = ['source', 'id', 'vendor_id', 'category', 'date', 'amount', 'group', 'baseline_median',
+                       'robust_z']
+
+    # Lower bound of the z-score scale as a share of the baseline median, so a short
+    # history that happens to be tightly clustered does not make modest amounts extreme
+    MIN_RELATIVE_SCALE = 0.25
+
+    def __init__(self, duplicate_window_days: int = 7, max_neighbors: int = 3, history_window: int = 12,
+                 min_history: int = 5, z_threshold: float = 3.5):
+        """
+        Initialize the detector.
+
+        Args:
+            duplicate_window_days: Maximum days between two payments reported as duplicates
+            max_neighbors: Following rows (in vendor/amount/date order) each row is compared with
+            history_window: Previous transactions per group used as the outlier baseline
+            min_history: Previous transactions a group needs before outliers are flagged
+            z_threshold: Robust z-score at or above which an amount is an outlier
+        """
+        self.duplicate_window_days = duplicate_window_days
+        self.max_neighbors = max_neighbors
+        self.history_window = history_window
+        self.min_history = min_history
+        self.z_threshold = z_threshold
+
+    def _transactions(self, tables: Dict[str, pd.DataFrame], is_new: bool) -> pd.DataFrame:
+        """Expenses and bills in one frame: source, id, vendor_id, category, date, amount, cents, is_new."""
+        frames = []
+        for source, (date_column, id_column) in self.SOURCES.items():
+            df = tables.get(source)
+            if not isinstance(df, pd.DataFrame) or df.empty or not {'vendor_id', 'amount'}.issubset(df.columns):
+                continue
+            amount = pd.to_numeric(df['amount'], errors='coerce').to_numpy(dtype=float)
+            frames.append(pd.DataFrame({
+                'source': source,
+                'id': df[id_column].astype(str) if id_column in df.columns else df.index.astype(str),
+                'vendor_id': df['vendor_id'].astype(str),
+                'category': df['category'].astype(str) if 'category' in df.columns else None,
+                'date': pd.to_datetime(df[date_column], errors='coerce') if date_column in df.columns else pd.NaT,
+                'amount': amount,
+                'cents': np.round(np.nan_to_num(amount) * 100).astype(np.int64),
+                'is_new': is_new
+            }).reset_index(drop=True))
+        if not frames:
+            return pd.DataFrame(columns=['source', 'id', 'vendor_id', 'category', 'date', 'amount', 'cents', 'is_new'])
+        return pd.concat(frames, ignore_index=True)
+
+    @staticmethod
+    def _day_numbers(dates: pd.Series) -> np.ndarray:
+        return dates.to_numpy().astype('datetime64[D]').astype(np.int64)
+
+    def find_duplicates(self, transactions: pd.DataFrame) -> pd.DataFrame:
+        """
+        Pairs of payments to the same vendor for the same amount within the window.
+
+        Args:
+            transactions: Result of _transactions (optionally mixing existing and new rows)
+
+        Returns:
+            DataFrame with DUPLICATE_COLUMNS (match is "exact" for the same date, "near"
+            otherwise), plus is_new
+        """
+        rows = transactions[transactions['date'].notna() & (transactions['amount'] > 0)]
+        vendor, _ = pd.factorize(rows['vendor_id'])
+        cents = rows['cents'].to_numpy()
+        days = self._day_numbers(rows['date'])
+        # Sort by integer codes rather than strings; equal vendor and amount end up adjacent, oldest first
+        order = np.lexsort((days, cents, vendor))
+        vendor, cents, days = vendor[order], cents[order], days[order]
+
+        first_rows, second_rows, gaps = [], [], []
+        for lag in range(1, self.max_neighbors + 1):
+            if lag >= len(order):
+                break
+            apart = days[lag:] - days[:-lag]
+            match = np.flatnonzero((vendor[lag:] == vendor[:-lag]) & (cents[lag:] == cents[:-lag])
+                                   & (apart <= self.duplicate_window_days))
+            first_rows.append(order[match])
+            second_rows.append(order[match + lag])
+            gaps.append(apart[match])
+
+        first_rows = np.concatenate(first_rows) if first_rows else np.zeros(0, dtype=np.int64)
+        if not len(first_rows):
+            return pd.DataFrame(columns=self.DUPLICATE_COLUMNS + ['is_new'])
+        second_rows = np.concatenate(second_rows)
+        first, second = rows.iloc[first_rows], rows.iloc[second_rows]
+        duplicates = pd.DataFrame({
+            'vendor_id': first['vendor_id'].to_numpy(),
+            'amount': first['amount'].to_numpy(),
+            'days_apart': np.concatenate(gaps),
+            'first_source': first['source'].to_numpy(),
+            'first_id': first['id'].to_numpy(),
+            'first_date': first['date'].to_numpy(),
+            'second_source': second['source'].to_numpy(),
+            'second_id': second['id'].to_numpy(),
+            'second_date': second['date'].to_numpy(),
+            'is_new': first['is_new'].to_numpy(dtype=bool) | second['is_new'].to_numpy(dtype=bool)
+        })
+        duplicates['match'] = np.where(duplicates['days_apart'] == 0, 'exact', 'near')
+        return duplicates[self.DUPLICATE_COLUMNS + ['is_new']] \
+            .sort_values(['days_apart', 'amount'], ascending=[True, False]).reset_index(drop=True)
+
+    def _trailing_quantiles(self, values: np.ndarray, position_in_group: np.ndarray,
+                            quantiles: Sequence[float], chunk_size: int = 250_000) -> List[np.ndarray]:
+        """
+        Quantiles of the previous history_window values of each row's group.
+
+        Rows must be sorted by group and date. Each row's window is a strided view of
+        the preceding values; entries from an earlier group are masked out, each
+        window is sorted once and all quantiles (linear interpolation, as in pandas)
+        are read from it. Rows with fewer than min_history previous values get NaN.
+        """
+        window = self.history_window
+        padded = np.concatenate([np.full(window, np.nan), values])
+        results = [np.full(len(values), np.nan) for _ in quantiles]
+        slots = np.arange(window)
+
+        for start in range(0, len(values), chunk_size):
+            stop = min(start + chunk_size, len(values))
+            history = np.lib.stride_tricks.sliding_window_view(padded[start:stop + window - 1], window)
+            count = np.minimum(position_in_group[start:stop], window)
+            # Only the last `count` slots of each window belong to the row's group; NaN sorts last
+            ordered = np.sort(np.where(slots >= window - count[:, None], history, np.nan), axis=1)
+            enough = count >= self.min_history
+            last = np.maximum(count - 1, 0)
+            for result, q in zip(results, quantiles):
+                position = last * q
+                low = np.floor(position).astype(np.int64)
+                high = np.ceil(position).astype(np.int64)
+                low_values = np.take_along_axis(ordered, low[:, None], axis=1)[:, 0]
+                high_values = np.take_along_axis(ordered, high[:, None], axis=1)[:, 0]
+                value = low_values + (high_values - low_values) * (position - low)
+                result[start:stop] = np.where(enough, value, np.nan)
+        return results
+
+    def _group_outliers(self, transactions: pd.DataFrame, key: str) -> pd.DataFrame:
+        """Robust z-score of each amount against the previous transactions of its group."""
+        rows = transactions[transactions['date'].notna() & transactions[key].notna()]
+        groups, _ = pd.factorize(rows[key])
+        order = np.lexsort((self._day_numbers(rows['date']), groups))
+        groups = groups[order]
+        amounts = rows['amount'].to_numpy(dtype=float)[order]
+
+        # Index of each row within its group (rows are now grouped contiguously)
+        starts = np.r_[True, groups[1:] != groups[:-1]]
+        position_in_group = np.arange(len(groups)) - np.maximum.accumulate(np.where(starts, np.arange(len(groups)), 0))
+
+        q25, median, q75 = self._trailing_quantiles(amounts, position_in_group, (0.25, 0.5, 0.75))
+        scale = np.fmax(np.fmax((q75 - q25) / 1.349, self.MIN_RELATIVE_SCALE * np.abs(median)), 1.0)
+        z = (amounts - median) / scale
+        flagged = np.nan_to_num(z) >= self.z_threshold
+
+        outliers = rows.iloc[order[flagged]].copy()
+        outliers['group'] = key
+        outliers['baseline_median'] = median[flagged]
+        outliers['robust_z'] = np.round(z[flagged], 2)
+        return outliers
+
+    def find_outliers(self, transactions: pd.DataFrame) -> pd.DataFrame:
+        """
+        Amounts far above their vendor's (and, for expenses, category's) recent history.
+
+        Args:
+            transactions: Result of _transactions
+
+        Returns:
+            DataFrame with OUTLIER_COLUMNS plus is_new, largest deviation first; a row
+            unusual for both its vendor and its category appears once per group
+        """
+        results = [self._group_outliers(transactions, 'vendor_id')]
+        if transactions['category'].notna().any():
+            results.append(self._group_outliers(transactions, 'category'))
+        outliers = pd.concat(results, ignore_index=True)
+        if outliers.empty:
+            return pd.DataFrame(columns=self.OUTLIER_COLUMNS + ['is_new'])
+        return outliers[self.OUTLIER_COLUMNS + ['is_new']] \
+            .sort_values('robust_z', ascending=False).reset_index(drop=True)
+
+    def _context_for(self, existing: pd.DataFrame, new: pd.DataFrame) -> pd.DataFrame:
+        """
+        Existing rows that can pair with or form the baseline of the new rows: same
+        vendor and amount near the new dates, and the latest history of each
+        affected vendor and category.
+        """
+        window = pd.Timedelta(days=self.duplicate_window_days)
+        near = existing['vendor_id'].isin(new['vendor_id']) & existing['cents'].isin(new['cents']) & \
+            existing['date'].between(new['date'].min() - window, new['date'].max() + window)
+
+        history = []
+        for key in ('vendor_id', 'category'):
+            affected = existing[existing[key].isin(new[key].dropna())]
+            history.append(affected.sort_values('date', kind='stable').groupby(key, sort=False).tail(self.history_window))
+        context = pd.concat([existing[near]] + history)
+        return context[~context.index.duplicated()]
+
+    def detect(self, data: Dict[str, Any], new_rows: Optional[Dict[str, pd.DataFrame]] = None) -> Dict[str, pd.DataFrame]:
+        """
+        Run duplicate and outlier detection.
+
+        Args:
+            data: Dictionary of loaded DataFrames (expenses and bills are used)
+            new_rows: Optional expenses/bills about to be appended. When given, only findings
+                involving these rows are returned, using the matching part of `data` as context.
+
+        Returns:
+            Dictionary with 'duplicates' and 'outliers' DataFrames
+        """
+        with metrics.span('detect_spend_anomalies', incremental=new_rows is not None):
+            existing = self._transactions(data, is_new=False)
+            if new_rows is None:
+                transactions = existing
+            else:
+                new = self._transactions(new_rows, is_new=True)
+                if new.empty:
+                    return {'duplicates': pd.DataFrame(columns=self.DUPLICATE_COLUMNS),
+                            'outliers': pd.DataFrame(columns=self.OUTLIER_COLUMNS)}
+                transactions = pd.concat([self._context_for(existing, new), new], ignore_index=True)
+
+            duplicates = self.find_duplicates(transactions)
+            outliers = self.find_outliers(transactions)
+            if new_rows is not None:
+                duplicates = duplicates.loc[duplicates['is_new'].astype(bool)].reset_index(drop=True)
+                outliers = outliers.loc[outliers['is_new'].astype(bool)].reset_index(drop=True)
+            return {'duplicates': duplicates.drop(columns='is_new'), 'outliers': outliers.drop(columns='is_new')}
+
+    @staticmethod
+    def summarize(findings: Dict[str, pd.DataFrame]) -> Dict[str, Any]:
+        """
+        Headline figures of detect() results.
+
+        Args:
+            findings: Result of detect()
+
+        Returns:
+            Dictionary with exact/near duplicate counts, the amount paid twice, and
+            outlier count and total amount
+        """
+        duplicates, outliers = findings['duplicates'], findings['outliers']
+        return {
+            'exact_duplicates': int((duplicates['match'] == 'exact').sum()),
+            'near_duplicates': int((duplicates['match'] == 'near').sum()),
+            'duplicate_amount': round(float(duplicates['amount'].sum()), 2),
+            'outliers': int(len(outliers.drop_duplicates(['source', 'id']))),
+            'outlier_amount': round(float(outliers.drop_duplicates(['source', 'id'])['amount'].sum()), 2)
+        }
+
+
+# Example usage and testing
+if __name__ == "__main__":
+    import sys
+    import time
+
+    from data_utils import DataLoader
+
+    loader = DataLoader(sys.argv[1] if len(sys.argv) > 1 else "data")
+    data = loader.load_all_data()
+    detector = SpendAnomalyDetector()
+
+    started = time.perf_counter()
+    findings = detector.detect(data)
+    elapsed = time.perf_counter() - started
+    print(findings['duplicates'].head(10).to_string())
+    print(findings['outliers'].head(10).to_string())
+    print(f"\n{SpendAnomalyDetector.summarize(findings)}")
+    print(f"Checked {len(data['expenses']) + len(data['bills']):,} rows in {elapsed * 1000:.1f} ms")
+
+    # Incremental check of a bill about to be entered twice
+    new_bill = data['bills'].head(1).copy()
+    new_bill['bill_id'] = 'BILL-NEW'
+    started = time.perf_counter()
+    new_findings = detector.detect(data, new_rows={'bills': new_bill})
+    print(f"\nNew rows: {SpendAnomalyDetector.summarize(new_findings)} "
+          f"({(time.perf_counter() - started) * 1000:.1f} ms)")
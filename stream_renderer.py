@@ -0,0 +1,182 @@
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+
+class BufferedStreamRenderer:
+    """
+    Collects streamed LLM chunks and pushes them to a display placeholder
+    on a time or size cadence instead of once per chunk.
+    Also records time-to-first-token and throughput for the response.
+    """
+
+    CURSOR = " ▌"
+
+    def __init__(self, placeholder: Any, flush_interval: float = 0.05, flush_bytes: int = 2048,
+                 clock: Callable[[], float] = time.perf_counter):
+        """
+        Initialize the renderer.
+
+        Args:
+            placeholder: Object with a markdown(text) method (e.g. st.empty())
+            flush_interval: Minimum seconds between display updates
+            flush_bytes: Flush early once this many new characters are buffered
+            clock: Monotonic clock, injectable for testing
+        """
+        self.placeholder = placeholder
+        self.flush_interval = flush_interval
+        self.flush_bytes = flush_bytes
+        self.clock = clock
+
+        self.chunks: List[str] = []
+        self.chunk_count = 0
+        self.flush_count = 0
+        self._pending_chars = 0
+        self._rendered_text = ""
+        self._rendered_upto = 0
+        self._started_at: Optional[float] = None
+        self._first_token_at: Optional[float] = None
+        self._finished_at: Optional[float] = None
+        self._last_flush_at = 0.0
+
+    def start(self):
+        """Mark the moment the request was sent."""
+        self._started_at = self.clock()
+        self._last_flush_at = self._started_at
+
+    def add(self, content: str):
+        """
+        Buffer a chunk and flush if the cadence allows.
+
+        Args:
+            content: Text delta from the stream
+        """
+        if not content:
+            return
+
+        now = self.clock()
+        if self._started_at is None:
+            self._started_at = now
+            self._last_flush_at = now
+        if self._first_token_at is None:
+            self._first_token_at = now
+
+        self.chunks.append(content)
+        self.chunk_count += 1
+        self._pending_chars += len(content)
+
+        # Show the first token immediately, then throttle
+        if self.flush_count == 0 or self._pending_chars >= self.flush_bytes \
+                or now - self._last_flush_at >= self.flush_interval:
+            self._flush(now, cursor=True)
+
+    def _flush(self, now: float, cursor: bool):
+        """Update the placeholder with the text received so far."""
+        self.placeholder.markdown(self.text + (self.CURSOR if cursor else ""))
+        self.flush_count += 1
+        self._pending_chars = 0
+        self._last_flush_at = now
+
+    def consume(self, stream: Iterable[Any]) -> str:
+        """
+        Render an OpenAI chat completion stream to completion.
+
+        Args:
+            stream: Iterable of chat completion chunks
+
+        Returns:
+            Full response text
+        """
+        if self._started_at is None:
+            self.start()
+
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            content = getattr(chunk.choices[0].delta, 'content', None)
+            if content is not None:
+                self.add(content)
+
+        return self.finish()
+
+    def finish(self) -> str:
+        """
+        Render the final text without the typing cursor.
+
+        Returns:
+            Full response text
+        """
+        self._finished_at = self.clock()
+        self._flush(self._finished_at, cursor=False)
+        return self.text
+
+    @property
+    def text(self) -> str:
+        """Full text received so far (joins only chunks added since the last call)."""
+        if self._rendered_upto < len(self.chunks):
+            self._rendered_text += "".join(self.chunks[self._rendered_upto:])
+            self._rendered_upto = len(self.chunks)
+        return self._rendered_text
+
+    def stats(self) -> Dict[str, Optional[float]]:
+        """
+        Streaming statistics for the response.
+
+        Chunks are used as the token count, since the API streams roughly one token per chunk.
+
+        Returns:
+            Dictionary with time_to_first_token, total_time, tokens, tokens_per_second and flushes
+        """
+        end = self._finished_at if self._finished_at is not None else self.clock()
+        ttft = (self._first_token_at - self._started_at) if self._first_token_at is not None else None
+        total = (end - self._started_at) if self._started_at is not None else None
+        generation_time = (end - self._first_token_at) if self._first_token_at is not None else None
+
+        return {
+            'time_to_first_token': ttft,
+            'total_time': total,
+            'tokens': self.chunk_count,
+            'tokens_per_second': (self.chunk_count / generation_time) if generation_time else None,
+            'flushes': self.flush_count
+        }
+
+
+# Example usage and testing
+if __name__ == "__main__":
+    import itertools
+    from types import SimpleNamespace
+
+    class _RecordingPlaceholder:
+        def __init__(self):
+            self.calls = 0
+            self.chars_sent = 0
+            self.last = ""
+
+        def markdown(self, text):
+            self.calls += 1
+            self.chars_sent += len(text)
+            self.last = text
+
+    # Synthetic 1500-token stream arriving every 2 ms on a fake clock
+    fake_time = [0.0]
+
+    def synthetic_stream(tokens=1500, first_token_delay=0.4, token_interval=0.002):
+        fake_time[0] += first_token_delay
+        for i in range(tokens):
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=f"tok{i} "))])
+            fake_time[0] += token_interval
+
+    placeholder = _RecordingPlaceholder()
+    renderer = BufferedStreamRenderer(placeholder, clock=lambda: fake_time[0])
+    text = renderer.consume(synthetic_stream())
+    stats = renderer.stats()
+
+    expected = "".join(f"tok{i} " for i in range(1500))
+    # Characters a per-chunk markdown() call would send: every prefix of the response
+    prefix_lengths = itertools.accumulate(len(f"tok{i} ") for i in range(1500))
+    naive_chars = sum(length + len(BufferedStreamRenderer.CURSOR) for length in prefix_lengths)
+
+    print(f"Final text matches: {text == expected and placeholder.last == expected}")
+    print(f"Placeholder updates: {placeholder.calls} (naive loop: 1500)")
+    print(f"Characters sent: {placeholder.chars_sent:,} (naive loop: {naive_chars:,})")
+    print(f"Time to first token: {stats['time_to_first_token']:.3f}s, "
+          f"{stats['tokens_per_second']:.0f} tokens/sec")
@@ -0,0 +1,210 @@
+import argparse
+import os
+import shutil
+import time
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+
+
+class SyntheticLedgerGenerator:
+    """
+    Generates large, deterministic ledgers shaped like the fixtures in data/.
+    Rows are cloned from the fixture rows (keeping descriptions, categories and
+    account codes consistent), then given fresh IDs, spread-out dates, varied
+    amounts and realistic status mixes. Every vendor_id, customer_id and
+    account_code references a generated or chart-of-accounts row.
+    """
+
+    # Report files copied unchanged so DataLoader can load the output directory
+    STATIC_FILES = ['chart_of_accounts.csv', 'balance_sheet_report.md', 'cash_flow_statement.md',
+                    'profit_loss_statement.md']
+
+    def __init__(self, template_directory: str = "data", seed: int = 42, as_of: str = "2024-12-31",
+                 history_days: int = 730):
+        """
+        Initialize the generator.
+
+        Args:
+            template_directory: Directory with the fixture CSVs used as row templates
+            seed: Random seed; the same seed and size always produce the same files
+            as_of: Latest transaction date
+            history_days: Number of days of history before as_of to spread dates over
+        """
+        self.template_directory = template_directory
+        self.seed = seed
+        self.as_of = pd.Timestamp(as_of)
+        self.history_days = history_days
+        self.templates = {
+            name: pd.read_csv(os.path.join(template_directory, f"{name}.csv"), dtype=str, keep_default_na=False)
+            for name in ['vendors', 'customers', 'services', 'expenses', 'bills', 'invoices']
+        }
+
+    @staticmethod
+    def _ids(prefix: str, count: int) -> np.ndarray:
+        width = max(3, len(str(count)))
+        return (prefix + pd.Series(np.arange(1, count + 1)).astype(str).str.zfill(width)).to_numpy()
+
+    def _clone(self, rng: np.random.Generator, template: str, count: int) -> pd.DataFrame:
+        """Sample template rows with replacement."""
+        rows = self.templates[template]
+        return rows.iloc[rng.integers(0, len(rows), count)].reset_index(drop=True)
+
+    def _dates(self, rng: np.random.Generator, count: int) -> pd.Series:
+        offsets = rng.integers(0, self.history_days + 1, count)
+        return pd.Series(self.as_of - pd.to_timedelta(offsets, unit='D'))
+
+    @staticmethod
+    def _format_dates(dates: pd.Series) -> pd.Series:
+        return dates.dt.strftime('%Y-%m-%d').fillna('')
+
+    @staticmethod
+    def _amounts(rng: np.random.Generator, base: pd.Series, spread: float = 0.35) -> np.ndarray:
+        """Template amounts scaled by a log-normal factor so totals stay in a realistic range."""
+        values = pd.to_numeric(base, errors='coerce').fillna(100.0).to_numpy()
+        return np.round(values * rng.lognormal(0.0, spread, len(values)), 2)
+
+    def _parties(self, rng: np.random.Generator, template: str, prefix: str, id_column: str,
+                 name_column: str, count: int) -> pd.DataFrame:
+        """Vendors or customers: cloned rows with unique IDs, names and emails."""
+        df = self._clone(rng, template, count)
+        ids = self._ids(prefix, count)
+        df[id_column] = ids
+        df[name_column] = df[name_column] + " " + pd.Series(ids)
+        local, domain = df['email'].str.split('@', n=1).str[0], df['email'].str.split('@', n=1).str[1]
+        df['email'] = local + "." + pd.Series(ids).str.lower() + "@" + domain
+        df['active'] = np.where(rng.random(count) < 0.9, 'TRUE', 'FALSE')
+        return df
+
+    def _settlement(self, rng: np.random.Generator, df: pd.DataFrame, terms_days: np.ndarray) -> pd.DataFrame:
+        """Due dates, status and payment dates for bills or invoices; older documents are more likely paid."""
+        count = len(df)
+        issued = self._dates(rng, count)
+        due = issued + pd.to_timedelta(terms_days, unit='D')
+        age_days = (self.as_of - issued).dt.days.to_numpy()
+        paid = rng.random(count) < np.clip(age_days / 120.0, 0.05, 0.97)
+        # Paid anywhere from well before to somewhat after the due date, but never after as_of
+        payment = issued + pd.to_timedelta(
+            np.minimum((terms_days * rng.uniform(0.3, 1.3, count)).astype(int), age_days), unit='D'
+        )
+
+        df['date_issued'] = self._format_dates(issued)
+        df['due_date'] = self._format_dates(due)
+        df['status'] = np.where(paid, 'Paid', 'Outstanding')
+        df['payment_date'] = np.where(paid, self._format_dates(payment), '')
+        return df
+
+    def generate(self, rows: int) -> Dict[str, pd.DataFrame]:
+        """
+        Generate all transactional and master tables.
+
+        Args:
+            rows: Rows per transaction table (expenses, bills, invoices); master tables scale with it
+
+        Returns:
+            Dictionary of table name to DataFrame (string-typed, as written to CSV)
+        """
+        rng = np.random.default_rng(self.seed)
+        vendor_count = max(20, rows // 200)
+        customer_count = max(25, rows // 200)
+        service_count = max(40, rows // 1000)
+
+        vendors = self._parties(rng, 'vendors', 'V', 'vendor_id', 'vendor_name', vendor_count)
+        customers = self._parties(rng, 'customers', 'C', 'customer_id', 'customer_name', customer_count)
+
+        services = self._clone(rng, 'services', service_count)
+        services['service_id'] = self._ids('SRV', service_count)
+        services['service_name'] = services['service_name'] + " " + pd.Series(services['service_id'])
+        services['hourly_rate'] = self._amounts(rng, services['hourly_rate'], 0.15)
+        services['standard_price'] = self._amounts(rng, services['standard_price'], 0.25)
+        services['active'] = np.where(rng.random(service_count) < 0.95, 'TRUE', 'FALSE')
+
+        expenses = self._clone(rng, 'expenses', rows)
+        expenses['expense_id'] = self._ids('EXP', rows)
+        expenses['date'] = self._format_dates(self._dates(rng, rows))
+        expenses['vendor_id'] = vendors['vendor_id'].to_numpy()[rng.integers(0, vendor_count, rows)]
+        expenses['amount'] = self._amounts(rng, expenses['amount'])
+        expenses['reference_number'] = self._ids('REF-', rows)
+        expenses['status'] = np.where(rng.random(rows) < 0.97, 'Paid', 'Pending')
+
+        bills = self._clone(rng, 'bills', rows)
+        bills['bill_id'] = self._ids('BILL', rows)
+        bills['vendor_id'] = vendors['vendor_id'].to_numpy()[rng.integers(0, vendor_count, rows)]
+        bills['bill_number'] = self._ids('B-', rows)
+        bills['amount'] = self._amounts(rng, bills['amount'])
+        bills = self._settlement(rng, bills, rng.choice([15, 30, 45], rows, p=[0.25, 0.6, 0.15]))
+        bills['discount_amount'] = np.where(
+            (bills['status'] == 'Paid') & (rng.random(rows) < 0.1), np.round(bills['amount'] * 0.02, 2), 0.0
+        )
+
+        invoices = self._clone(rng, 'invoices', rows)
+        invoices['invoice_id'] = self._ids('INV', rows)
+        invoices['customer_id'] = customers['customer_id'].to_numpy()[rng.integers(0, customer_count, rows)]
+        invoices['invoice_number'] = self._ids('INV-', rows)
+        invoices['amount'] = self._amounts(rng, invoices['amount'])
+        invoices = self._settlement(rng, invoices, rng.choice([15, 30, 45], rows, p=[0.2, 0.65, 0.15]))
+        invoices['discount_amount'] = np.where(
+            (invoices['status'] == 'Paid') & (rng.random(rows) < 0.15), np.round(invoices['amount'] * 0.02, 2), 0.0
+        )
+        invoices['tax_amount'] = np.round(invoices['amount'] * 0.08, 2)
+
+        return {
+            'vendors': vendors, 'customers': customers, 'services': services,
+            'expenses': expenses, 'bills': bills, 'invoices': invoices
+        }
+
+    def write(self, output_directory: str, rows: int) -> Dict[str, int]:
+        """
+        Generate a ledger and write it as a DataLoader-compatible data directory.
+
+        Args:
+            output_directory: Directory to write CSVs and reports into (created if missing)
+            rows: Rows per transaction table
+
+        Returns:
+            Dictionary of file name to row count
+        """
+        os.makedirs(output_directory, exist_ok=True)
+        written = {}
+        for name, df in self.generate(rows).items():
+            columns = list(self.templates[name].columns)
+            df[columns].to_csv(os.path.join(output_directory, f"{name}.csv"), index=False)
+            written[f"{name}.csv"] = len(df)
+
+        for file_name in self.STATIC_FILES:
+            source = os.path.join(self.template_directory, file_name)
+            if os.path.exists(source):
+                shutil.copyfile(source, os.path.join(output_directory, file_name))
+        return written
+
+
+def generate_ledger(output_directory: str, rows: int, seed: int = 42, template_directory: str = "data") -> Dict[str, int]:
+    """
+    Write a synthetic ledger of the given size (convenience wrapper).
+
+    Args:
+        output_directory: Directory to write into
+        rows: Rows per transaction table
+        seed: Random seed
+        template_directory: Directory with the fixture CSVs
+
+    Returns:
+        Dictionary of file name to row count
+    """
+    return SyntheticLedgerGenerator(template_directory, seed=seed).write(output_directory, rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a large synthetic ledger shaped like data/.")
+    parser.add_argument("output_directory", help="Directory to write the generated data into")
+    parser.add_argument("--rows", type=int, default=10000, help="Rows per transaction table (default: 10000)")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed (default: 42)")
+    parser.add_argument("--templates", default="data", help="Fixture directory used as templates")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    counts = generate_ledger(args.output_directory, args.rows, args.seed, args.templates)
+    for file_name, count in counts.items():
+        print(f"✅ {file_name}: {count:,} rows")
+    print(f"Generated in {time.perf_counter() - started:.1f}s")
@@ -0,0 +1,24 @@
+import os
+import sys
+
+import pytest
+
+# Modules live at the project root, next to this directory
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from data_utils import DataLoader  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def data_directory() -> str:
+    return os.path.join(PROJECT_ROOT, "data")
+
+
+@pytest.fixture(scope="session")
+def sample_data(data_directory):
+    """The bundled sample books (tables and markdown reports)."""
+    loader = DataLoader(data_directory)
+    data = loader.load_all_data()
+    data.update(loader.load_all_reports())
+    return data
@@ -0,0 +1,94 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from typing import Any, List
+
+
+class ScriptedToolCallClient:
+    """
+    Minimal stand-in for the OpenAI client that replays scripted tool calls.
+
+    Each entry in the script is either a list of (tool_name, arguments) pairs,
+    which is returned as tool calls, or a string, which is returned as the final answer.
+    """
+
+    def __init__(self, script: List[Any]):
+        self.script = list(script)
+        self.requests = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, **kwargs):
+        self.requests.append(kwargs)
+        step = self.script.pop(0) if self.script else "Done."
+
+        if isinstance(step, str):
+            message = SimpleNamespace(content=step, tool_calls=None)
+        else:
+            message = SimpleNamespace(content=None, tool_calls=[
+                SimpleNamespace(
+                    id=f"call_{len(self.requests)}_{i}",
+                    type="function",
+                    function=SimpleNamespace(name=name, arguments=json.dumps(arguments))
+                )
+                for i, (name, arguments) in enumerate(step)
+            ])
+
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+class ScriptedOpenAIServer:
+    """
+    Local HTTP server speaking the chat completions API for a real OpenAI client.
+
+    Each entry in the script is (status, headers, body); requests beyond the script
+    get a successful completion. Arrival times are recorded per request.
+    """
+
+    COMPLETION = {
+        "id": "cmpl-local", "object": "chat.completion", "created": 0, "model": "mock",
+        "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": "ok"}}]
+    }
+
+    def __init__(self, script: List[Any]):
+        self.script = list(script)
+        self.request_times: List[float] = []
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                with server._lock:
+                    server.request_times.append(time.monotonic())
+                    status, headers, body = server.script.pop(0) if server.script else (200, {}, server.COMPLETION)
+                payload = json.dumps(body).encode('utf-8')
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def client(self):
+        """OpenAI client pointed at this server, with its own retries disabled."""
+        from openai import OpenAI
+        return OpenAI(api_key="test", base_url=f"http://127.0.0.1:{self._server.server_port}/v1", max_retries=0)
+
+    def __enter__(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
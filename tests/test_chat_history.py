@@ -0,0 +1,56 @@
+import pandas as pd
+
+import chat_history
+from chat_history import ChatHistoryStore
+
+
+def _sources(sample_data):
+    invoices = sample_data['invoices']
+    return {
+        'filtered_data': {'invoices_outstanding': invoices[invoices['status'] == 'Outstanding']},
+        'tables': {'invoices': invoices, 'customers': sample_data['customers']},
+        'metrics': [{'name': 'total_revenue', 'value': 1.0}]
+    }
+
+
+def test_blob_collected_before_commit_is_stored_again(tmp_path, sample_data):
+    store = ChatHistoryStore(str(tmp_path / "history.sqlite3"))
+    first = store.start_conversation()
+    store.add_turn(first, 'assistant', "first", _sources(sample_data), snapshot='sig')
+
+    # Another session deletes the only conversation referencing the blobs after this turn
+    # saw them stored but before it commits
+    store_sources = store._store_sources
+
+    def store_then_collect(*args):
+        manifest = store_sources(*args)
+        store.delete_conversation(first)
+        return manifest
+
+    store._store_sources = store_then_collect
+    second = store.start_conversation()
+    turn_id = store.add_turn(second, 'assistant', "second", _sources(sample_data), snapshot='sig')
+
+    sources = store.load_sources(turn_id)
+    assert [view['name'] for view in sources['views']['tables']] == ['Customers']
+    pd.testing.assert_frame_equal(sources['views']['tables'][0]['source'],
+                                  sample_data['customers'].reset_index(drop=True))
+    assert sources['metrics'] == [{'name': 'total_revenue', 'value': 1.0}]
+
+
+def test_full_tables_are_keyed_by_snapshot(tmp_path, sample_data, monkeypatch):
+    store = ChatHistoryStore(str(tmp_path / "history.sqlite3"))
+    hashed = []
+    fingerprint = chat_history.compute_data_fingerprint
+    monkeypatch.setattr(chat_history, 'compute_data_fingerprint',
+                        lambda data: hashed.append(next(iter(data.values()))) or fingerprint(data))
+
+    conversation = store.start_conversation()
+    sources = {'tables': {'customers': sample_data['customers'], 'vendors': sample_data['vendors']}}
+    store.add_turn(conversation, 'assistant', "one", sources, snapshot='sig-1')
+    store.add_turn(conversation, 'assistant', "two", sources, snapshot='sig-1')
+    assert hashed == []
+    assert store.stats()['blobs'] == 2
+
+    store.add_turn(conversation, 'assistant', "three", sources, snapshot='sig-2')
+    assert store.stats()['blobs'] == 4
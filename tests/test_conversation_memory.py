@@ -0,0 +1,37 @@
+from conversation_memory import ConversationMemory, estimate_tokens
+
+
+def _deep_answer(tokens=1500):
+    """An answer as long as the deep route's completion budget."""
+    return ("Revenue grew on the back of consulting work. " * (tokens * 4 // 45 + 1))[:tokens * 4]
+
+
+def test_last_exchange_is_kept_verbatim_beyond_the_budget():
+    memory = ConversationMemory()
+    memory.add("user", "Why did margins fall last quarter?")
+    answer = _deep_answer()
+    memory.add("assistant", answer)
+    memory.add("user", "What should we do about it?")
+
+    assert estimate_tokens(answer) > memory.context_token_budget
+    context = memory.build_context(exclude_last=True)
+
+    assert context == [
+        {"role": "user", "content": "Why did margins fall last quarter?"},
+        {"role": "assistant", "content": answer}
+    ]
+
+
+def test_older_exchanges_are_summarized():
+    memory = ConversationMemory()
+    for question in ("Why did margins fall?", "Which costs grew fastest?"):
+        memory.add("user", question)
+        memory.add("assistant", _deep_answer())
+    memory.add("user", "And next quarter?")
+
+    context = memory.build_context(exclude_last=True)
+
+    assert context[0]["role"] == "system"
+    assert "User asked: Why did margins fall?" in context[0]["content"]
+    assert context[1:] == [{"role": "user", "content": "Which costs grew fastest?"},
+                           {"role": "assistant", "content": _deep_answer()}]
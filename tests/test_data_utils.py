@@ -0,0 +1,69 @@
+import shutil
+
+import pandas as pd
+import pytest
+
+from chatgpt_integration import FinancialChatBot
+from data_utils import DataLoader, FinancialAnalyzer
+
+
+@pytest.fixture
+def loaders(tmp_path, data_directory, monkeypatch):
+    """A loader reading the Arrow snapshot and one reading CSV, over the same copy of the data."""
+    directory = tmp_path / "data"
+    shutil.copytree(data_directory, directory)
+    monkeypatch.setenv('SNAPSHOT_DIRECTORY', str(tmp_path / "snapshots"))
+    DataLoader(str(directory)).load_all_data_shared()
+
+    def load(columns, filters=None, snapshot=True):
+        monkeypatch.setenv('ARROW_SNAPSHOTS', 'true' if snapshot else 'false')
+        return DataLoader(str(directory)).load_projected(columns, filters)
+
+    return load
+
+
+PROJECTIONS = [
+    ({name: None for name in DataLoader.TABLE_TYPES}, None),
+    ({'invoices': ['status', 'amount', 'days_overdue'], 'bills': ['days_overdue', 'due_date'],
+      'services': ['hourly_rate']}, None),
+    ({'invoices': ['amount', 'customer_id'], 'expenses': None},
+     {'invoices': {'status': 'Outstanding'}, 'expenses': {'date': ('2024-01-01', None)}}),
+    ({'bills': None}, {'bills': {'days_overdue': (1, None)}}),
+]
+
+
+@pytest.mark.parametrize("columns, filters", PROJECTIONS)
+def test_snapshot_and_csv_backends_return_the_same_frames(loaders, columns, filters):
+    from_snapshot = loaders(columns, filters, snapshot=True)
+    from_csv = loaders(columns, filters, snapshot=False)
+
+    assert from_snapshot.keys() == from_csv.keys() == columns.keys()
+    for name in columns:
+        pd.testing.assert_frame_equal(from_snapshot[name], from_csv[name], obj=name)
+
+
+def test_full_projection_matches_load_all_data(loaders, data_directory):
+    full = DataLoader(data_directory).load_all_data()
+    projected = loaders({name: None for name in DataLoader.TABLE_TYPES}, snapshot=False)
+
+    for name, df in full.items():
+        pd.testing.assert_frame_equal(projected[name], df.reset_index(drop=True), obj=name)
+
+
+def test_projected_summary_matches_base_sections(sample_data, data_directory):
+    bot = FinancialChatBot()
+    base_data = {name: value[FinancialChatBot.SUMMARY_COLUMNS[name]] if name in FinancialChatBot.SUMMARY_COLUMNS
+                 else value for name, value in sample_data.items() if name in FinancialChatBot.SUMMARY_COLUMNS
+                 or isinstance(value, str)}
+
+    assert bot.prepare_projected_summary(DataLoader(data_directory)) == bot.prepare_financial_summary(base_data)
+
+
+def test_expense_trends_keep_the_month_category_amount_shape(sample_data):
+    expenses = sample_data['expenses'].copy()
+    expenses['month'] = pd.to_datetime(expenses['date']).dt.to_period('M')
+    expected = expenses.groupby(['month', 'category'])['amount'].sum().reset_index()
+
+    pd.testing.assert_frame_equal(FinancialAnalyzer.get_expense_trends(sample_data), expected)
+    cube = FinancialAnalyzer.get_expense_trend_cube(sample_data)
+    assert {'rolling_3m', 'mom_pct', 'yoy_pct'} <= set(cube.columns)
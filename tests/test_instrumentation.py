@@ -0,0 +1,35 @@
+import json
+
+from instrumentation import Instrumentation
+
+
+def test_jsonl_path_is_read_when_the_first_event_is_recorded(tmp_path, monkeypatch):
+    monkeypatch.delenv('TEST_METRICS_JSONL_PATH', raising=False)
+    registry = Instrumentation(jsonl_path_env='TEST_METRICS_JSONL_PATH', flush_interval=60)
+    # Set after the registry exists, as load_dotenv() does after main.py's imports
+    path = tmp_path / "metrics.jsonl"
+    monkeypatch.setenv('TEST_METRICS_JSONL_PATH', str(path))
+
+    registry.increment('answers', route='fast')
+    with registry.span('page_render', page='Charts'):
+        pass
+
+    # Recording only buffers; the file is written in a batch
+    assert not path.exists()
+    registry.flush()
+    events = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [(event['type'], event['name']) for event in events] == [('counter', 'answers'), ('span', 'page_render')]
+
+    registry.increment('answers', route='deep')
+    registry.flush()
+    assert len(path.read_text().splitlines()) == 3
+
+
+def test_no_file_without_a_path(tmp_path, monkeypatch):
+    monkeypatch.delenv('TEST_METRICS_JSONL_PATH', raising=False)
+    registry = Instrumentation(jsonl_path_env='TEST_METRICS_JSONL_PATH')
+    registry.increment('answers')
+    registry.flush()
+    assert registry.jsonl_path is None
+    assert registry._writer is None
+    assert '"answers"' in registry.to_json_lines()
@@ -0,0 +1,46 @@
+import pytest
+
+from local_answers import LocalAnswerEngine
+from metrics_engine import get_metrics_engine
+
+
+@pytest.fixture(scope="module")
+def engine(sample_data):
+    return LocalAnswerEngine(get_metrics_engine(sample_data))
+
+
+@pytest.mark.parametrize("question", [
+    "What was revenue in March 2024?",
+    "How much did we spend on software?",
+    "total cost of travel expenses this year",
+    "Which customer owes us the most?",
+    "What is our receivables turnover?",
+    "What were our expenses last year?",
+    "Top 5 customers in Q3",
+    "Which vendors do we spend the most with and what are those expenses?",
+])
+def test_qualified_questions_go_to_the_model(engine, question):
+    assert engine.answer(question) is None
+
+
+@pytest.mark.parametrize("question, intent", [
+    ("What is our total revenue?", 'total_revenue'),
+    ("What are our outstanding receivables?", 'outstanding_receivables'),
+    ("How much do we owe?", 'outstanding_payables'),
+    ("Which invoices are overdue?", 'overdue_receivables'),
+    ("What's the collection rate?", 'collection_rate'),
+    ("What is our profit margin?", 'profit_margin'),
+    ("Who are our top 3 customers by revenue?", 'top_customers'),
+    ("Which vendors do we spend the most with?", 'top_vendors'),
+    ("Show me the 10 largest invoices", 'top_invoices'),
+    ("How much did we spend?", 'total_expenses'),
+    ("How many active customers do we have?", 'active_customers'),
+])
+def test_plain_lookups_are_answered_locally(engine, question, intent):
+    result = engine.answer(question)
+    assert result is not None and result['intent'] == intent
+
+
+def test_ranking_size_is_taken_from_the_question(engine):
+    assert len(engine.answer("Show me the 10 largest invoices")['table']) == 10
+    assert len(engine.answer("top 3 customers")['table']) == 3
@@ -0,0 +1,166 @@
+import json
+import threading
+from datetime import datetime
+
+import pandas as pd
+
+import metrics_engine
+from chatgpt_integration import FinancialChatBot
+from fake_clients import ScriptedToolCallClient
+from metrics_engine import get_metrics_engine
+
+
+class _FixedClock:
+    """Stand-in for datetime whose now() is settable."""
+    current = datetime(2025, 3, 1, 9, 30)
+
+    @classmethod
+    def now(cls):
+        return cls.current
+
+
+def test_engine_is_rebuilt_when_the_day_changes(sample_data, monkeypatch):
+    monkeypatch.setattr(metrics_engine, 'datetime', _FixedClock)
+    data = dict(sample_data)
+
+    _FixedClock.current = datetime(2025, 3, 1, 9, 30)
+    engine = get_metrics_engine(data)
+    assert engine.as_of == pd.Timestamp('2025-03-01')
+    _FixedClock.current = datetime(2025, 3, 1, 23, 59)
+    assert get_metrics_engine(data) is engine
+
+    _FixedClock.current = datetime(2025, 3, 2, 0, 1)
+    next_day = get_metrics_engine(data)
+    assert next_day is not engine
+    assert next_day.as_of == pd.Timestamp('2025-03-02')
+    assert next_day.fingerprint == engine.fingerprint
+    assert next_day.aging_buckets('invoices')['as_of'] == '2025-03-02'
+
+
+def test_concurrent_sessions_share_the_engine_cache_safely(sample_data):
+    snapshots = [dict(sample_data) for _ in range(6)]
+    errors = []
+
+    def session(data):
+        try:
+            for _ in range(20):
+                engine = get_metrics_engine(data)
+                engine.headline_totals()
+                engine.aging_buckets('bills')
+        except Exception as e:  # pragma: no cover - the failure being tested for
+            errors.append(e)
+
+    threads = [threading.Thread(target=session, args=(data,)) for data in snapshots * 2]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert len(metrics_engine._engine_cache) <= metrics_engine._ENGINE_CACHE_SIZE
+
+
+def _known_ledger():
+    """A tiny ledger whose aggregates are easy to work out by hand."""
+    return {
+        'invoices': pd.DataFrame({
+            'invoice_id': ['I1', 'I2', 'I3', 'I4'],
+            'customer_id': ['C1', 'C2', 'C1', 'C3'],
+            'amount': [1000.0, 250.0, 500.0, 40.0],
+            'status': ['Paid', 'Outstanding', 'Outstanding', 'Outstanding'],
+            'date_issued': pd.to_datetime(['2025-01-05', '2025-01-20', '2025-02-01', '2025-02-10']),
+            'due_date': pd.to_datetime(['2025-02-04', '2025-02-19', '2025-03-03', '2024-11-01'])
+        }),
+        'bills': pd.DataFrame({
+            'bill_id': ['B1', 'B2'],
+            'vendor_id': ['V1', 'V2'],
+            'amount': [300.0, 120.0],
+            'status': ['Outstanding', 'Paid'],
+            'date_issued': pd.to_datetime(['2025-01-10', '2025-01-15']),
+            'due_date': pd.to_datetime(['2025-01-31', '2025-02-14'])
+        }),
+        'expenses': pd.DataFrame({
+            'expense_id': ['E1', 'E2', 'E3'],
+            'vendor_id': ['V2', 'V3', 'V2'],
+            'amount': [80.0, 700.0, 20.0],
+            'status': ['Paid', 'Paid', 'Paid'],
+            'category': ['Software', 'Rent', 'Software'],
+            'date': pd.to_datetime(['2025-01-03', '2025-01-04', '2025-02-03'])
+        }),
+        'vendors': pd.DataFrame({'vendor_id': ['V1', 'V2', 'V3'], 'vendor_name': ['Acme', 'Globex', 'Initech']}),
+        'customers': pd.DataFrame({'customer_id': ['C1', 'C2', 'C3'],
+                                   'customer_name': ['Alpha', 'Beta', 'Gamma']})
+    }
+
+
+def test_tool_results_match_the_known_ledger():
+    engine = metrics_engine.FinancialMetricsEngine(_known_ledger(), as_of='2025-03-01', fingerprint='known')
+
+    def tool(name, **arguments):
+        return json.loads(engine.execute_tool(name, json.dumps(arguments)))
+
+    assert tool('sum_by_status', table='invoices')['by_status'] == {
+        'Outstanding': {'amount': 790.0, 'count': 3}, 'Paid': {'amount': 1000.0, 'count': 1}
+    }
+    assert tool('top_vendors', k=2, source='all')['vendors'] == [
+        {'vendor_id': 'V3', 'vendor_name': 'Initech', 'amount': 700.0},
+        {'vendor_id': 'V1', 'vendor_name': 'Acme', 'amount': 300.0}
+    ]
+    assert tool('top_vendors', k=1, source='expenses')['vendors'][0]['vendor_name'] == 'Initech'
+    assert [c['customer_name'] for c in tool('top_customers', k=3)['customers']] == ['Alpha', 'Beta', 'Gamma']
+
+    # I3 is due 2 days after as_of, I2 is 10 days late and I4 is 120 days late
+    aging = tool('aging_buckets', table='invoices')
+    assert aging['as_of'] == '2025-03-01'
+    assert aging['buckets'] == {
+        'Current': {'amount': 500.0, 'count': 1}, '1-30': {'amount': 250.0, 'count': 1},
+        '31-60': {'amount': 0.0, 'count': 0}, '61-90': {'amount': 0.0, 'count': 0},
+        '90+': {'amount': 40.0, 'count': 1}
+    }
+
+    assert 'error' in tool('sum_by_status', table='vendors')
+    assert tool('no_such_tool') == {'error': 'Unknown tool: no_such_tool'}
+
+
+def test_tool_call_loop_answers_from_engine_results():
+    data = _known_ledger()
+    client = ScriptedToolCallClient([
+        [("sum_by_status", {"table": "invoices"}), ("aging_buckets", {"table": "bills"})],
+        [("top_vendors", {"k": 2, "source": "all"})],
+        "Receivables and payables summarized from tool results."
+    ])
+    bot = FinancialChatBot(client=client)
+
+    answer, tool_results = bot.get_financial_analysis_with_tools("How are receivables and payables?", data)
+
+    assert answer == "Receivables and payables summarized from tool results."
+    assert len(client.requests) == 3
+    engine = get_metrics_engine(data)
+    assert tool_results == {
+        'sum_by_status({"table": "invoices"})': engine.sum_by_status('invoices'),
+        'aging_buckets({"table": "bills"})': engine.aging_buckets('bills'),
+        'top_vendors({"k": 2, "source": "all"})': engine.top_vendors(2, 'all')
+    }
+
+    # Every tool call is answered in the next request, under the call's ID
+    messages = client.requests[-1]['messages']
+    tool_messages = [message for message in messages if message['role'] == 'tool']
+    assert [message['tool_call_id'] for message in tool_messages] == ['call_1_0', 'call_1_1', 'call_2_0']
+    assert json.loads(tool_messages[2]['content']) == engine.top_vendors(2, 'all')
+    assert all('tools' in request for request in client.requests)
+
+
+def test_tool_call_loop_withholds_tools_on_the_last_round():
+    client = ScriptedToolCallClient([
+        [("sum_by_status", {"table": "bills"})],
+        [("sum_by_status", {"table": "bills"})],
+        "Answer without more tools."
+    ])
+    bot = FinancialChatBot(client=client)
+
+    answer, tool_results = bot.get_financial_analysis_with_tools("Bills by status?", _known_ledger(),
+                                                                 max_tool_rounds=2)
+
+    assert answer == "Answer without more tools."
+    assert ['tools' in request for request in client.requests] == [True, True, False]
+    assert list(tool_results) == ['sum_by_status({"table": "bills"})']
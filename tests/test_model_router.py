@@ -0,0 +1,52 @@
+import pytest
+
+from chatgpt_integration import FinancialChatBot
+from model_router import ModelRouter
+
+ROUTES = {
+    'fast': {'model': 'small', 'max_tokens': 400, 'temperature': 0.5},
+    'deep': {'model': 'large', 'max_tokens': 1500, 'temperature': 0.7},
+}
+
+
+@pytest.fixture
+def router():
+    return ModelRouter(FinancialChatBot.FINANCIAL_KEYWORDS, routes=ROUTES)
+
+
+@pytest.mark.parametrize("question", [
+    "Why did expenses go up last month?",
+    "Analyze our cash position",
+    "What is our biggest risk with customer payments?",
+    "Can you explain the revenue trends?",
+    "What should we plan for in next quarter's costs?",
+    "Compare invoices by customer",
+    "Any insights on vendor spend?",
+])
+def test_analytical_questions_go_deep(router, question):
+    assert router.classify(question) == 'deep'
+
+
+@pytest.mark.parametrize("question", [
+    # Deep markers inside longer words are not markers
+    "What is the explanation field on invoice INV-1001?",
+    "Which invoices have an asterisk in the notes?",
+    "How many expenses are tagged planet?",
+    "Show bills for the Whyalla office",
+    # Plain lookups and small talk
+    "What is the total revenue?",
+    "How many customers do we have?",
+    "Hello there!",
+])
+def test_lookups_and_false_positives_go_fast(router, question):
+    assert router.classify(question) == 'fast'
+
+
+def test_latency_stats_per_route(router):
+    router.timed('fast', lambda: None)
+    router.timed('fast', lambda: None)
+
+    stats = router.latency_stats()
+    assert stats['fast']['count'] == 2 and stats['fast']['model'] == 'small'
+    assert stats['fast']['p50'] is not None
+    assert stats['deep'] == {'model': 'large', 'count': 0, 'p50': None, 'p95': None}
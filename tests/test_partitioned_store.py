@@ -0,0 +1,52 @@
+import gc
+import weakref
+
+import pandas as pd
+import pytest
+
+import metrics_engine
+from data_utils import DataLoader
+from metrics_engine import get_metrics_engine
+from partitioned_store import PartitionedDataStore
+from synthetic_data import generate_ledger
+
+
+@pytest.fixture
+def partition_root(tmp_path, data_directory):
+    """Two tenants with two fiscal periods each."""
+    root = tmp_path / "partitions"
+    for tenant_number in (1, 2):
+        for period in ('2023', '2024'):
+            generate_ledger(str(root / f"tenant-{tenant_number}" / period), rows=300,
+                            seed=tenant_number * 100 + int(period), template_directory=data_directory)
+    return str(root)
+
+
+def test_combined_periods_keep_the_loader_order(partition_root):
+    store = PartitionedDataStore(partition_root)
+    combined = store.load('tenant-1')
+    single = store.load('tenant-1', ['2024'])
+
+    for name, (column, ascending) in DataLoader.TABLE_ORDER.items():
+        df = combined[name]
+        expected = df.sort_values(column, ascending=ascending, kind='stable').reset_index(drop=True)
+        pd.testing.assert_frame_equal(df, expected, obj=name)
+        assert list(df.columns) == list(single[name].columns)
+    assert combined['expenses'].index.equals(pd.RangeIndex(len(combined['expenses'])))
+
+
+def test_evicted_view_is_not_kept_alive_by_its_metrics_engine(partition_root):
+    store = PartitionedDataStore(partition_root, max_bytes=1)
+    view = store.load('tenant-1')
+    engine = get_metrics_engine(view)
+    view_expenses = weakref.ref(view['expenses'])
+    assert any(cached is engine for cached in metrics_engine._engine_cache.values())
+
+    # Loading another tenant evicts the first view from the one-view budget
+    store.load('tenant-2')
+    assert store.stats['evictions'] == 1
+    assert not any(cached is engine for cached in metrics_engine._engine_cache.values())
+
+    del view, engine
+    gc.collect()
+    assert view_expenses() is None
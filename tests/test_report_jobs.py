@@ -0,0 +1,87 @@
+import threading
+import time
+
+from report_jobs import ReportJobQueue, ReportWorkerPool
+
+
+def _statuses(queue, snapshot):
+    return {job['status'] for job in queue.get_results(snapshot, 'report').values()}
+
+
+def test_tenants_do_not_cancel_each_others_jobs(tmp_path, sample_data):
+    pool = ReportWorkerPool(ReportJobQueue(str(tmp_path / "jobs.sqlite3")), lambda: None)
+
+    pool.submit_snapshot(sample_data, 'sig-a1', 'tenant-a')
+    pool.submit_snapshot(sample_data, 'sig-b1', 'tenant-b')
+    # Switching back and forth between tenants keeps both tenants' work queued
+    pool.submit_snapshot(sample_data, 'sig-a1', 'tenant-a')
+
+    assert _statuses(pool.queue, 'sig-a1') == {'pending'}
+    assert _statuses(pool.queue, 'sig-b1') == {'pending'}
+    assert set(dict(pool._snapshots.values())) == {'sig-a1', 'sig-b1'}
+
+
+def test_new_snapshot_supersedes_only_its_own_tenant(tmp_path, sample_data):
+    pool = ReportWorkerPool(ReportJobQueue(str(tmp_path / "jobs.sqlite3")), lambda: None)
+
+    pool.submit_snapshot(sample_data, 'sig-a1', 'tenant-a')
+    pool.submit_snapshot(sample_data, 'sig-b1', 'tenant-b')
+    pool.submit_snapshot(sample_data, 'sig-a2', 'tenant-a')
+
+    assert _statuses(pool.queue, 'sig-a1') == {'stale'}
+    assert _statuses(pool.queue, 'sig-a2') == {'pending'}
+    assert _statuses(pool.queue, 'sig-b1') == {'pending'}
+    assert set(dict(pool._snapshots.values())) == {'sig-a2', 'sig-b1'}
+
+
+class _BlockingBot:
+    """Bot whose first report blocks until released; everything else answers immediately."""
+
+    def __init__(self):
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def generate_financial_report(self, report_type, data):
+        if not self.started.is_set():
+            self.started.set()
+            self.release.wait(5)
+        return f"{report_type} report"
+
+    def explain_financial_metric(self, metric_name, current_value, data):
+        return f"{metric_name} explanation"
+
+
+def test_running_job_lease_is_renewed_while_the_worker_is_alive(tmp_path, sample_data):
+    queue = ReportJobQueue(str(tmp_path / "jobs.sqlite3"), lease_seconds=0.2)
+    bot = _BlockingBot()
+    pool = ReportWorkerPool(queue, lambda: bot, workers=1, poll_interval=0.05)
+    pool.submit_snapshot(sample_data, 'sig-a1')
+    pool.start()
+
+    assert bot.started.wait(5)
+    # Well past the lease: the heartbeat keeps the job from being handed to another worker
+    time.sleep(0.6)
+    assert queue.recover() == 0
+    assert queue.get_results('sig-a1', 'report')['summary']['status'] == 'running'
+
+    bot.release.set()
+    deadline = time.monotonic() + 5
+    while _statuses(queue, 'sig-a1') != {'done'}:
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+    pool.stop()
+
+    assert queue.get_results('sig-a1', 'report')['summary']['result'] == "summary report"
+
+
+def test_job_without_a_heartbeat_is_recovered_after_its_lease(tmp_path):
+    queue = ReportJobQueue(str(tmp_path / "jobs.sqlite3"), lease_seconds=0.1)
+    queue.enqueue('sig-a1', 'report', 'summary', {'report_type': 'summary'})
+    job = queue.claim_next(['sig-a1'])
+
+    assert queue.recover() == 0
+    time.sleep(0.15)
+    assert queue.recover() == 1
+    # The abandoned worker's late renewal must not reclaim the job
+    assert not queue.renew(job['id'])
+    assert queue.claim_next(['sig-a1'])['attempts'] == 2
@@ -0,0 +1,181 @@
+import threading
+import time
+
+import pytest
+
+from request_coalescer import SingleFlight
+
+
+def _wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+def _run_callers(count, target):
+    """Start `count` threads running target(i); return (threads, results, errors)."""
+    results, errors = [None] * count, [None] * count
+
+    def run(i):
+        try:
+            results[i] = target(i)
+        except Exception as e:
+            errors[i] = e
+
+    threads = [threading.Thread(target=run, args=(i,), daemon=True) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads, results, errors
+
+
+def _join(threads):
+    for thread in threads:
+        thread.join(timeout=5)
+        assert not thread.is_alive()
+
+
+def test_concurrent_identical_calls_run_the_request_once():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def request():
+        calls.append(1)
+        release.wait(5)
+        return "answer"
+
+    threads, results, errors = _run_callers(8, lambda i: flight.call("key", request))
+    _wait_until(lambda: flight.stats['coalesced'] == 7)
+    release.set()
+    _join(threads)
+
+    assert calls == [1]
+    assert results == ["answer"] * 8
+    assert errors == [None] * 8
+    assert flight.stats == {'upstream_calls': 1, 'coalesced': 7}
+
+
+def test_leader_exception_reaches_every_follower():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def request():
+        release.wait(5)
+        raise RuntimeError("upstream failed")
+
+    threads, results, errors = _run_callers(5, lambda i: flight.call("key", request))
+    _wait_until(lambda: flight.stats['coalesced'] == 4)
+    release.set()
+    _join(threads)
+
+    assert all(isinstance(e, RuntimeError) and str(e) == "upstream failed" for e in errors)
+    assert flight.stats['upstream_calls'] == 1
+
+
+@pytest.mark.parametrize("fail", [False, True])
+def test_key_is_released_after_the_call_finishes(fail):
+    flight = SingleFlight()
+
+    def request():
+        if fail:
+            raise RuntimeError("upstream failed")
+        return "first"
+
+    if fail:
+        with pytest.raises(RuntimeError):
+            flight.call("key", request)
+    else:
+        assert flight.call("key", request) == "first"
+
+    assert flight.call("key", lambda: "fresh") == "fresh"
+    assert flight.stats == {'upstream_calls': 2, 'coalesced': 0}
+
+
+def _gated_stream(chunks, gates, error=None):
+    """Upstream stream that yields chunk i once gates[i] is set, optionally failing at the end."""
+    def start():
+        def generate():
+            for chunk, gate in zip(chunks, gates):
+                gate.wait(5)
+                yield chunk
+            if error is not None:
+                raise error
+        return generate()
+    return start
+
+
+def test_late_stream_joiner_gets_the_full_replay_in_order():
+    flight = SingleFlight()
+    chunks = [f"chunk-{i}" for i in range(6)]
+    gates = [threading.Event() for _ in chunks]
+    starts = []
+
+    def start():
+        starts.append(1)
+        return _gated_stream(chunks, gates)()
+
+    leader = flight.stream("key", start)
+    # Half the stream has been delivered before the follower joins
+    for gate in gates[:3]:
+        gate.set()
+    _wait_until(lambda: len(flight._flights["key"].chunks) == 3)
+
+    follower = flight.stream("key", start)
+    for gate in gates[3:]:
+        gate.set()
+
+    assert list(follower) == chunks
+    assert list(leader) == chunks
+    assert starts == [1]
+    assert flight.stats == {'upstream_calls': 1, 'coalesced': 1}
+
+
+def test_concurrent_stream_readers_each_see_every_chunk():
+    flight = SingleFlight()
+    chunks = list(range(50))
+    gates = [threading.Event() for _ in chunks]
+    start = _gated_stream(chunks, gates)
+
+    threads, results, errors = _run_callers(6, lambda i: list(flight.stream("key", start)))
+    _wait_until(lambda: flight.stats['coalesced'] == 5)
+    for gate in gates:
+        gate.set()
+    _join(threads)
+
+    assert errors == [None] * 6
+    assert results == [chunks] * 6
+
+
+def test_stream_error_reaches_every_subscriber_and_releases_the_key():
+    flight = SingleFlight()
+    gates = [threading.Event() for _ in range(2)]
+    start = _gated_stream(["a", "b"], gates, error=RuntimeError("stream broke"))
+
+    leader = flight.stream("key", start)
+    follower = flight.stream("key", start)
+    for gate in gates:
+        gate.set()
+
+    for subscriber in (leader, follower):
+        received = []
+        with pytest.raises(RuntimeError, match="stream broke"):
+            for chunk in subscriber:
+                received.append(chunk)
+        assert received == ["a", "b"]
+
+    _wait_until(lambda: "key" not in flight._flights)
+    assert list(flight.stream("key", lambda: iter(["fresh"]))) == ["fresh"]
+    assert flight.stats['upstream_calls'] == 2
+
+
+def test_stream_start_failure_releases_the_key():
+    flight = SingleFlight()
+
+    def start():
+        raise ConnectionError("refused")
+
+    with pytest.raises(ConnectionError):
+        flight.stream("key", start)
+
+    assert list(flight.stream("key", lambda: iter([1, 2]))) == [1, 2]
@@ -0,0 +1,141 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from chatgpt_integration import FinancialChatBot
+from fake_clients import ScriptedOpenAIServer
+from request_scheduler import RateLimitedError, RequestScheduler
+
+
+class _ManualClock:
+    """Monotonic clock that only moves when the test advances it."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class _RateLimitError(Exception):
+    status_code = 429
+    response = SimpleNamespace(status_code=429, headers={'retry-after': '1'})
+
+
+def _wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+def _one_request_per_minute():
+    """Scheduler allowing one request per minute (of the manual clock), with its quota used up."""
+    clock = _ManualClock()
+    scheduler = RequestScheduler(requests_per_minute=1, tokens_per_minute=10 ** 9, clock=clock,
+                                 sleep=lambda seconds: None)
+    scheduler.request_bucket.consume(1)
+    return scheduler, clock
+
+
+def _start(scheduler, name, request, threads):
+    thread = threading.Thread(target=scheduler.call, args=(request,), name=name, daemon=True)
+    waiting = len(scheduler._waiting)
+    thread.start()
+    threads.append(thread)
+    _wait_until(lambda: len(scheduler._waiting) > waiting)
+
+
+def _drain(scheduler, clock, threads, served, expected):
+    """Release one request's worth of quota at a time until `expected` requests have run."""
+    while len(served) < expected:
+        released = len(served)
+        clock.now += 60
+        with scheduler._condition:
+            scheduler._condition.notify_all()
+        _wait_until(lambda: len(served) > released)
+    for thread in threads:
+        thread.join(timeout=5)
+
+
+def test_waiting_callers_are_served_in_arrival_order():
+    scheduler, clock = _one_request_per_minute()
+    served, threads = [], []
+    for i in range(5):
+        _start(scheduler, f"caller-{i}", lambda i=i: served.append(i), threads)
+
+    _drain(scheduler, clock, threads, served, 5)
+    assert served == [0, 1, 2, 3, 4]
+
+
+def test_retried_request_keeps_its_place_in_the_queue():
+    scheduler, clock = _one_request_per_minute()
+    served, threads = [], []
+
+    def first():
+        served.append('first')
+        if served.count('first') == 1:
+            # Two more requests arrive while the first one is in flight, then it is rate limited
+            _start(scheduler, "second", lambda: served.append('second'), threads)
+            _start(scheduler, "third", lambda: served.append('third'), threads)
+            raise _RateLimitError("Rate limit reached")
+
+    _start(scheduler, "first", first, threads)
+    _drain(scheduler, clock, threads, served, 4)
+
+    assert served == ['first', 'first', 'second', 'third']
+    assert scheduler.stats['retries'] == 1
+    assert scheduler.stats['failures'] == 0
+    assert scheduler._waiting == []
+
+
+def _rate_limited(headers, code="rate_limit_exceeded", message="Rate limit reached for requests"):
+    return (429, headers, {"error": {"message": message, "type": "requests", "code": code}})
+
+
+def _bot(server, max_retries=3):
+    scheduler = RequestScheduler(requests_per_minute=600, tokens_per_minute=10 ** 6, max_retries=max_retries)
+    return FinancialChatBot(client=server.client(), scheduler=scheduler), scheduler
+
+
+def _complete(bot):
+    response = bot._create_completion(route='fast', messages=[{"role": "user", "content": "hi"}])
+    return response.choices[0].message.content
+
+
+def test_retry_after_headers_are_honored():
+    script = [_rate_limited({'retry-after-ms': '150'}), _rate_limited({'retry-after': '0.3'})]
+    with ScriptedOpenAIServer(script) as server:
+        bot, scheduler = _bot(server)
+        assert _complete(bot) == "ok"
+
+    first, second, third = server.request_times
+    assert second - first >= 0.15
+    assert third - second >= 0.3
+    assert scheduler.stats['rate_limited'] == 2
+    assert scheduler.stats['retries'] == 2
+
+
+def test_insufficient_quota_is_not_retried():
+    script = [_rate_limited({'retry-after': '0.01'}, code="insufficient_quota",
+                            message="You exceeded your current quota, please check your plan and billing details.")]
+    with ScriptedOpenAIServer(script) as server:
+        bot, scheduler = _bot(server)
+        with pytest.raises(RateLimitedError, match="insufficient_quota"):
+            _complete(bot)
+
+    assert len(server.request_times) == 1
+    assert scheduler.stats['retries'] == 0
+
+
+def test_rate_limited_error_once_retries_run_out():
+    script = [_rate_limited({'retry-after-ms': '10'}) for _ in range(5)]
+    with ScriptedOpenAIServer(script) as server:
+        bot, scheduler = _bot(server, max_retries=2)
+        with pytest.raises(RateLimitedError, match="after 3 attempts"):
+            _complete(bot)
+
+    assert len(server.request_times) == 3
+    assert scheduler.stats['failures'] == 1
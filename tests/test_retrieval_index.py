@@ -0,0 +1,61 @@
+import os
+import shutil
+
+import pandas as pd
+import pytest
+
+from partitioned_store import PartitionedDataStore
+from retrieval_index import RetrievalIndex, get_retrieval_index
+
+
+def _make_tenant(root, data_directory, tenant, marker):
+    """Copy the sample books into <root>/<tenant>/2024 with a tenant-specific word in every description."""
+    period_dir = os.path.join(root, tenant, "2024")
+    shutil.copytree(data_directory, period_dir)
+    for table in ("expenses", "bills", "invoices"):
+        path = os.path.join(period_dir, f"{table}.csv")
+        df = pd.read_csv(path)
+        df['description'] = df['description'].astype(str) + f" {marker}"
+        df.to_csv(path, index=False)
+    with open(os.path.join(period_dir, "balance_sheet_report.md"), "a", encoding="utf-8") as f:
+        f.write(f"\n## {marker} holdings\nAssets held only by {tenant}: {marker}\n")
+
+
+@pytest.fixture
+def tenant_store(tmp_path, data_directory):
+    root = str(tmp_path)
+    _make_tenant(root, data_directory, "tenant-a", "zebraquartz")
+    _make_tenant(root, data_directory, "tenant-b", "yakmolybdenum")
+    return PartitionedDataStore(root)
+
+
+def test_tenants_never_retrieve_each_others_passages(tenant_store):
+    data_a = tenant_store.load("tenant-a")
+    data_b = tenant_store.load("tenant-b")
+
+    # Each session fetches its index, then another tenant's session refreshes before it searches
+    index_a = get_retrieval_index(data_a)
+    index_b = get_retrieval_index(data_b)
+    assert index_a is not index_b
+
+    for index, own, other in ((index_a, "zebraquartz", "yakmolybdenum"), (index_b, "yakmolybdenum", "zebraquartz")):
+        assert index.search(other, k=50) == []
+        passages = index.search(own, k=50)
+        assert {p['source'] for p in passages} >= {'expenses', 'balance_sheet'}
+        assert all(other not in f"{p['title']} {p['text']}" for p in passages)
+
+
+def test_refresh_skips_unchanged_tables_and_compacts_replaced_ones(sample_data):
+    index = RetrievalIndex()
+    assert index.refresh(sample_data)
+    documents = len(index.documents)
+
+    assert index.refresh(sample_data) == []
+
+    data = dict(sample_data)
+    data['expenses'] = sample_data['expenses'].copy()
+    data['expenses']['description'] = "Replacement description"
+    assert index.refresh(data) == ['expenses']
+    assert len(index.documents) == documents
+    assert all(index._alive)
+    assert index.search("replacement", k=3)[0]['source'] == 'expenses'
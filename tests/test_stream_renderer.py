@@ -0,0 +1,75 @@
+import math
+from types import SimpleNamespace
+
+from stream_renderer import BufferedStreamRenderer
+
+
+class _RecordingPlaceholder:
+    def __init__(self):
+        self.renders = []
+
+    def markdown(self, text):
+        self.renders.append(text)
+
+
+class _FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _stream(deltas, clock, interval):
+    for delta in deltas:
+        clock.now += interval
+        yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=delta))])
+    # Role-only and usage chunks carry no text
+    yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=None))])
+    yield SimpleNamespace(choices=[])
+
+
+def _deltas(count):
+    return [f"tok{i} " if i % 7 else f"**{i}**\n" for i in range(count)]
+
+
+def test_rendered_text_equals_concatenated_deltas():
+    clock, placeholder = _FakeClock(), _RecordingPlaceholder()
+    renderer = BufferedStreamRenderer(placeholder, clock=clock)
+    deltas = _deltas(1500) + [""]
+
+    text = renderer.consume(_stream(deltas, clock, interval=0.002))
+
+    assert text == "".join(deltas)
+    assert placeholder.renders[-1] == text
+    # Every intermediate render is a prefix of the answer followed by the cursor
+    for render in placeholder.renders[:-1]:
+        assert render.endswith(BufferedStreamRenderer.CURSOR)
+        assert text.startswith(render[:-len(BufferedStreamRenderer.CURSOR)])
+    assert renderer.stats()['tokens'] == 1500
+
+
+def test_flushes_are_bounded_by_interval_and_size():
+    clock, placeholder = _FakeClock(), _RecordingPlaceholder()
+    renderer = BufferedStreamRenderer(placeholder, flush_interval=0.05, flush_bytes=2048, clock=clock)
+    deltas = _deltas(1500)
+
+    renderer.consume(_stream(deltas, clock, interval=0.002))
+
+    total_time = renderer.stats()['total_time']
+    # First token, at most one flush per interval or per flush_bytes characters, and the final render
+    bound = 1 + math.ceil(total_time / 0.05) + len("".join(deltas)) // 2048 + 1
+    assert renderer.flush_count == len(placeholder.renders) <= bound
+    assert renderer.flush_count < len(deltas) / 10
+
+
+def test_size_cadence_flushes_when_chunks_arrive_at_once():
+    clock, placeholder = _FakeClock(), _RecordingPlaceholder()
+    renderer = BufferedStreamRenderer(placeholder, flush_interval=60, flush_bytes=100, clock=clock)
+    deltas = ["x" * 10] * 100
+
+    text = renderer.consume(_stream(deltas, clock, interval=0.0))
+
+    assert text == "x" * 1000
+    # The first token, then every 100 characters, then the final render without the cursor
+    assert renderer.flush_count == 1 + (1000 - 10) // 100 + 1
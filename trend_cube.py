@@ -0,0 +1,280 @@
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import metrics
+
+
+class TrendCube:
+    """
+    Precomputed month x member totals for the transaction tables, for every
+    dimension a table can be broken down by (expense category, account, vendor,
+    customer, or the table total).
+
+    Each (table, dimension) is a dense NumPy matrix of monthly sums and counts with
+    one row per member and one column per month. Slices derive rolling 3/6/12-month
+    sums (cumulative sums along the month axis) and month-over-month and
+    year-over-year deltas (shifted columns) for just the selected members, so a
+    trend chart or AI question reads a slice in milliseconds instead of regrouping
+    raw rows. Appended transactions are added with a bincount into the matrices;
+    new members and months extend them.
+    """
+
+    # Date column and breakdown dimensions (name -> column) of each table
+    SOURCES = {
+        'expenses': ('date', {'category': 'category', 'account': 'account_code', 'vendor': 'vendor_id'}),
+        'invoices': ('date_issued', {'customer': 'customer_id', 'account': 'account_code'}),
+        'bills': ('date_issued', {'vendor': 'vendor_id', 'account': 'account_code'})
+    }
+
+    # Trailing windows (in months) of the rolling sums
+    ROLLING_WINDOWS = (3, 6, 12)
+
+    MEASURES = ['amount', 'count'] + [f"rolling_{w}m" for w in ROLLING_WINDOWS] + \
+        ['mom_change', 'mom_pct', 'yoy_change', 'yoy_pct']
+
+    def __init__(self, data: Dict):
+        """
+        Build the cube from a data snapshot.
+
+        Args:
+            data: Dictionary containing all financial DataFrames (expenses, invoices and bills are used)
+        """
+        # Per table: first month (months since 1970-01) and number of months covered
+        self._first_month: Dict[str, int] = {}
+        self._months: Dict[str, int] = {}
+        # Per (table, dimension): members, and sums/counts of shape (members, months)
+        self._members: Dict[tuple, pd.Index] = {}
+        self._sums: Dict[tuple, np.ndarray] = {}
+        self._counts: Dict[tuple, np.ndarray] = {}
+
+        with metrics.span('build_trend_cube'):
+            for table in self.SOURCES:
+                df = data.get(table)
+                if isinstance(df, pd.DataFrame) and not df.empty:
+                    self._add(table, df)
+
+    @staticmethod
+    def _month_numbers(dates: pd.Series) -> np.ndarray:
+        """Months since 1970-01 (the ordinal of a monthly pandas Period); -1 for missing dates."""
+        dates = pd.to_datetime(dates, errors='coerce')
+        months = dates.to_numpy().astype('datetime64[M]').astype(np.int64)
+        return np.where(dates.notna().to_numpy(), months, -1)
+
+    def _extend_months(self, table: str, low: int, high: int):
+        """Widen a table's month range to cover [low, high], padding every matrix with zeros."""
+        if table not in self._first_month:
+            self._first_month[table], self._months[table] = low, high - low + 1
+            for dimension in ['total'] + list(self.SOURCES[table][1]):
+                self._members[(table, dimension)] = pd.Index(['All'] if dimension == 'total' else [], dtype=object)
+                rows = 1 if dimension == 'total' else 0
+                self._sums[(table, dimension)] = np.zeros((rows, self._months[table]))
+                self._counts[(table, dimension)] = np.zeros((rows, self._months[table]), dtype=np.int64)
+            return
+
+        first, last = self._first_month[table], self._first_month[table] + self._months[table] - 1
+        before, after = max(first - low, 0), max(high - last, 0)
+        if not before and not after:
+            return
+        for key in [key for key in self._sums if key[0] == table]:
+            self._sums[key] = np.pad(self._sums[key], ((0, 0), (before, after)))
+            self._counts[key] = np.pad(self._counts[key], ((0, 0), (before, after)))
+        self._first_month[table] -= before
+        self._months[table] += before + after
+
+    def _add(self, table: str, df: pd.DataFrame):
+        """Add a table's rows into its matrices."""
+        date_column, dimensions = self.SOURCES[table]
+        if date_column not in df.columns or 'amount' not in df.columns:
+            return
+        months = self._month_numbers(df[date_column])
+        valid = months >= 0
+        if not valid.any():
+            return
+        months = months[valid]
+        amounts = np.nan_to_num(pd.to_numeric(df['amount'], errors='coerce').to_numpy(dtype=float)[valid])
+        self._extend_months(table, int(months.min()), int(months.max()))
+        columns = months - self._first_month[table]
+        width = self._months[table]
+
+        for dimension in ['total'] + list(dimensions):
+            key = (table, dimension)
+            keep = slice(None)
+            if dimension == 'total':
+                rows = np.zeros(len(columns), dtype=np.int64)
+            else:
+                if dimensions[dimension] not in df.columns:
+                    continue
+                # Factorize the new rows once and map only their distinct members onto the cube
+                codes, uniques = pd.factorize(df[dimensions[dimension]][valid].astype(str))
+                positions = self._members[key].get_indexer(uniques)
+                unknown = positions < 0
+                if unknown.any():
+                    positions[unknown] = np.arange(len(self._members[key]), len(self._members[key]) + int(unknown.sum()))
+                    self._members[key] = self._members[key].append(pd.Index(uniques[unknown], dtype=object))
+                    extra = ((0, int(unknown.sum())), (0, 0))
+                    self._sums[key] = np.pad(self._sums[key], extra)
+                    self._counts[key] = np.pad(self._counts[key], extra)
+                keep = codes >= 0
+                rows = positions[codes[keep]]
+
+            cells = rows * width + columns[keep]
+            size = self._sums[key].size
+            self._sums[key] += np.bincount(cells, weights=amounts[keep], minlength=size).reshape(-1, width)
+            self._counts[key] += np.bincount(cells, minlength=size).reshape(-1, width)
+
+    def append(self, new_rows: Dict[str, pd.DataFrame]) -> 'TrendCube':
+        """
+        Add newly arrived transactions without rebuilding the cube.
+
+        Args:
+            new_rows: Dictionary of table name (expenses, invoices, bills) to new rows
+
+        Returns:
+            self, for chaining
+        """
+        with metrics.span('append_trend_cube'):
+            for table, df in new_rows.items():
+                if table in self.SOURCES and isinstance(df, pd.DataFrame) and not df.empty:
+                    self._add(table, df)
+        return self
+
+    def dimensions(self, table: str) -> List[str]:
+        """Dimensions a table can be sliced by ('total' plus its breakdown columns)."""
+        if table not in self.SOURCES:
+            raise ValueError(f"Unsupported table for trends: {table}")
+        return ['total'] + list(self.SOURCES[table][1])
+
+    def members(self, table: str, dimension: str = 'total') -> pd.Index:
+        """Members of a dimension, in order of first appearance."""
+        self.dimensions(table)
+        return self._members.get((table, dimension), pd.Index([], dtype=object))
+
+    def periods(self, table: str) -> pd.PeriodIndex:
+        """Months covered by a table, oldest first."""
+        if table not in self._first_month:
+            return pd.PeriodIndex([], freq='M')
+        first = pd.Period(ordinal=self._first_month[table], freq='M')
+        return pd.period_range(first, periods=self._months[table], freq='M')
+
+    def _measures(self, sums: np.ndarray, counts: np.ndarray) -> Dict[str, np.ndarray]:
+        """All measures for a (members, months) block; windows reaching before the first month are NaN."""
+        width = sums.shape[1]
+        cumulative = np.concatenate([np.zeros((sums.shape[0], 1)), np.cumsum(sums, axis=1)], axis=1)
+        measures = {'amount': sums, 'count': counts}
+        for window in self.ROLLING_WINDOWS:
+            rolling = np.full(sums.shape, np.nan)
+            if width >= window:
+                rolling[:, window - 1:] = cumulative[:, window:] - cumulative[:, :width - window + 1]
+            measures[f"rolling_{window}m"] = rolling
+
+        for name, lag in (('mom', 1), ('yoy', 12)):
+            change = np.full(sums.shape, np.nan)
+            previous = np.full(sums.shape, np.nan)
+            if width > lag:
+                change[:, lag:] = sums[:, lag:] - sums[:, :-lag]
+                previous[:, lag:] = sums[:, :-lag]
+            with np.errstate(invalid='ignore', divide='ignore'):
+                measures[f"{name}_change"] = change
+                measures[f"{name}_pct"] = np.where(previous != 0, change / np.abs(previous) * 100, np.nan)
+        return measures
+
+    def slice(self, table: str, dimension: str = 'total', members: Optional[Sequence[str]] = None,
+              months: Optional[int] = None) -> pd.DataFrame:
+        """
+        Long-form trend slice.
+
+        Args:
+            table: expenses, invoices or bills
+            dimension: 'total' or one of the table's dimensions (see dimensions())
+            members: Members to include (default: all); unknown members are ignored
+            months: Only return the most recent months (measures still use earlier months)
+
+        Returns:
+            DataFrame with month, member and MEASURES columns, ordered by member then month.
+            Month/member combinations without transactions have amount 0.
+        """
+        if dimension not in self.dimensions(table):
+            raise ValueError(f"Unsupported dimension for {table}: {dimension}")
+        key = (table, dimension)
+        if key not in self._sums:
+            return pd.DataFrame(columns=['month', dimension] + self.MEASURES)
+
+        index = self._members[key]
+        rows = np.arange(len(index)) if members is None else index.get_indexer(pd.Index(members).astype(str))
+        rows = rows[rows >= 0]
+        measures = self._measures(self._sums[key][rows], self._counts[key][rows])
+
+        periods = self.periods(table)
+        start = max(len(periods) - int(months), 0) if months else 0
+        periods = periods[start:]
+        result = pd.DataFrame({
+            'month': np.tile(periods, len(rows)),
+            dimension: np.repeat(index[rows].to_numpy(), len(periods))
+        })
+        for name in self.MEASURES:
+            result[name] = measures[name][:, start:].ravel()
+        return result
+
+    def latest(self, table: str, dimension: str, k: int = 10, by: str = 'amount',
+               month: Optional[pd.Period] = None) -> pd.DataFrame:
+        """
+        One month's measures per member, ranked.
+
+        Args:
+            table: expenses, invoices or bills
+            dimension: One of the table's dimensions
+            k: Members to return
+            by: Measure to rank by (largest first; for *_change and *_pct the largest increases)
+            month: Month to report (default: the latest month in the table)
+
+        Returns:
+            DataFrame indexed by member with MEASURES columns
+        """
+        if by not in self.MEASURES:
+            raise ValueError(f"Unsupported measure: {by}")
+        if dimension not in self.dimensions(table):
+            raise ValueError(f"Unsupported dimension for {table}: {dimension}")
+        key = (table, dimension)
+        periods = self.periods(table)
+        if key not in self._sums or not len(periods):
+            return pd.DataFrame(columns=self.MEASURES)
+
+        column = len(periods) - 1 if month is None else periods.get_loc(pd.Period(month, freq='M'))
+        measures = self._measures(self._sums[key], self._counts[key])
+        snapshot = pd.DataFrame({name: values[:, column] for name, values in measures.items()},
+                                index=pd.Index(self._members[key], name=dimension))
+        return snapshot.sort_values(by, ascending=False, na_position='last').head(int(k))
+
+    def memory_usage(self) -> int:
+        """Bytes held by the cube matrices."""
+        return int(sum(array.nbytes for array in self._sums.values())
+                   + sum(array.nbytes for array in self._counts.values()))
+
+
+# Example usage and testing
+if __name__ == "__main__":
+    import sys
+    import time
+
+    from data_utils import DataLoader
+
+    loader = DataLoader(sys.argv[1] if len(sys.argv) > 1 else "data")
+    data = loader.load_all_data()
+
+    started = time.perf_counter()
+    cube = TrendCube(data)
+    elapsed = time.perf_counter() - started
+    print(f"Built cube in {elapsed * 1000:.1f} ms ({cube.memory_usage():,} bytes)")
+
+    print(cube.slice('invoices', months=6).to_string(float_format=lambda value: f"{value:,.2f}"))
+    print(cube.latest('expenses', 'category', k=5).round(2).to_string())
+
+    # Incremental update with a new month of expenses
+    new_expenses = data['expenses'].head(3).copy()
+    new_expenses['date'] = pd.to_datetime(new_expenses['date']) + pd.DateOffset(months=1)
+    started = time.perf_counter()
+    cube.append({'expenses': new_expenses})
+    print(f"\nAppended {len(new_expenses)} rows in {(time.perf_counter() - started) * 1000:.2f} ms")
+    print(cube.slice('expenses', 'category', members=['Utilities'], months=3).to_string(float_format=lambda value: f"{value:,.2f}"))